@@ -1,11 +1,27 @@
-import { createCustomFetch, getClientConfig, getSession } from '@/lib/auth'
+import {
+  clearTokens,
+  createCustomFetch,
+  getAccessToken,
+  getClientConfig,
+  getSession,
+  ITokenResponse,
+  storeTokens,
+} from '@/lib/auth'
 import { getClientConfigPromise } from '@lib/clientConfig'
+import {
+  initializeSharedResponseCache,
+  withResponseCache,
+} from '@lib/responseCache'
+import {
+  IMeter,
+  IMeterDataChunk,
+  planMeterDataChunks,
+  streamMeterData,
+} from '@lib/meterData'
+import { requestLogger } from '@lib/logger'
+import { timed, withRouteMetrics } from '@lib/metrics'
 import { NextRequest, NextResponse } from 'next/server'
 
-type TokenResponse = {
-  access_token?: string
-}
-
 // CORS headers configuration
 const corsHeaders = {
   'Access-Control-Allow-Origin': '*', // In production, replace with your specific domain
@@ -14,21 +30,42 @@ const corsHeaders = {
   'Access-Control-Max-Age': '86400',
 }
 
+const DEFAULT_FROM = '2024-12-05'
+const DEFAULT_TO = '2024-12-06'
+
+const listParam = (value: string | null) =>
+  value
+    ?.split(',')
+    .map(item => item.trim())
+    .filter(Boolean)
+
+const wantsNdjson = (request: NextRequest, url: URL) =>
+  url.searchParams.get('format') === 'ndjson' ||
+  (request.headers.get('accept') ?? '').includes('application/x-ndjson')
+
 // Handle CORS preflight requests
 export async function OPTIONS() {
   return NextResponse.json({}, { headers: corsHeaders })
 }
 
-export async function GET(request: NextRequest): Promise<NextResponse> {
-  const session = await getSession()
+export const GET = (request: NextRequest) =>
+  withRouteMetrics('/api/getData', () => getData(request))
+
+async function getData(request: NextRequest): Promise<NextResponse> {
+  const log = requestLogger('/api/getData')
+  const session = await timed('session', getSession)
   const issuer = await getClientConfig()
   const customFetch = await createCustomFetch()
   const clientConfig = await getClientConfigPromise()
 
-  let accessToken = session.access_token
+  const url = new URL(request.url)
+  const from = url.searchParams.get('from') ?? DEFAULT_FROM
+  const to = url.searchParams.get('to') ?? DEFAULT_TO
+
+  // Refreshed first when it is about to expire
+  let accessToken = await getAccessToken(session)
 
   if (!accessToken) {
-    const url = new URL(request.url)
     const code = url.searchParams.get('code')
 
     if (!code)
@@ -53,11 +90,13 @@ export async function GET(request: NextRequest): Promise<NextResponse> {
       code_verifier: session.code_verifier || '',
     }).toString()
 
-    const tokenResponse = await customFetch(tokenEndpoint, {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
-      body,
-    })
+    const tokenResponse = await timed('tokenExchange', () =>
+      customFetch(tokenEndpoint, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
+        body,
+      }),
+    )
 
     if (!tokenResponse.ok) {
       const errorText = await tokenResponse.text()
@@ -69,14 +108,10 @@ export async function GET(request: NextRequest): Promise<NextResponse> {
         { status: 500, headers: corsHeaders },
       )
     }
-    console.log(
-      'API > getData # Token response status ok:',
-      tokenResponse.status,
-      tokenResponse.statusText,
-    )
+    log.info('Token exchange succeeded', { status: tokenResponse.status })
 
-    const tokenData = (await tokenResponse.json()) as TokenResponse
-    console.log('API > getData # Token response data:', tokenData)
+    const tokenData = (await tokenResponse.json()) as ITokenResponse
+    log.debug('Token response', { tokenData })
 
     if (!tokenData.access_token)
       return NextResponse.json(
@@ -84,31 +119,41 @@ export async function GET(request: NextRequest): Promise<NextResponse> {
         { status: 500, headers: corsHeaders },
       )
 
-    session.access_token = tokenData.access_token
-    session.isLoggedIn = true
+    storeTokens(session, { ...tokenData, access_token: tokenData.access_token })
     await session.save()
 
     accessToken = tokenData.access_token
   }
 
-  console.log('API > getData # Using access token:', accessToken)
+  // Reads from the data server are cached per access token and URL
+  await initializeSharedResponseCache()
+  const dataFetch = withResponseCache(customFetch, accessToken)
 
-  const meterDataResponse = await customFetch(
-    new URL('/datasources/', clientConfig.protectedResourceUrl),
-    {
+  const meterDataResponse = await timed('meterList', () =>
+    dataFetch(new URL('/datasources/', clientConfig.protectedResourceUrl), {
       method: 'GET',
       headers: {
         Authorization: `Bearer ${accessToken}`,
         Accept: 'application/json',
       },
-    },
-  )
-  console.log(
-    `API > getData # Meter data response status: ${meterDataResponse.status} ${meterDataResponse.statusText}`,
+    }),
   )
 
   if (!meterDataResponse.ok) {
     const errorText = await meterDataResponse.text()
+    log.warn('Meter list request failed', {
+      status: meterDataResponse.status,
+      details: errorText,
+    })
+    // A rejected token cannot be used again; the user has to sign in
+    if (meterDataResponse.status === 401) {
+      clearTokens(session)
+      await session.save()
+      return NextResponse.json(
+        { error: 'Access token rejected by data server', details: errorText },
+        { status: 401, headers: corsHeaders },
+      )
+    }
     return NextResponse.json(
       {
         error: 'Error fetching data from data server',
@@ -117,22 +162,55 @@ export async function GET(request: NextRequest): Promise<NextResponse> {
       { status: 500, headers: corsHeaders },
     )
   }
-  console.log('API > getData # Meter data response received successfully')
 
   const meterData = await meterDataResponse.json()
-  console.log('API > getData # Meter data:', meterData)
+  log.debug('Meter data', { meterData })
 
   if (!meterData?.data || !Array.isArray(meterData.data))
     return NextResponse.json(
       { error: 'No meter data available' },
       { status: 500, headers: corsHeaders },
     )
-  console.log(
-    `API > getData # Meter data contains ${meterData.data.length} entries`,
-  )
+  log.info('Meter list received', { meters: meterData.data.length })
+
+  // Fan out across the selected meters, measures and date chunks, streaming
+  // each chunk to the client as NDJSON as soon as it arrives
+  if (wantsNdjson(request, url)) {
+    let chunks: IMeterDataChunk[]
+    try {
+      chunks = planMeterDataChunks(meterData.data as IMeter[], {
+        from,
+        to,
+        meters: listParam(url.searchParams.get('meters')),
+        measures: listParam(url.searchParams.get('measures')),
+      })
+    } catch (error) {
+      return NextResponse.json(
+        {
+          error: error instanceof Error ? error.message : 'Invalid date range',
+        },
+        { status: 400, headers: corsHeaders },
+      )
+    }
+
+    return new NextResponse(
+      streamMeterData(
+        dataFetch,
+        clientConfig.protectedResourceUrl,
+        accessToken,
+        chunks,
+      ),
+      {
+        headers: {
+          ...corsHeaders,
+          'Content-Type': 'application/x-ndjson',
+          'Cache-Control': 'no-store',
+        },
+      },
+    )
+  }
 
   const firstMeter = meterData.data[0]
-  console.log('API > getData # First meter:', firstMeter)
 
   if (
     !firstMeter?.availableMeasures ||
@@ -146,29 +224,30 @@ export async function GET(request: NextRequest): Promise<NextResponse> {
 
   const meterId = firstMeter.id
   const meterMeasure = firstMeter.availableMeasures[0]
-  console.log(
-    `API > getData # Fetching data for meter ${meterId} (${meterMeasure})`,
-  )
+  log.info('Fetching meter data', { meterId, measure: meterMeasure })
 
-  const dataResponse = await customFetch(
-    new URL(
-      `/datasources/${meterId}/${meterMeasure}?from=2024-12-05&to=2024-12-06`,
-      clientConfig.protectedResourceUrl,
-    ),
-    {
-      method: 'GET',
-      headers: {
-        Authorization: `Bearer ${accessToken}`,
-        Accept: 'application/json',
+  const dataResponse = await timed('meterData', () =>
+    dataFetch(
+      new URL(
+        `/datasources/${meterId}/${meterMeasure}?${new URLSearchParams({ from, to })}`,
+        clientConfig.protectedResourceUrl,
+      ),
+      {
+        method: 'GET',
+        headers: {
+          Authorization: `Bearer ${accessToken}`,
+          Accept: 'application/json',
+        },
       },
-    },
-  )
-  console.log(
-    `API > getData # data response status: ${dataResponse.status} ${dataResponse.statusText}`,
+    ),
   )
 
   if (!dataResponse.ok) {
     const errorText = await dataResponse.text()
+    log.warn('Meter data request failed', {
+      status: dataResponse.status,
+      details: errorText,
+    })
     return NextResponse.json(
       {
         error: 'Error fetching data from data server',
@@ -177,10 +256,9 @@ export async function GET(request: NextRequest): Promise<NextResponse> {
       { status: 500, headers: corsHeaders },
     )
   }
-  console.log('API > getData # Data response received successfully')
 
   const data = await dataResponse.json()
-  console.log('Data:', data)
+  log.debug('Meter data payload', { data })
 
   return NextResponse.json({ meterData, data }, { headers: corsHeaders })
 }
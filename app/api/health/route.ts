@@ -0,0 +1,30 @@
+import { getStartupState, isReady } from '@/lib/startup'
+
+// Load balancer health check. Deliberately touches no session, discovery or
+// upstream state so it stays cheap and only fails when the server itself does,
+// or, with STARTUP_MODE=eager, until startup has loaded its dependencies.
+export const dynamic = 'force-dynamic'
+
+export function GET(): Response {
+  const ready = isReady()
+  const { mode, phases } = getStartupState()
+
+  return new Response(
+    JSON.stringify(
+      ready
+        ? { status: 'ok' }
+        : {
+            status: 'starting',
+            mode,
+            failed: Object.keys(phases).filter(name => !phases[name].ok),
+          },
+    ),
+    {
+      status: ready ? 200 : 503,
+      headers: {
+        'Content-Type': 'application/json',
+        'Cache-Control': 'no-store',
+      },
+    },
+  )
+}
@@ -1,16 +1,24 @@
 import {
   createCustomFetch,
   getClientConfig,
+  getClientConfigPromise,
   getSession,
-  initializeClientConfig,
+  ITokenResponse,
+  storeTokens,
 } from '@/lib/auth'
+import { requestLogger } from '@lib/logger'
+import { timed, withRouteMetrics } from '@lib/metrics'
 import { NextRequest } from 'next/server'
 
-export async function GET(request: NextRequest): Promise<Response> {
+export const GET = (request: NextRequest) =>
+  withRouteMetrics('/auth/callback', () => callback(request))
+
+async function callback(request: NextRequest): Promise<Response> {
+  const log = requestLogger('/auth/callback')
   const session = await getSession()
   const issuer = await getClientConfig()
   const customFetch = await createCustomFetch()
-  const clientConfig = await initializeClientConfig()
+  const clientConfig = await getClientConfigPromise()
 
   try {
     // Get the authorization code from the URL
@@ -19,9 +27,8 @@ export async function GET(request: NextRequest): Promise<Response> {
 
     if (!code) throw new Error('No authorization code received')
 
-    console.log('Exchanging code for tokens using mTLS...')
     const tokenEndpoint = issuer.serverMetadata().token_endpoint
-    console.log('Token endpoint:', tokenEndpoint)
+    log.debug('Exchanging code for tokens', { tokenEndpoint })
 
     if (!tokenEndpoint) throw new Error('No token endpoint in discovery')
 
@@ -33,11 +40,13 @@ export async function GET(request: NextRequest): Promise<Response> {
       code_verifier: session.code_verifier || '',
     }).toString()
 
-    const tokenResponse = await customFetch(tokenEndpoint, {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
-      body,
-    })
+    const tokenResponse = await timed('tokenExchange', () =>
+      customFetch(tokenEndpoint, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
+        body,
+      }),
+    )
 
     if (!tokenResponse.ok) {
       const errorText = await tokenResponse.text()
@@ -46,19 +55,20 @@ export async function GET(request: NextRequest): Promise<Response> {
       )
     }
 
-    const tokenSet = (await tokenResponse.json()) as { access_token?: string }
+    const tokenSet = (await tokenResponse.json()) as ITokenResponse
+    if (!tokenSet.access_token)
+      throw new Error('Access token missing from token response')
 
-    // Store tokens in session
-    session.access_token = tokenSet.access_token
-    session.isLoggedIn = true
+    // Store tokens in session, with the refresh token and expiry
+    storeTokens(session, { ...tokenSet, access_token: tokenSet.access_token })
     await session.save()
 
-    console.log('Token exchange successful')
+    log.info('Token exchange succeeded')
 
     // Redirect to post-login route
     return Response.redirect(clientConfig.post_login_route)
   } catch (error) {
-    console.error('Callback error:', error)
+    log.error('Callback failed', { error })
     return new Response(
       JSON.stringify({
         error: 'Authentication callback error',
@@ -1,13 +1,19 @@
 import { generateAuthUrl, getSession } from '@lib/auth'
+import { createLogger } from '@lib/logger'
+import { withRouteMetrics } from '@lib/metrics'
 
-export async function GET(): Promise<Response> {
+const log = createLogger('/auth/login')
+
+export const GET = () => withRouteMetrics('/auth/login', login)
+
+async function login(): Promise<Response> {
   const session = await getSession()
 
   try {
     const authUrl = await generateAuthUrl(session)
     return Response.redirect(authUrl)
   } catch (error) {
-    console.error('Login error:', error)
+    log.error('Login failed', { error })
     return new Response(
       JSON.stringify({
         error: 'Authentication error',
@@ -1,4 +1,4 @@
-import { getClientConfig, getSession } from '@/lib/auth'
+import { clearTokens, getClientConfig, getSession } from '@/lib/auth'
 
 export async function GET(): Promise<Response> {
   const session = await getSession()
@@ -7,8 +7,7 @@ export async function GET(): Promise<Response> {
   const postLoggedOutRoute: string = '/logged-out'
 
   // Clear session
-  session.isLoggedIn = false
-  session.access_token = undefined
+  clearTokens(session)
   session.code_verifier = undefined
   await session.save()
 
@@ -1,35 +1,44 @@
 import { NextRequest } from 'next/server'
 
+import { getCertificateAttributes, ICertificateAttributes } from '@lib/ib1Cert'
+import { requestLogger } from '@lib/logger'
+import { timed, withRouteMetrics } from '@lib/metrics'
+import { getMessageIngestion } from '@lib/messageIngestion'
 import {
-  decodeApplication,
-  decodeMember,
-  decodeRoles,
-  parseCertificateFromHeader,
-} from '@lib/ib1Cert'
+  isRevocationSender,
+  recordRevocation,
+  revocationIdentifiers,
+  startRevocationSync,
+  TOKEN_REVOCATION_MESSAGE,
+} from '@lib/revocationIndex'
 
-const jsonResponse = (body: object, status = 200) =>
+const jsonResponse = (
+  body: object,
+  status = 200,
+  headers: Record<string, string> = {},
+) =>
   new Response(JSON.stringify(body), {
     status,
-    headers: { 'Content-Type': 'application/json' },
+    headers: { 'Content-Type': 'application/json', ...headers },
   })
 
-export async function POST(request: NextRequest): Promise<Response> {
+export const POST = (request: NextRequest) =>
+  withRouteMetrics('/perseus/messages', () => receiveMessage(request))
+
+async function receiveMessage(request: NextRequest): Promise<Response> {
+  const log = requestLogger('/perseus/messages')
+
   // 1. Read the client certificate from the mTLS header
   const certHeader = request.headers.get('X-Amzn-Mtls-Clientcert-Leaf')
   if (!certHeader)
     return jsonResponse({ error: 'No client certificate provided' }, 403)
 
   // 2. Parse certificate and extract sender attributes
-  let application: string
-  let member: string
-  let roles: string[]
+  let sender: ICertificateAttributes
   try {
-    const cert = parseCertificateFromHeader(certHeader)
-    application = decodeApplication(cert)
-    member = decodeMember(cert)
-    roles = decodeRoles(cert)
+    sender = getCertificateAttributes(certHeader)
   } catch (error) {
-    console.error('Certificate parsing error:', error)
+    log.warn('Certificate parsing failed', { error })
     return jsonResponse(
       {
         error: 'Invalid client certificate',
@@ -50,13 +59,58 @@ export async function POST(request: NextRequest): Promise<Response> {
   if (!body['ib1:message'])
     return jsonResponse({ error: 'Missing required field: ib1:message' }, 400)
 
-  // 4. Enrich the message with sender information from the certificate
-  const enrichedMessage = {
-    ...body,
-    sender: { application, member, roles },
+  // 4. Revocations take effect in the index before the message is queued
+  if (body['ib1:message'] === TOKEN_REVOCATION_MESSAGE) {
+    if (!isRevocationSender(sender)) {
+      log.warn('Revocation from a sender that is not an issuer', {
+        application: sender.application,
+      })
+      return jsonResponse({ error: 'Sender may not revoke tokens' }, 403)
+    }
+
+    const revokedIds = revocationIdentifiers(body)
+    if (!revokedIds.length)
+      return jsonResponse(
+        { error: 'Revocation message has no token_id, jti or grant_id' },
+        400,
+      )
+
+    // Acknowledge only once other tasks can see it, so the sender retries
+    try {
+      await timed('revocation', async () => {
+        await startRevocationSync()
+        await recordRevocation(revokedIds)
+      })
+    } catch (error) {
+      log.error('Failed to share revocation', { error })
+      return jsonResponse(
+        { error: 'Revocation could not be recorded, retry later' },
+        503,
+        { 'Retry-After': '1' },
+      )
+    }
+  }
+
+  // 5. Enrich the message with sender information from the certificate
+  const enrichedMessage = { ...body, sender }
+
+  // 6. Queue for batched delivery to the durable sink; shed load when full
+  const id = getMessageIngestion().enqueue(enrichedMessage)
+  if (!id) {
+    log.warn('Message queue full; shedding load')
+    return jsonResponse(
+      { error: 'Message queue is full, retry later' },
+      503,
+      { 'Retry-After': '1' },
+    )
   }
 
-  console.log('Received IB1 message:', JSON.stringify(enrichedMessage, null, 2))
+  log.info('Message accepted', {
+    id,
+    type: body['ib1:message'],
+    sender: sender.application,
+  })
+  log.debug('Message payload', () => ({ message: enrichedMessage }))
 
-  return jsonResponse({ status: 'ok' })
+  return jsonResponse({ status: 'ok', id })
 }
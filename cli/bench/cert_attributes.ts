@@ -0,0 +1,66 @@
+import { GCProfiler } from 'v8'
+
+import {
+  clearCertificateAttributeCache,
+  decodeCertificateAttributes,
+  getCertificateAttributes,
+  parseCertificateFromHeader,
+} from '../../lib/ib1Cert'
+import { createTestPki } from './pki'
+
+// Usage: npm run bench:cert [messages] [senders]
+const messages = Number(process.argv[2] ?? 20000)
+const senders = Number(process.argv[3] ?? 24)
+
+const pki = createTestPki(senders)
+// Header values as injected by the ALB: URL-encoded leaf PEM
+const headers = pki.clients.map(client => encodeURIComponent(client.cert))
+
+// Parse and decode the certificate on every message, without the cache
+const uncached = (header: string) =>
+  decodeCertificateAttributes(parseCertificateFromHeader(header))
+
+const measure = (mode: string, decode: (header: string) => object) => {
+  const profiler = new GCProfiler()
+  const heapBefore = process.memoryUsage().heapUsed
+  profiler.start()
+  const started = performance.now()
+
+  for (let i = 0; i < messages; i++) decode(headers[i % headers.length])
+
+  const elapsedMs = performance.now() - started
+  const heapAfter = process.memoryUsage().heapUsed
+  const { statistics } = profiler.stop()
+
+  // Bytes allocated = growth of the live heap plus everything GC reclaimed
+  const reclaimed = statistics.reduce(
+    (total, gc) =>
+      total +
+      gc.beforeGC.heapStatistics.usedHeapSize -
+      gc.afterGC.heapStatistics.usedHeapSize,
+    0,
+  )
+  const allocatedBytes = heapAfter - heapBefore + reclaimed
+
+  return {
+    mode,
+    messages,
+    senders,
+    messagesPerSecond: Math.round((messages / elapsedMs) * 1000),
+    allocatedBytesPerMessage: Math.round(allocatedBytes / messages),
+    gcRuns: statistics.length,
+  }
+}
+
+const results = [
+  measure('uncached', uncached),
+  measure('cold-cache', header => {
+    // Every message misses: the decode plus hashing and cache upkeep
+    clearCertificateAttributeCache()
+    return getCertificateAttributes(header)
+  }),
+  measure('warm-cache', getCertificateAttributes),
+]
+
+console.log(JSON.stringify(results, null, 2))
+pki.cleanup()
@@ -0,0 +1,80 @@
+import { createServer } from 'http'
+import { AddressInfo } from 'net'
+
+import { initializeClientConfig } from '../../lib/clientConfig'
+import {
+  getDiscoveryCacheStats,
+  getDiscoveryConfiguration,
+} from '../../lib/discoveryCache'
+
+// Usage: npm run bench:discovery [seconds] [concurrency] [max-age seconds]
+const durationSeconds = Number(process.argv[2] ?? 10)
+const concurrency = Number(process.argv[3] ?? 32)
+const maxAgeSeconds = Number(process.argv[4] ?? 2)
+
+let discoveryFetches = 0
+
+// Stub authorisation server serving only the discovery document
+const server = createServer((req, res) => {
+  if (req.url !== '/.well-known/oauth-authorization-server') {
+    res.statusCode = 404
+    res.end()
+    return
+  }
+  discoveryFetches++
+  const issuer = `http://localhost:${(server.address() as AddressInfo).port}`
+  res.setHeader('Content-Type', 'application/json')
+  res.setHeader(
+    'Cache-Control',
+    `max-age=${maxAgeSeconds}, stale-while-revalidate=${maxAgeSeconds * 5}`,
+  )
+  res.end(
+    JSON.stringify({
+      issuer,
+      authorization_endpoint: `${issuer}/authorize`,
+      token_endpoint: `${issuer}/token`,
+      pushed_authorization_request_endpoint: `${issuer}/par`,
+    }),
+  )
+})
+await new Promise<void>(resolve => server.listen(0, '127.0.0.1', resolve))
+const { port } = server.address() as AddressInfo
+
+const clientConfig = await initializeClientConfig({
+  server: new URL(`http://localhost:${port}`),
+  client_id: 'bench-client',
+  mtlsKey: 'unused',
+  mtlsBundle: 'unused',
+})
+
+let calls = 0
+const deadline = performance.now() + durationSeconds * 1000
+const worker = async () => {
+  while (performance.now() < deadline) {
+    await getDiscoveryConfiguration(clientConfig)
+    calls++
+    // Yield so the stub server can answer background refreshes
+    await new Promise(resolve => setImmediate(resolve))
+  }
+}
+await Promise.all(Array.from({ length: concurrency }, worker))
+
+const ttlWindows = Math.ceil(durationSeconds / maxAgeSeconds)
+console.log(
+  JSON.stringify(
+    {
+      durationSeconds,
+      concurrency,
+      maxAgeSeconds,
+      calls,
+      discoveryFetches,
+      ttlWindows,
+      fetchesPerTtlWindow: Number((discoveryFetches / ttlWindows).toFixed(2)),
+      cache: getDiscoveryCacheStats(),
+    },
+    null,
+    2,
+  ),
+)
+
+server.close()
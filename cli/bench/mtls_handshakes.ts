@@ -0,0 +1,94 @@
+import { createServer } from 'https'
+import { AddressInfo } from 'net'
+import * as undici from 'undici'
+
+import {
+  closeMtlsAgents,
+  createCustomFetch,
+  initializeClientConfig,
+} from '../../lib/clientConfig'
+import { createTestPki } from './pki'
+
+// Usage: npm run bench:mtls [requests] [concurrency]
+const requests = Number(process.argv[2] ?? 1000)
+const concurrency = Number(process.argv[3] ?? 16)
+
+const pki = createTestPki()
+let handshakes = 0
+
+// Local mTLS stand-in for the auth and data servers
+const server = createServer(
+  {
+    key: pki.serverKey,
+    cert: pki.serverCert,
+    ca: pki.caCert,
+    requestCert: true,
+    rejectUnauthorized: true,
+  },
+  (_req, res) => {
+    res.setHeader('Content-Type', 'application/json')
+    res.end('{"data":[]}')
+  },
+)
+server.on('secureConnection', () => handshakes++)
+await new Promise<void>(resolve => server.listen(0, '127.0.0.1', resolve))
+const { port } = server.address() as AddressInfo
+const url = `https://localhost:${port}/datasources/`
+
+const clientConfig = await initializeClientConfig({
+  server: new URL(url),
+  client_id: 'bench-client',
+  mtlsKey: pki.clientKey,
+  mtlsBundle: pki.clientBundle,
+  caBundle: pki.caCert,
+})
+
+const run = async (mode: string, request: () => Promise<void>) => {
+  handshakes = 0
+  let next = 0
+  const started = performance.now()
+  const worker = async () => {
+    while (next++ < requests) await request()
+  }
+  await Promise.all(Array.from({ length: concurrency }, worker))
+  const elapsedMs = performance.now() - started
+  return {
+    mode,
+    requests,
+    concurrency,
+    handshakes,
+    handshakesPer1000: Math.round((handshakes / requests) * 1000),
+    elapsedMs: Math.round(elapsedMs),
+    requestsPerSecond: Math.round((requests / elapsedMs) * 1000),
+  }
+}
+
+// Previous behaviour: a fresh Agent (and so a fresh TLS session) per request
+const before = await run('agent-per-request', async () => {
+  const agent = new undici.Agent({
+    connect: {
+      key: clientConfig.mtlsKey,
+      cert: clientConfig.mtlsBundle,
+      ca: clientConfig.caBundle,
+    },
+  })
+  try {
+    const response = await undici.fetch(url, { dispatcher: agent })
+    await response.arrayBuffer()
+  } finally {
+    await agent.close()
+  }
+})
+
+// Current behaviour: createCustomFetch per request, as the route handlers do
+const after = await run('pooled-agent', async () => {
+  const customFetch = await createCustomFetch(clientConfig)
+  const response = await customFetch(url)
+  await response.arrayBuffer()
+})
+
+console.log(JSON.stringify({ before, after }, null, 2))
+
+await closeMtlsAgents()
+server.close()
+pki.cleanup()
@@ -0,0 +1,87 @@
+import { execFileSync } from 'child_process'
+import { mkdtempSync, readFileSync, rmSync, writeFileSync } from 'fs'
+import { tmpdir } from 'os'
+import { join } from 'path'
+
+export interface ITestClient {
+  key: string
+  cert: string
+}
+
+export interface ITestPki {
+  caCert: string
+  serverKey: string
+  serverCert: string
+  clientKey: string
+  clientBundle: string
+  clients: ITestClient[]
+  cleanup: () => void
+}
+
+// Client certificates carry the IB1 member and roles extensions decoded by
+// lib/ib1Cert.ts, alongside the application URL in the SAN
+const clientExtensions = (name: string) =>
+  [
+    'extendedKeyUsage=clientAuth',
+    `subjectAltName=URI:https://directory.example.org/a/${name}`,
+    `1.3.6.1.4.1.62329.1.3=ASN1:UTF8String:https://directory.example.org/m/${name}`,
+    '1.3.6.1.4.1.62329.1.1=ASN1:SEQUENCE:ib1_roles',
+    '',
+    '[ib1_roles]',
+    'role.0=UTF8String:https://registry.example.org/roles/message-sender',
+    '',
+  ].join('\n')
+
+const openssl = (cwd: string, args: string) =>
+  execFileSync('openssl', args.split(' '), { cwd, stdio: 'pipe' })
+
+const issue = (cwd: string, name: string, subject: string, ext: string) => {
+  writeFileSync(join(cwd, `${name}.ext`), ext)
+  openssl(cwd, `ecparam -name prime256v1 -genkey -noout -out ${name}-key.pem`)
+  openssl(
+    cwd,
+    `req -new -key ${name}-key.pem -subj ${subject} -out ${name}.csr`,
+  )
+  openssl(
+    cwd,
+    `x509 -req -in ${name}.csr -CA ca.pem -CAkey ca-key.pem -CAcreateserial ` +
+      `-days 1 -sha256 -extfile ${name}.ext -out ${name}.pem`,
+  )
+}
+
+/**
+ * Generate a throwaway CA, a localhost server certificate and one or more
+ * client certificates with openssl, so benchmarks can run against a local
+ * mTLS stand-in without directory-issued certificates.
+ */
+export const createTestPki = (clientCount = 1): ITestPki => {
+  const dir = mkdtempSync(join(tmpdir(), 'perseus-bench-pki-'))
+  openssl(dir, 'ecparam -name prime256v1 -genkey -noout -out ca-key.pem')
+  openssl(
+    dir,
+    'req -x509 -new -key ca-key.pem -days 1 -subj /CN=perseus-bench-ca -out ca.pem',
+  )
+  issue(
+    dir,
+    'server',
+    '/CN=localhost',
+    'subjectAltName=DNS:localhost,IP:127.0.0.1\n',
+  )
+  const read = (name: string) => readFileSync(join(dir, name), 'utf8')
+
+  const clients = Array.from({ length: clientCount }, (_, index) => {
+    const name = `client${index}`
+    issue(dir, name, `/CN=perseus-bench-${name}`, clientExtensions(name))
+    return { key: read(`${name}-key.pem`), cert: read(`${name}.pem`) }
+  })
+
+  return {
+    caCert: read('ca.pem'),
+    serverKey: read('server-key.pem'),
+    serverCert: read('server.pem'),
+    clientKey: clients[0].key,
+    clientBundle: clients[0].cert + read('ca.pem'),
+    clients,
+    cleanup: () => rmSync(dir, { recursive: true, force: true }),
+  }
+}
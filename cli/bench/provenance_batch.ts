@@ -0,0 +1,96 @@
+import { createServer, IncomingMessage } from 'http'
+import { AddressInfo } from 'net'
+
+import { createProvenanceClient } from '../../lib/provenanceClient'
+
+// Usage: npm run bench:provenance [records] [batch size] [concurrency]
+//
+// Signs the same records against a stub provenance service twice: once with
+// its batch endpoint and once without, where the client falls back to one
+// request per record. SIGN_LATENCY_MS stands in for the KMS Sign round trip
+// and REQUEST_LATENCY_MS for the per-request overhead of reaching a task.
+const recordCount = Number(process.argv[2] ?? 500)
+const batchSize = Number(process.argv[3] ?? 25)
+const concurrency = Number(process.argv[4] ?? 4)
+const signLatencyMs = Number(process.env.SIGN_LATENCY_MS ?? 2)
+const requestLatencyMs = Number(process.env.REQUEST_LATENCY_MS ?? 5)
+
+const BATCH_PATH = '/api/v1/sign/cap/batch'
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms))
+
+const readBody = async (req: IncomingMessage) => {
+  const parts: Buffer[] = []
+  for await (const part of req) parts.push(part as Buffer)
+  return JSON.parse(Buffer.concat(parts).toString('utf8'))
+}
+
+const startStub = async (batchEndpoint: boolean) => {
+  const counts = { requests: 0, signatures: 0 }
+  const sign = async (record: object) => {
+    counts.signatures++
+    await sleep(signLatencyMs)
+    return { ...record, signature: 'stub' }
+  }
+
+  const server = createServer(async (req, res) => {
+    counts.requests++
+    const body = await readBody(req)
+    await sleep(requestLatencyMs)
+    res.setHeader('Content-Type', 'application/json')
+    if (req.url === '/api/v1/sign/cap')
+      return res.end(JSON.stringify(await sign(body)))
+    if (req.url === BATCH_PATH && batchEndpoint) {
+      // The service signs a batch's records concurrently, KMS permitting
+      const results = await Promise.all(body.records.map(sign))
+      return res.end(JSON.stringify({ results }))
+    }
+    res.statusCode = 404
+    res.end('{}')
+  })
+  await new Promise<void>(resolve => server.listen(0, '127.0.0.1', resolve))
+  const { port } = server.address() as AddressInfo
+  return { server, counts, url: new URL(`http://127.0.0.1:${port}`) }
+}
+
+const records = Array.from({ length: recordCount }, (_, index) => ({
+  cap_account: `account-${index}`,
+}))
+
+const run = async (batchEndpoint: boolean) => {
+  const stub = await startStub(batchEndpoint)
+  const client = createProvenanceClient(stub.url, {
+    batchSize,
+    concurrency,
+    timeoutMs: 30_000,
+    batchPath: BATCH_PATH,
+  })
+  const startedAt = performance.now()
+  const results = await client.signCapRecords(records)
+  const elapsedMs = performance.now() - startedAt
+  await client.close()
+  stub.server.close()
+  return {
+    batchEndpoint,
+    elapsedMs: Math.round(elapsedMs),
+    recordsPerSecond: Math.round((recordCount / elapsedMs) * 1000),
+    failed: results.filter(result => !result.ok).length,
+    stubRequests: stub.counts.requests,
+    client: client.stats(),
+  }
+}
+
+console.log(
+  JSON.stringify(
+    {
+      recordCount,
+      batchSize,
+      concurrency,
+      signLatencyMs,
+      requestLatencyMs,
+      runs: [await run(true), await run(false)],
+    },
+    null,
+    2,
+  ),
+)
@@ -0,0 +1,63 @@
+import { randomUUID } from 'crypto'
+
+import {
+  clearRevocations,
+  isRevoked,
+  recordRevocation,
+  tokenIdentifiers,
+} from '../../lib/revocationIndex'
+
+// Usage: npm run bench:revocation [checks] [revoked]
+const checks = Number(process.argv[2] ?? 5_000_000)
+const revokedCount = Number(process.argv[3] ?? 10_000)
+
+const encode = (value: object) =>
+  Buffer.from(JSON.stringify(value)).toString('base64url')
+
+// Unsigned JWT-shaped tokens; only the claims matter for the lookup
+const sessions = Array.from({ length: 1024 }, () => {
+  const token = [
+    encode({ alg: 'none' }),
+    encode({ jti: randomUUID(), grant_id: randomUUID(), sub: 'bench' }),
+    'signature',
+  ].join('.')
+  return { access_token: token, token_ids: tokenIdentifiers(token) }
+})
+
+const measure = (mode: string, check: (index: number) => boolean) => {
+  let hits = 0
+  // Warm up so the JIT has optimised the check before timing it
+  for (let i = 0; i < 100_000; i++) if (check(i & 1023)) hits++
+  hits = 0
+
+  const started = process.hrtime.bigint()
+  for (let i = 0; i < checks; i++) if (check(i & 1023)) hits++
+  const elapsedNs = Number(process.hrtime.bigint() - started)
+
+  return {
+    mode,
+    checks,
+    hits,
+    nsPerCheck: Number((elapsedNs / checks).toFixed(1)),
+  }
+}
+
+const results = []
+clearRevocations()
+results.push(measure('empty-index', i => isRevoked(sessions[i].token_ids)))
+
+await recordRevocation(Array.from({ length: revokedCount }, () => randomUUID()))
+// Revoke one session in 64 so both hits and misses are exercised
+await recordRevocation(
+  sessions.filter((_, i) => i % 64 === 0).map(s => s.token_ids[0]),
+)
+results.push(
+  measure(`${revokedCount}-revoked`, i => isRevoked(sessions[i].token_ids)),
+)
+results.push(
+  measure(`${revokedCount}-revoked-decode-token`, i =>
+    isRevoked(tokenIdentifiers(sessions[i].access_token)),
+  ),
+)
+
+console.log(JSON.stringify(results, null, 2))
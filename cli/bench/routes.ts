@@ -0,0 +1,223 @@
+import { execFileSync } from 'child_process'
+import { writeFileSync } from 'fs'
+
+import { createTestPki } from './pki'
+
+// Drives a mix of app routes against a running app wired to the stub servers
+// (see `npm run bench:stubs` and the `bench` profile in compose.yml).
+//
+//   npm run bench:routes [seconds] [concurrency] [base-url]
+//
+// Results are printed as JSON and also written to BENCH_OUTPUT if set, so
+// runs from different commits can be compared. BENCH_ROUTES limits the mix
+// to a comma-separated list of routes, e.g. BENCH_ROUTES=login.
+const durationSeconds = Number(process.argv[2] ?? 30)
+const concurrency = Number(process.argv[3] ?? 16)
+const baseUrl = process.argv[4] ?? 'http://localhost:3000'
+
+type Route = 'login' | 'callback' | 'getData' | 'messages'
+
+// Relative weight of each route in the traffic mix
+const WEIGHTS: Array<[Route, number]> = [
+  ['getData', 50],
+  ['messages', 30],
+  ['login', 10],
+  ['callback', 10],
+]
+const onlyRoutes = process.env.BENCH_ROUTES?.split(',')
+const MIX = WEIGHTS.filter(
+  ([route]) => !onlyRoutes || onlyRoutes.includes(route),
+)
+const totalWeight = MIX.reduce((total, [, weight]) => total + weight, 0)
+
+const pickRoute = (): Route => {
+  let roll = Math.random() * totalWeight
+  for (const [route, weight] of MIX) if ((roll -= weight) < 0) return route
+  return MIX[0][0]
+}
+
+const pki = createTestPki(8)
+const certHeaders = pki.clients.map(client => encodeURIComponent(client.cert))
+
+interface IRouteSamples {
+  latencies: number[]
+  errors: number
+  statuses: Record<string, number>
+}
+
+const samples = Object.fromEntries(
+  WEIGHTS.map(([route]) => [
+    route,
+    { latencies: [], errors: 0, statuses: {} },
+  ]),
+) as Record<Route, IRouteSamples>
+
+const isRedirect = (status: number) => status >= 301 && status <= 308
+
+// Sign-ins forced by the data server rejecting an expired session's token
+let reLogins = 0
+
+// One virtual user with its own iron-session cookie
+const createUser = (index: number) => {
+  let cookie = ''
+  let loggedIn = false
+  let lastStatus = ''
+
+  const send = async (
+    route: Route,
+    path: string,
+    ok: (status: number) => boolean,
+    init: RequestInit = {},
+    record = true,
+  ) => {
+    const started = performance.now()
+    let status = 'network-error'
+    try {
+      const response = await fetch(new URL(path, baseUrl), {
+        redirect: 'manual',
+        ...init,
+        headers: { ...init.headers, ...(cookie ? { Cookie: cookie } : {}) },
+      })
+      await response.arrayBuffer()
+      status = String(response.status)
+      const setCookie = response.headers
+        .getSetCookie()
+        .map(value => value.split(';')[0])
+      if (setCookie.length) cookie = setCookie.join('; ')
+      if (!ok(response.status)) throw new Error(status)
+      return true
+    } catch {
+      if (record) samples[route].errors++
+      return false
+    } finally {
+      lastStatus = status
+      if (record) {
+        samples[route].latencies.push(performance.now() - started)
+        samples[route].statuses[status] =
+          (samples[route].statuses[status] ?? 0) + 1
+      }
+    }
+  }
+
+  const requests: Record<Route, (record?: boolean) => Promise<boolean>> = {
+    login: record => send('login', '/auth/login', isRedirect, {}, record),
+    callback: async record => {
+      loggedIn = await send(
+        'callback',
+        `/auth/callback?code=bench-${index}-${Date.now()}`,
+        isRedirect,
+        {},
+        record,
+      )
+      return loggedIn
+    },
+    getData: record =>
+      send('getData', '/api/getData', status => status === 200, {}, record),
+    messages: record =>
+      send(
+        'messages',
+        '/perseus/messages',
+        status => status === 200,
+        {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+            'X-Amzn-Mtls-Clientcert-Leaf':
+              certHeaders[index % certHeaders.length],
+          },
+          body: JSON.stringify({
+            'ib1:message': 'urn:ib1:bench:event:load-test',
+            sequence: index,
+          }),
+        },
+        record,
+      ),
+  }
+
+  return {
+    async warmUp() {
+      for (const [route] of MIX) await requests[route](false)
+    },
+    async run(deadline: number) {
+      while (performance.now() < deadline) {
+        const route = pickRoute()
+        // Reading data needs a session; log in first as a real user would
+        if (route === 'getData' && !loggedIn) {
+          await requests.login()
+          await requests.callback()
+        }
+        await requests[route]()
+        if (route === 'getData' && loggedIn && lastStatus === '401') {
+          loggedIn = false
+          reLogins++
+        }
+      }
+    },
+  }
+}
+
+const percentile = (sorted: number[], p: number) =>
+  sorted.length
+    ? sorted[Math.min(sorted.length - 1, Math.ceil(p * sorted.length) - 1)]
+    : 0
+
+const round = (value: number) => Number(value.toFixed(2))
+
+const gitCommit = () => {
+  try {
+    return execFileSync('git', ['rev-parse', '--short', 'HEAD'], {
+      stdio: ['ignore', 'pipe', 'ignore'],
+    })
+      .toString()
+      .trim()
+  } catch {
+    return undefined
+  }
+}
+
+const users = Array.from({ length: concurrency }, (_, i) => createUser(i))
+// Compile and prime each route (and each user's session) before timing
+await Promise.all(users.map(user => user.warmUp()))
+
+const started = performance.now()
+await Promise.all(users.map(user => user.run(started + durationSeconds * 1000)))
+const elapsedSeconds = (performance.now() - started) / 1000
+
+const summary = (route: Route) => {
+  const { latencies, errors, statuses } = samples[route]
+  const sorted = [...latencies].sort((a, b) => a - b)
+  return {
+    requests: sorted.length,
+    errors,
+    statuses,
+    throughputPerSecond: round(sorted.length / elapsedSeconds),
+    latencyMs: {
+      p50: round(percentile(sorted, 0.5)),
+      p95: round(percentile(sorted, 0.95)),
+      p99: round(percentile(sorted, 0.99)),
+      max: round(sorted[sorted.length - 1] ?? 0),
+    },
+  }
+}
+
+const routes = Object.fromEntries(MIX.map(([route]) => [route, summary(route)]))
+const totalRequests = Object.values(routes).reduce(
+  (total, route) => total + route.requests,
+  0,
+)
+const result = {
+  commit: gitCommit(),
+  startedAt: new Date(Date.now() - elapsedSeconds * 1000).toISOString(),
+  baseUrl,
+  durationSeconds: round(elapsedSeconds),
+  concurrency,
+  mix: Object.fromEntries(MIX),
+  throughputPerSecond: round(totalRequests / elapsedSeconds),
+  reLogins,
+  routes,
+}
+
+const output = JSON.stringify(result, null, 2)
+console.log(output)
+if (process.env.BENCH_OUTPUT) writeFileSync(process.env.BENCH_OUTPUT, output)
+pki.cleanup()
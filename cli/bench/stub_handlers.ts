@@ -0,0 +1,159 @@
+import { randomUUID } from 'crypto'
+import { IncomingMessage, ServerResponse } from 'http'
+import type { TLSSocket } from 'tls'
+
+// Request handlers for the stub authorisation and data servers. They serve
+// plain HTTP for bench:routes (stub_servers.ts) and mTLS for `npm run load
+// -- --stub`, which mounts them on https servers.
+
+export interface IStubOptions {
+  // Fixed delay added to every response
+  latencyMs: number
+  // Lifetime of the access tokens the auth stub issues
+  tokenTtlSeconds: number
+}
+
+export type StubHandler = (
+  req: IncomingMessage,
+  res: ServerResponse,
+) => Promise<void>
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms))
+
+const encode = (value: object) =>
+  Buffer.from(JSON.stringify(value)).toString('base64url')
+
+const readForm = async (req: IncomingMessage) => {
+  const parts: Buffer[] = []
+  for await (const part of req) parts.push(part as Buffer)
+  return new URLSearchParams(Buffer.concat(parts).toString('utf8'))
+}
+
+const origin = (req: IncomingMessage) => {
+  const protocol = (req.socket as TLSSocket).encrypted ? 'https' : 'http'
+  return `${protocol}://${req.headers.host}`
+}
+
+const createSendJson =
+  ({ latencyMs }: Pick<IStubOptions, 'latencyMs'>) =>
+  async (res: ServerResponse, body: object, status = 200) => {
+    await sleep(latencyMs)
+    res.statusCode = status
+    res.setHeader('Content-Type', 'application/json')
+    res.end(JSON.stringify(body))
+  }
+
+/**
+ * Stub authorisation server: discovery, PAR and a token endpoint. Requests
+ * are not validated: any client, code or refresh token is accepted. Access
+ * tokens carry an `exp` claim, which the data stub does check. `grants`
+ * counts the tokens issued per grant type and is served on `/stats`.
+ */
+export const createAuthStub = (options: IStubOptions) => {
+  const sendJson = createSendJson(options)
+  const grants = { authorization_code: 0, refresh_token: 0 }
+
+  const handler: StubHandler = async (req, res) => {
+    const issuer = origin(req)
+    const path = new URL(req.url ?? '/', issuer).pathname
+    const form = await readForm(req)
+
+    if (path.startsWith('/.well-known/'))
+      return sendJson(res, {
+        issuer,
+        authorization_endpoint: `${issuer}/authorize`,
+        token_endpoint: `${issuer}/token`,
+        pushed_authorization_request_endpoint: `${issuer}/par`,
+        code_challenge_methods_supported: ['S256'],
+      })
+
+    if (path === '/par')
+      return sendJson(
+        res,
+        {
+          request_uri: `urn:ietf:params:oauth:request_uri:${randomUUID()}`,
+          expires_in: 60,
+        },
+        201,
+      )
+
+    if (path === '/token') {
+      const grantType =
+        form.get('grant_type') === 'refresh_token'
+          ? 'refresh_token'
+          : 'authorization_code'
+      grants[grantType]++
+      return sendJson(res, {
+        access_token: [
+          encode({ alg: 'none', typ: 'JWT' }),
+          encode({
+            jti: randomUUID(),
+            grant_id: randomUUID(),
+            sub: 'bench',
+            exp: Math.floor(Date.now() / 1000) + options.tokenTtlSeconds,
+          }),
+          'stub',
+        ].join('.'),
+        refresh_token: randomUUID(),
+        token_type: 'Bearer',
+        expires_in: options.tokenTtlSeconds,
+      })
+    }
+
+    if (path === '/stats') return sendJson(res, { grants })
+
+    return sendJson(res, { error: 'not_found' }, 404)
+  }
+
+  return { handler, grants }
+}
+
+const METERS = ['meter-1', 'meter-2'].map(id => ({
+  id,
+  availableMeasures: ['import', 'export'],
+}))
+
+const isExpired = (authorization = '') => {
+  const payload = authorization.replace(/^Bearer /, '').split('.')[1]
+  try {
+    const { exp } = JSON.parse(Buffer.from(payload, 'base64url').toString())
+    return typeof exp === 'number' && exp * 1000 <= Date.now()
+  } catch {
+    return false
+  }
+}
+
+/**
+ * Stub data server (EDP): `/datasources/` lists two meters and
+ * `/datasources/<meter>/<measure>?from&to` returns half-hourly readings.
+ * Expired access tokens get a 401.
+ */
+export const createDataStub = (
+  options: Pick<IStubOptions, 'latencyMs'>,
+): StubHandler => {
+  const sendJson = createSendJson(options)
+
+  return async (req, res) => {
+    const url = new URL(req.url ?? '/', origin(req))
+    const [, root, meter, measure] = url.pathname.split('/')
+    req.resume()
+
+    if (root !== 'datasources')
+      return sendJson(res, { error: 'not_found' }, 404)
+    if (isExpired(req.headers.authorization))
+      return sendJson(res, { error: 'invalid_token' }, 401)
+    if (!meter) return sendJson(res, { data: METERS })
+
+    // Half-hourly readings across the requested range
+    const from = Date.parse(url.searchParams.get('from') ?? '2024-12-05')
+    const to = Date.parse(url.searchParams.get('to') ?? '2024-12-06')
+    const readings = []
+    for (let at = from; at < to && readings.length < 20_000; at += 1_800_000)
+      readings.push({
+        timestamp: new Date(at).toISOString(),
+        value: Number((Math.random() * 2).toFixed(3)),
+      })
+
+    return sendJson(res, { meter, measure, data: readings })
+  }
+}
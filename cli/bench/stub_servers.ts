@@ -0,0 +1,46 @@
+import { mkdirSync, writeFileSync } from 'fs'
+import { createServer } from 'http'
+import { join } from 'path'
+
+import { createTestPki } from './pki'
+import { createAuthStub, createDataStub } from './stub_handlers'
+
+// Stub authorisation and data servers for bench:routes. Plain HTTP on purpose:
+// bench:mtls covers the handshake, this measures the app's own route costs.
+//
+//   npm run bench:stubs [auth-port] [data-port]
+//
+// STUB_LATENCY_MS adds a fixed delay to every upstream response,
+// STUB_TOKEN_TTL_SECONDS sets the access token lifetime and BENCH_CERT_DIR
+// receives a throwaway client key and bundle for the app.
+const authPort = Number(process.argv[2] ?? 8000)
+const dataPort = Number(process.argv[3] ?? 8010)
+const latencyMs = Number(process.env.STUB_LATENCY_MS ?? 20)
+const tokenTtlSeconds = Number(process.env.STUB_TOKEN_TTL_SECONDS ?? 3600)
+
+const pki = createTestPki()
+if (process.env.BENCH_CERT_DIR) {
+  mkdirSync(process.env.BENCH_CERT_DIR, { recursive: true })
+  writeFileSync(join(process.env.BENCH_CERT_DIR, 'key.pem'), pki.clientKey)
+  writeFileSync(
+    join(process.env.BENCH_CERT_DIR, 'bundle.pem'),
+    pki.clientBundle,
+  )
+}
+
+const auth = createAuthStub({ latencyMs, tokenTtlSeconds }).handler
+const data = createDataStub({ latencyMs })
+
+createServer(auth).listen(authPort, () =>
+  console.log(`Stub auth server on http://localhost:${authPort}`),
+)
+createServer(data).listen(dataPort, () =>
+  console.log(`Stub data server on http://localhost:${dataPort}`),
+)
+
+const shutdown = () => {
+  pki.cleanup()
+  process.exit(0)
+}
+process.on('SIGINT', shutdown)
+process.on('SIGTERM', shutdown)
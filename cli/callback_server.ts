@@ -2,6 +2,7 @@ import express from 'express'
 import * as client from 'openid-client'
 import { readFileSync } from 'fs'
 
+import { getProvenanceClient } from '../lib/provenanceClient'
 import { clientConfig as clientConfigPromise, customFetch } from './customFetch'
 import { config } from './config'
 
@@ -190,22 +191,14 @@ app.get('/callback', async (req, res) => {
         to_date: '2024-12-06',
       }
       console.log('✍️  Signing CAP record with provenance service')
-      const capRecordEncoded = await fetch(
-        new URL('/api/v1/sign/cap', config.provenanceServiceUrl),
-        {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-          },
-          body: JSON.stringify(capRecordRequest),
-        },
-      )
+      const [capRecordEncoded] = await getProvenanceClient(
+        config.provenanceServiceUrl.href,
+      ).signCapRecords([capRecordRequest])
       if (!capRecordEncoded.ok) {
-        const errorText = await capRecordEncoded.text()
-        console.error(
-          `Error signing cap record: ${capRecordEncoded.status} ${capRecordEncoded.statusText}`,
-        )
-        return res.status(500).send(`Error signing cap record: ${errorText}`)
+        console.error(`Error signing cap record: ${capRecordEncoded.status}`)
+        return res
+          .status(500)
+          .send(`Error signing cap record: ${capRecordEncoded.error}`)
       }
       console.log('✅ CAP record signed')
     }
@@ -0,0 +1,407 @@
+import { X509Certificate as PeculiarCertificate } from '@peculiar/x509'
+import { X509Certificate } from 'crypto'
+import { readdirSync, readFileSync, statSync } from 'fs'
+import { cpus } from 'os'
+import { join } from 'path'
+import { isMainThread, parentPort, Worker, workerData } from 'worker_threads'
+
+import type { ICertificateAttributes } from '../lib/ib1Cert'
+import { decodeCertificateAttributes } from '../lib/ib1Cert'
+
+// Bulk certificate audit for verify_certs.ts: parses and chain-verifies
+// certificates in-process (no openssl per check) across a pool of worker
+// threads, and checks the IB1 extensions of leaf certificates with
+// lib/ib1Cert.ts.
+//
+//   npx tsx verify_certs.ts <dir|file|glob>... [--trust <bundle>]...
+//     [--role <role url>]... [--workers <n>] [--at <ISO date>]
+
+export interface IAuditOptions {
+  // PEM bundles whose certificates are trust anchors. Without any, a chain
+  // must end at a self-signed certificate from the same file.
+  trustPems: string[]
+  // Roles every leaf certificate must hold
+  requiredRoles: string[]
+  // Time validity is checked at (ms since the epoch)
+  at: number
+}
+
+export interface ICertificateReport {
+  file: string
+  // Position of the certificate in its file
+  index: number
+  subject?: string
+  issuer?: string
+  serialNumber?: string
+  fingerprint256?: string
+  notAfter?: string
+  ca?: boolean
+  // Subjects from this certificate up to the anchor
+  chain: string[]
+  anchored: boolean
+  ib1?: ICertificateAttributes
+  problems: string[]
+  ok: boolean
+}
+
+export interface IAuditSummary {
+  files: number
+  certificates: number
+  ok: number
+  failed: number
+  workers: number
+  durationMs: number
+  certificatesPerSecond: number
+  // Failures by problem, so a large audit can be triaged at a glance
+  problems: Record<string, number>
+  reports: ICertificateReport[]
+}
+
+const PEM_PATTERN =
+  /-----BEGIN CERTIFICATE-----[\s\S]*?-----END CERTIFICATE-----/g
+const CERTIFICATE_EXTENSIONS = /\.(pem|crt|cer)$/i
+const GLOB_CHARACTERS = /[*?[]/
+// Files sent to a worker in one message
+const CHUNK_SIZE = 16
+// A worker takes longer to start than auditing this many files takes, so
+// smaller audits use fewer workers (and run in this thread below it)
+const FILES_PER_WORKER = 256
+
+const splitPems = (text: string) => text.match(PEM_PATTERN) ?? []
+
+const walk = (dir: string): string[] =>
+  readdirSync(dir, { withFileTypes: true }).flatMap(entry =>
+    entry.isDirectory() ? walk(join(dir, entry.name)) : [join(dir, entry.name)],
+  )
+
+const globPattern = (glob: string) =>
+  new RegExp(
+    `^${glob
+      .replace(/[.+^${}()|\\]/g, '\\$&')
+      .replace(/\*\*\//g, '\0')
+      .replace(/\*\*/g, '.*')
+      .replace(/\*/g, '[^/]*')
+      .replace(/\?/g, '[^/]')
+      .replace(/\0/g, '(?:.*/)?')}$`,
+  )
+
+/**
+ * Files to audit. Directories are searched recursively for .pem, .crt and
+ * .cer files. Globs (`*`, `**`, `?`) are expanded here as well as by the
+ * shell, so a quoted pattern such as '../deployment/truststores/*\/bundle.pem'
+ * works on any Node version.
+ */
+export const expandPaths = (paths: string[]) => {
+  const files = paths.flatMap(path => {
+    if (GLOB_CHARACTERS.test(path)) {
+      const segments = path.split('/')
+      const staticDepth = segments.findIndex(segment =>
+        GLOB_CHARACTERS.test(segment),
+      )
+      const base = segments.slice(0, staticDepth).join('/') || '.'
+      const pattern = globPattern(path)
+      if (!statSync(base, { throwIfNoEntry: false })?.isDirectory()) return []
+      return walk(base).filter(file =>
+        pattern.test(base === '.' ? file.replace(/^\.\//, '') : file),
+      )
+    }
+    // Missing files are kept, to be reported by the audit
+    return statSync(path, { throwIfNoEntry: false })?.isDirectory()
+      ? walk(path).filter(file => CERTIFICATE_EXTENSIONS.test(file))
+      : [path]
+  })
+  return [...new Set(files)].sort()
+}
+
+const isSelfSigned = (cert: X509Certificate) =>
+  cert.checkIssued(cert) && cert.verify(cert.publicKey)
+
+/**
+ * Audit certificates file by file. Anchors are parsed once, and so are
+ * signature checks against issuers: member bundles repeat the same
+ * intermediate, which is verified once per auditor.
+ */
+export const createAuditor = (options: IAuditOptions) => {
+  const anchors = options.trustPems
+    .flatMap(splitPems)
+    .map(pem => new X509Certificate(pem))
+  const anchorFingerprints = new Set(anchors.map(cert => cert.fingerprint256))
+  // `${subject fingerprint}|${issuer fingerprint}` -> signature valid
+  const signatures = new Map<string, boolean>()
+
+  const issuedBy = (cert: X509Certificate, issuer: X509Certificate) => {
+    if (!cert.checkIssued(issuer)) return false
+    const key = `${cert.fingerprint256}|${issuer.fingerprint256}`
+    let valid = signatures.get(key)
+    if (valid === undefined) {
+      valid = cert.verify(issuer.publicKey)
+      signatures.set(key, valid)
+    }
+    return valid
+  }
+
+  const isAnchor = (cert: X509Certificate) =>
+    anchors.length
+      ? anchorFingerprints.has(cert.fingerprint256)
+      : isSelfSigned(cert)
+
+  const validityProblems = (cert: X509Certificate, label: string) => {
+    const problems: string[] = []
+    if (Date.parse(cert.validFrom) > options.at)
+      problems.push(`${label} not yet valid`)
+    if (Date.parse(cert.validTo) < options.at) problems.push(`${label} expired`)
+    return problems
+  }
+
+  const auditCertificate = (
+    cert: X509Certificate,
+    pem: string,
+    pool: X509Certificate[],
+  ) => {
+    const chain = [cert.subject]
+    const problems = validityProblems(cert, 'certificate')
+    let current = cert
+    let anchored = isAnchor(cert)
+
+    // Walk up through issuers in the file and the anchors
+    while (!anchored && chain.length <= pool.length) {
+      const issuer = pool.find(
+        candidate =>
+          candidate.fingerprint256 !== current.fingerprint256 &&
+          candidate.ca &&
+          issuedBy(current, candidate),
+      )
+      if (!issuer) break
+      chain.push(issuer.subject)
+      problems.push(...validityProblems(issuer, 'issuer'))
+      current = issuer
+      anchored = isAnchor(issuer)
+    }
+    if (!anchored)
+      problems.push(
+        anchors.length
+          ? 'chain not anchored in trust bundle'
+          : 'chain has no root',
+      )
+
+    let ib1: ICertificateReport['ib1']
+    if (!cert.ca)
+      try {
+        ib1 = decodeCertificateAttributes(new PeculiarCertificate(pem))
+        const missing = options.requiredRoles.filter(
+          role => !ib1?.roles.includes(role),
+        )
+        if (missing.length) problems.push(`missing role ${missing.join(', ')}`)
+      } catch (error) {
+        problems.push(error instanceof Error ? error.message : String(error))
+      }
+
+    return { chain, anchored, ib1, problems }
+  }
+
+  const auditFile = (file: string): ICertificateReport[] => {
+    let pems: string[]
+    try {
+      pems = splitPems(readFileSync(file, 'utf8'))
+    } catch (error) {
+      const message = error instanceof Error ? error.message : String(error)
+      return [
+        {
+          file,
+          index: 0,
+          chain: [],
+          anchored: false,
+          problems: [message],
+          ok: false,
+        },
+      ]
+    }
+    if (!pems.length)
+      return [
+        {
+          file,
+          index: 0,
+          chain: [],
+          anchored: false,
+          problems: ['no certificates'],
+          ok: false,
+        },
+      ]
+
+    const parsed = pems.map(pem => {
+      try {
+        return new X509Certificate(pem)
+      } catch {
+        return undefined
+      }
+    })
+    const pool = [
+      ...parsed.filter((cert): cert is X509Certificate => Boolean(cert)),
+      ...anchors,
+    ]
+
+    return parsed.map((cert, index) => {
+      if (!cert)
+        return {
+          file,
+          index,
+          chain: [],
+          anchored: false,
+          problems: ['unparseable certificate'],
+          ok: false,
+        }
+      const { chain, anchored, ib1, problems } = auditCertificate(
+        cert,
+        pems[index],
+        pool,
+      )
+      return {
+        file,
+        index,
+        subject: cert.subject.replace(/\n/g, ', '),
+        issuer: cert.issuer.replace(/\n/g, ', '),
+        serialNumber: cert.serialNumber,
+        fingerprint256: cert.fingerprint256,
+        notAfter: new Date(cert.validTo).toISOString(),
+        ca: cert.ca,
+        chain: chain.map(subject => subject.replace(/\n/g, ', ')),
+        anchored,
+        ib1,
+        problems,
+        ok: problems.length === 0,
+      }
+    })
+  }
+
+  return { auditFile }
+}
+
+const auditInWorkers = (
+  files: string[],
+  options: IAuditOptions,
+  workers: number,
+) =>
+  new Promise<ICertificateReport[]>((resolve, reject) => {
+    const chunks: string[][] = []
+    for (let start = 0; start < files.length; start += CHUNK_SIZE)
+      chunks.push(files.slice(start, start + CHUNK_SIZE))
+    const reports: ICertificateReport[] = []
+    let finished = 0
+
+    for (let index = 0; index < workers; index++) {
+      const worker = new Worker(new URL(import.meta.url), {
+        workerData: { certAudit: options },
+      })
+      const next = () => {
+        const chunk = chunks.shift()
+        if (chunk) return worker.postMessage(chunk)
+        void worker.terminate()
+        if (++finished === workers) resolve(reports)
+      }
+      worker.on('message', (chunkReports: ICertificateReport[]) => {
+        reports.push(...chunkReports)
+        next()
+      })
+      worker.once('online', next)
+      worker.once('error', reject)
+    }
+  })
+
+/**
+ * Audit `files` with up to `workers` threads (in this thread when 1) and
+ * summarise the results, reports in file order.
+ */
+export const auditCertificates = async (
+  files: string[],
+  options: IAuditOptions,
+  workers: number,
+): Promise<IAuditSummary> => {
+  const startedAt = performance.now()
+  const workerCount = Math.max(
+    1,
+    Math.min(workers, Math.ceil(files.length / FILES_PER_WORKER)),
+  )
+  const reports =
+    workerCount === 1
+      ? files.flatMap(createAuditor(options).auditFile)
+      : await auditInWorkers(files, options, workerCount)
+  const durationMs = performance.now() - startedAt
+
+  reports.sort((a, b) => a.file.localeCompare(b.file) || a.index - b.index)
+  const problems: Record<string, number> = {}
+  reports.forEach(report =>
+    report.problems.forEach(
+      problem => (problems[problem] = (problems[problem] ?? 0) + 1),
+    ),
+  )
+  const ok = reports.filter(report => report.ok).length
+
+  return {
+    files: files.length,
+    certificates: reports.length,
+    ok,
+    failed: reports.length - ok,
+    workers: workerCount,
+    durationMs: Math.round(durationMs),
+    certificatesPerSecond: Math.round(
+      (reports.length / Math.max(durationMs, 1)) * 1000,
+    ),
+    problems,
+    reports,
+  }
+}
+
+const optionValues = (args: string[], name: string) =>
+  args.flatMap((arg, index) => (arg === name ? [args[index + 1]] : []))
+
+/**
+ * Run the bulk audit from verify_certs.ts arguments. Prints the summary as
+ * JSON on stdout and a one-line digest on stderr; returns the exit code.
+ */
+export const runBulkAudit = async (args: string[]) => {
+  const valued = ['--trust', '--role', '--workers', '--at']
+  const paths = args.filter(
+    (arg, index) => !valued.includes(arg) && !valued.includes(args[index - 1]),
+  )
+  const [workers] = optionValues(args, '--workers')
+  const [at] = optionValues(args, '--at')
+
+  const options: IAuditOptions = {
+    trustPems: expandPaths(optionValues(args, '--trust')).map(file =>
+      readFileSync(file, 'utf8'),
+    ),
+    requiredRoles: optionValues(args, '--role'),
+    at: at ? Date.parse(at) : Date.now(),
+  }
+  const files = expandPaths(paths)
+  if (!files.length) {
+    console.error('No certificate files found')
+    return 1
+  }
+
+  const summary = await auditCertificates(
+    files,
+    options,
+    workers ? Number(workers) : cpus().length,
+  )
+  // Flushed before returning: the caller exits, which would cut a piped
+  // summary short
+  await new Promise(resolve =>
+    process.stdout.write(`${JSON.stringify(summary, null, 2)}\n`, resolve),
+  )
+  console.error(
+    `${summary.failed ? '❌' : '✅'} ${summary.ok}/${summary.certificates} ` +
+      `certificates OK in ${summary.files} file(s), ` +
+      `${summary.certificatesPerSecond} certificates/s on ` +
+      `${summary.workers} worker(s)`,
+  )
+  return summary.failed ? 1 : 0
+}
+
+// Worker thread: audit each chunk of files it is sent
+if (!isMainThread && workerData?.certAudit) {
+  const { auditFile } = createAuditor(workerData.certAudit as IAuditOptions)
+  parentPort?.on('message', (files: string[]) =>
+    parentPort?.postMessage(files.flatMap(auditFile)),
+  )
+}
@@ -0,0 +1,108 @@
+/**
+ * Latency histogram laid out like HdrHistogram. Values are recorded as
+ * whole microseconds. Below 2048 µs each value has its own bucket. Above
+ * that, each power-of-two range is split into 1024 buckets, so a reported
+ * value is within 0.1% of the recorded one (three significant digits),
+ * whatever the range. Memory grows with the number of distinct buckets
+ * used, not with the number of samples.
+ */
+
+const SUB_BUCKET_BITS = 11
+const SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+
+export interface ILatencyHistogram {
+  // Record one latency in milliseconds
+  record(milliseconds: number): void
+  readonly count: number
+  // Latency (ms) at or below which `percent` of the samples fall
+  percentile(percent: number): number
+  summary(): ILatencySummary
+}
+
+export interface ILatencySummary {
+  count: number
+  latencyMs: {
+    min: number
+    mean: number
+    p50: number
+    p90: number
+    p95: number
+    p99: number
+    p999: number
+    max: number
+  }
+  // Non-empty buckets as [highest value in µs, count], in ascending order,
+  // so histograms from several runs can be merged
+  buckets: Array<[number, number]>
+}
+
+const bucketIndex = (micros: number) => {
+  const shift = Math.max(0, 32 - Math.clz32(micros) - SUB_BUCKET_BITS)
+  return shift * SUB_BUCKET_COUNT + (micros >>> shift)
+}
+
+// Highest value that falls into a bucket
+const bucketValue = (index: number) => {
+  const shift = Math.floor(index / SUB_BUCKET_COUNT)
+  return ((index % SUB_BUCKET_COUNT) + 1) * 2 ** shift - 1
+}
+
+const round = (value: number) => Number(value.toFixed(3))
+
+export const createLatencyHistogram = (): ILatencyHistogram => {
+  const counts = new Map<number, number>()
+  let count = 0
+  let sum = 0
+  let min = Infinity
+  let max = 0
+
+  const sortedIndexes = () => [...counts.keys()].sort((a, b) => a - b)
+
+  const percentile = (percent: number) => {
+    if (!count) return 0
+    const target = Math.max(1, Math.ceil((percent / 100) * count))
+    let seen = 0
+    for (const index of sortedIndexes()) {
+      seen += counts.get(index) ?? 0
+      if (seen >= target) return Math.min(bucketValue(index), max) / 1000
+    }
+    return max / 1000
+  }
+
+  return {
+    record(milliseconds) {
+      // Clamped to the 32-bit range the bucket index is computed over
+      const micros = Math.min(
+        Math.max(0, Math.round(milliseconds * 1000)),
+        0xffffffff,
+      )
+      const index = bucketIndex(micros)
+      counts.set(index, (counts.get(index) ?? 0) + 1)
+      count++
+      sum += micros
+      min = Math.min(min, micros)
+      max = Math.max(max, micros)
+    },
+    get count() {
+      return count
+    },
+    percentile,
+    summary: () => ({
+      count,
+      latencyMs: {
+        min: count ? round(min / 1000) : 0,
+        mean: count ? round(sum / count / 1000) : 0,
+        p50: round(percentile(50)),
+        p90: round(percentile(90)),
+        p95: round(percentile(95)),
+        p99: round(percentile(99)),
+        p999: round(percentile(99.9)),
+        max: round(max / 1000),
+      },
+      buckets: sortedIndexes().map(index => [
+        Math.min(bucketValue(index), max),
+        counts.get(index) ?? 0,
+      ]),
+    }),
+  }
+}
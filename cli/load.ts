@@ -0,0 +1,437 @@
+import { mkdtempSync, rmSync, writeFileSync } from 'fs'
+import { createServer, Server } from 'https'
+import type { AddressInfo } from 'net'
+import { tmpdir } from 'os'
+import { join } from 'path'
+import * as client from 'openid-client'
+
+import { createTestPki } from './bench/pki'
+import {
+  createAuthStub,
+  createDataStub,
+  StubHandler,
+} from './bench/stub_handlers'
+import { createLatencyHistogram, ILatencyHistogram } from './histogram'
+
+// Load test an EDP: virtual clients share the CLI's mTLS customFetch and
+// configuration (config.ts) and run a weighted mix of operations against
+// the data server and token endpoint, ramping through stages.
+//
+//   npm run load [stages] [mix]
+//   npm run load -- --stub [stages] [mix]
+//
+// stages: `<duration>:<clients>` ramps, e.g. `10s:8,30s:8,5s:0` ramps up to
+//         8 clients over 10s, holds them for 30s and ramps down over 5s
+// mix:    operation weights, e.g. `list=40,measure=55,refresh=5`
+//
+// LOAD_ACCESS_TOKEN and/or LOAD_REFRESH_TOKEN authorise the clients (get them
+// with `npm run get_code` and the callback server). --stub starts a local
+// mTLS authorisation server and EDP instead, so no network is needed.
+// Results are printed as JSON and written to LOAD_OUTPUT if set.
+
+type Operation = 'list' | 'measure' | 'refresh'
+
+interface IStage {
+  durationMs: number
+  clients: number
+}
+
+interface IMeter {
+  id: string
+  availableMeasures?: string[]
+}
+
+interface IOperationStats {
+  histogram: ILatencyHistogram
+  ok: number
+  // Failures by HTTP status or error code
+  errors: Record<string, number>
+}
+
+const OPERATIONS: Operation[] = ['list', 'measure', 'refresh']
+const DURATION_UNITS: Record<string, number> = { ms: 1, s: 1000, m: 60_000 }
+
+const parseStages = (value: string): IStage[] =>
+  value.split(',').map(stage => {
+    const match = stage.trim().match(/^(\d+)(ms|s|m)?:(\d+)$/)
+    if (!match)
+      throw new Error(
+        `Invalid stage "${stage}": expected <duration>:<clients>, e.g. 30s:16`,
+      )
+    return {
+      durationMs: Number(match[1]) * DURATION_UNITS[match[2] ?? 's'],
+      clients: Number(match[3]),
+    }
+  })
+
+const parseMix = (value: string): Array<[Operation, number]> =>
+  value.split(',').map(entry => {
+    const [name, weight] = entry.trim().split('=')
+    if (!OPERATIONS.includes(name as Operation) || !(Number(weight) >= 0))
+      throw new Error(
+        `Invalid mix entry "${entry}": expected <${OPERATIONS.join('|')}>=<weight>`,
+      )
+    return [name as Operation, Number(weight)]
+  })
+
+/** Clients that should be running `elapsedMs` into the run. */
+const targetClients = (stages: IStage[], elapsedMs: number) => {
+  let previous = 0
+  let stageStart = 0
+  for (const stage of stages) {
+    if (elapsedMs < stageStart + stage.durationMs)
+      return Math.round(
+        previous +
+          ((stage.clients - previous) * (elapsedMs - stageStart)) /
+            stage.durationMs,
+      )
+    previous = stage.clients
+    stageStart += stage.durationMs
+  }
+  return 0
+}
+
+const args = process.argv.slice(2)
+const useStub = args.includes('--stub')
+const [stagesArg = '10s:8,30s:8', mixArg = 'list=40,measure=55,refresh=5'] =
+  args.filter(arg => arg !== '--stub')
+const stages = parseStages(stagesArg)
+let mix = parseMix(mixArg)
+const totalMs = stages.reduce((total, stage) => total + stage.durationMs, 0)
+const maxClients = Math.max(...stages.map(stage => stage.clients))
+const timeoutMs = Number(process.env.LOAD_TIMEOUT_MS ?? 10_000)
+const from = process.env.LOAD_FROM ?? '2024-12-05T00:00:00Z'
+const to = process.env.LOAD_TO ?? '2024-12-06T00:00:00Z'
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms))
+
+const listen = async (server: Server) => {
+  await new Promise<void>(resolve => server.listen(0, '127.0.0.1', resolve))
+  return `https://localhost:${(server.address() as AddressInfo).port}`
+}
+
+/**
+ * Start the stub authorisation server and EDP behind mTLS with a throwaway
+ * PKI, and point the CLI configuration at them.
+ */
+const startStubs = async () => {
+  const pki = createTestPki()
+  const dir = mkdtempSync(join(tmpdir(), 'perseus-load-'))
+  writeFileSync(join(dir, 'key.pem'), pki.clientKey)
+  writeFileSync(join(dir, 'bundle.pem'), pki.clientBundle)
+  writeFileSync(join(dir, 'ca.pem'), pki.caCert)
+
+  const options = {
+    latencyMs: Number(process.env.STUB_LATENCY_MS ?? 20),
+    tokenTtlSeconds: Number(process.env.STUB_TOKEN_TTL_SECONDS ?? 3600),
+  }
+  const serve = (handler: StubHandler) =>
+    createServer(
+      {
+        key: pki.serverKey,
+        cert: pki.serverCert,
+        ca: pki.caCert,
+        requestCert: true,
+        rejectUnauthorized: true,
+      },
+      handler,
+    )
+  const auth = createAuthStub(options)
+  const servers = [serve(auth.handler), serve(createDataStub(options))]
+  const [authUrl, dataUrl] = await Promise.all(servers.map(listen))
+
+  process.env.CLI_PUBLIC_SERVER = authUrl
+  process.env.CLI_PROTECTED_RESOURCE_URL = `${dataUrl}/datasources/`
+  process.env.CLI_MTLS_KEY_PATH = join(dir, 'key.pem')
+  process.env.CLI_MTLS_BUNDLE_PATH = join(dir, 'bundle.pem')
+  process.env.CLI_SERVER_CA_PATH = join(dir, 'ca.pem')
+  process.env.LOAD_REFRESH_TOKEN ??= 'stub-refresh-token'
+
+  return {
+    grants: auth.grants,
+    close: () => {
+      servers.forEach(server => server.close())
+      rmSync(dir, { recursive: true, force: true })
+      pki.cleanup()
+    },
+  }
+}
+
+const stubs = useStub ? await startStubs() : undefined
+// Enough pooled connections for every client (read when the agent is built)
+process.env.MTLS_POOL_CONNECTIONS ??= String(Math.max(maxClients, 1))
+
+// Imported once the environment is final: the config is read on import
+const { clientConfig: clientConfigPromise, customFetch } = await import(
+  './customFetch'
+)
+const resolvedClientConfig = await clientConfigPromise
+
+const tokens = {
+  access: process.env.LOAD_ACCESS_TOKEN,
+  refresh: process.env.LOAD_REFRESH_TOKEN,
+}
+if (!tokens.access && !tokens.refresh) {
+  console.error('Set LOAD_ACCESS_TOKEN or LOAD_REFRESH_TOKEN, or use --stub')
+  process.exit(1)
+}
+
+const stats = Object.fromEntries(
+  OPERATIONS.map(operation => [
+    operation,
+    { histogram: createLatencyHistogram(), ok: 0, errors: {} },
+  ]),
+) as Record<Operation, IOperationStats>
+const stageRequests = stages.map(() => 0)
+
+const stageAt = (elapsedMs: number) => {
+  let stageEnd = 0
+  const index = stages.findIndex(
+    stage => elapsedMs < (stageEnd += stage.durationMs),
+  )
+  return index === -1 ? stages.length - 1 : index
+}
+
+const errorKey = (error: unknown) => {
+  if (!(error instanceof Error)) return 'error'
+  if (error.name === 'TimeoutError') return 'timeout'
+  const cause = error.cause as { code?: string } | undefined
+  return cause?.code ?? error.name
+}
+
+let runStartedAt = 0
+
+interface IOutcome {
+  status?: number
+  // Parsed JSON body of a 2xx response
+  body?: unknown
+}
+
+/** Time one request and, if `record`, add it to the stats of `operation`. */
+const measure = async (
+  operation: Operation,
+  send: (signal: AbortSignal) => Promise<Response>,
+  record = true,
+): Promise<IOutcome> => {
+  const startedAt = performance.now()
+  const outcome: IOutcome = {}
+  let failure: string | undefined
+  try {
+    const response = await send(AbortSignal.timeout(timeoutMs))
+    outcome.status = response.status
+    const text = await response.text()
+    if (response.ok) outcome.body = text ? JSON.parse(text) : {}
+    else failure = String(response.status)
+  } catch (error) {
+    failure = errorKey(error)
+  }
+  if (!record) return outcome
+
+  const entry = stats[operation]
+  entry.histogram.record(performance.now() - startedAt)
+  if (failure) entry.errors[failure] = (entry.errors[failure] ?? 0) + 1
+  else entry.ok++
+  stageRequests[stageAt(startedAt - runStartedAt)]++
+  return outcome
+}
+
+const discoveryUrl = new URL(
+  '/.well-known/oauth-authorization-server',
+  resolvedClientConfig.server,
+)
+const originalFetch = globalThis.fetch
+let issuer: client.Configuration
+try {
+  globalThis.fetch = customFetch as typeof fetch
+  issuer = await client.discovery(
+    discoveryUrl,
+    resolvedClientConfig.client_id,
+    { use_mtls_endpoint_aliases: true },
+    client.TlsClientAuth(),
+    { [client.customFetch]: customFetch },
+  )
+} finally {
+  globalThis.fetch = originalFetch
+}
+const tokenEndpoint = issuer.serverMetadata().token_endpoint
+
+const sendRefresh = async (record = true) => {
+  if (!tokenEndpoint || !tokens.refresh) return
+  const { body } = await measure(
+    'refresh',
+    signal =>
+      customFetch(tokenEndpoint, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
+        body: new URLSearchParams({
+          grant_type: 'refresh_token',
+          refresh_token: tokens.refresh as string,
+          client_id: resolvedClientConfig.client_id,
+        }).toString(),
+        signal,
+      }),
+    record,
+  )
+  const tokenData = body as
+    | { access_token?: string; refresh_token?: string }
+    | undefined
+  if (tokenData?.access_token) tokens.access = tokenData.access_token
+  if (tokenData?.refresh_token) tokens.refresh = tokenData.refresh_token
+}
+
+// A server that rotates refresh tokens makes each one single-use, so refresh
+// grants are sent one at a time, each with the latest refresh token. Time
+// spent queued is not part of the recorded latency.
+let refreshQueue = Promise.resolve()
+const refresh = (record = true) =>
+  (refreshQueue = refreshQueue.then(() => sendRefresh(record)))
+
+// Clients that see the same access token rejected share one refresh
+let rejected: { accessToken?: string; refreshed: Promise<void> } | undefined
+const refreshRejected = (accessToken?: string) => {
+  if (rejected?.accessToken !== accessToken)
+    rejected = { accessToken, refreshed: refresh() }
+  return rejected.refreshed
+}
+
+const dataUrl = (path: string) =>
+  new URL(path, resolvedClientConfig.protectedResourceUrl)
+
+const getData = (operation: Operation, url: URL, record = true) =>
+  measure(
+    operation,
+    signal =>
+      customFetch(url, {
+        headers: {
+          Authorization: `Bearer ${tokens.access}`,
+          Accept: 'application/json',
+        },
+        signal,
+      }),
+    record,
+  )
+
+// Set up outside the measured run: a token, and the meters to read from
+if (!tokens.access) await refresh(false)
+const listing = await getData('list', dataUrl('/datasources/'), false)
+const meters = (listing.body as { data?: IMeter[] } | undefined)?.data ?? []
+const readings = meters.flatMap(meter =>
+  (meter.availableMeasures ?? []).map(measure =>
+    dataUrl(
+      `/datasources/${meter.id}/${measure}?${new URLSearchParams({ from, to })}`,
+    ),
+  ),
+)
+if (!tokens.access) {
+  console.error('Could not obtain an access token')
+  process.exit(1)
+}
+// Operations that cannot run are dropped from the mix
+mix = mix.filter(
+  ([operation, weight]) =>
+    weight > 0 &&
+    !(operation === 'measure' && !readings.length) &&
+    !(operation === 'refresh' && !(tokens.refresh && tokenEndpoint)),
+)
+if (!mix.length) {
+  console.error('No operation in the mix can run')
+  process.exit(1)
+}
+const totalWeight = mix.reduce((total, [, weight]) => total + weight, 0)
+
+const pickOperation = (): Operation => {
+  let roll = Math.random() * totalWeight
+  for (const [operation, weight] of mix)
+    if ((roll -= weight) < 0) return operation
+  return mix[0][0]
+}
+
+const runOperation = async (operation: Operation) => {
+  if (operation === 'refresh') return refresh()
+  const url =
+    operation === 'list'
+      ? dataUrl('/datasources/')
+      : readings[Math.floor(Math.random() * readings.length)]
+  const accessToken = tokens.access
+  const { status } = await getData(operation, url)
+  // A rejected (e.g. expired) token is refreshed once, not by every client
+  if (status === 401 && tokens.access === accessToken && tokens.refresh)
+    await refreshRejected(accessToken)
+}
+
+// Virtual clients start and stop to follow the stage targets
+const running = new Map<number, Promise<void>>()
+let peakClients = 0
+
+const runClient = async (index: number) => {
+  while (true) {
+    const elapsedMs = performance.now() - runStartedAt
+    if (elapsedMs >= totalMs || index >= targetClients(stages, elapsedMs))
+      break
+    await runOperation(pickOperation())
+  }
+  running.delete(index)
+}
+
+runStartedAt = performance.now()
+const startedAt = new Date()
+while (performance.now() - runStartedAt < totalMs) {
+  const target = targetClients(stages, performance.now() - runStartedAt)
+  for (let index = 0; index < target; index++)
+    if (!running.has(index)) running.set(index, runClient(index))
+  peakClients = Math.max(peakClients, running.size)
+  await sleep(50)
+}
+await Promise.all(running.values())
+const elapsedSeconds = (performance.now() - runStartedAt) / 1000
+
+const round = (value: number) => Number(value.toFixed(2))
+
+const endpoints = Object.fromEntries(
+  OPERATIONS.filter(operation => stats[operation].histogram.count).map(
+    operation => {
+      const { histogram, ok, errors } = stats[operation]
+      const { count, latencyMs, buckets } = histogram.summary()
+      return [
+        operation,
+        {
+          requests: count,
+          ok,
+          errors,
+          throughputPerSecond: round(count / elapsedSeconds),
+          latencyMs,
+          histogram: { unit: 'us', significantDigits: 3, buckets },
+        },
+      ]
+    },
+  ),
+)
+const totalRequests = stageRequests.reduce((total, count) => total + count, 0)
+
+const result = {
+  startedAt: startedAt.toISOString(),
+  server: resolvedClientConfig.server.href,
+  protectedResourceUrl: resolvedClientConfig.protectedResourceUrl.href,
+  stub: useStub,
+  durationSeconds: round(elapsedSeconds),
+  peakClients,
+  mix: Object.fromEntries(mix),
+  totalRequests,
+  throughputPerSecond: round(totalRequests / elapsedSeconds),
+  stages: stages.map((stage, index) => ({
+    durationSeconds: stage.durationMs / 1000,
+    clients: stage.clients,
+    requests: stageRequests[index],
+    throughputPerSecond: round(
+      stageRequests[index] / (stage.durationMs / 1000 || 1),
+    ),
+  })),
+  endpoints,
+  ...(stubs ? { stubGrants: stubs.grants } : {}),
+}
+
+const output = JSON.stringify(result, null, 2)
+console.log(output)
+if (process.env.LOAD_OUTPUT) writeFileSync(process.env.LOAD_OUTPUT, output)
+stubs?.close()
+process.exit(0)
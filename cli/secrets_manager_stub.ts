@@ -0,0 +1,75 @@
+import express from 'express'
+import { createHash } from 'crypto'
+import { readFileSync } from 'fs'
+
+import { config } from './config'
+
+// Minimal Secrets Manager stand-in for exercising certificate loading without
+// AWS. Serves GetSecretValue and DescribeSecret for any SecretId from the
+// local mTLS key and bundle; editing either file "rotates" the secret.
+//
+//   npm run stub:secrets [port] [fail-first]
+//   SECRETS_MANAGER_ENDPOINT=http://localhost:4584 AWS_ACCESS_KEY_ID=stub \
+//     AWS_SECRET_ACCESS_KEY=stub APP_ENV=dev npm run dev
+const port = Number(process.argv[2] ?? 4584)
+// Fail this many requests first (503) to exercise retries
+let failRemaining = Number(process.argv[3] ?? 0)
+
+const readSecret = () => {
+  const mtlsKey = readFileSync(config.mtlsKeyPath, 'utf8')
+  const mtlsBundle = readFileSync(config.mtlsBundlePath, 'utf8')
+  const versionId = createHash('sha256')
+    .update(mtlsKey)
+    .update(mtlsBundle)
+    .digest('hex')
+    .slice(0, 32)
+  return { versionId, secretString: JSON.stringify({ mtlsKey, mtlsBundle }) }
+}
+
+const app = express()
+app.use(express.json({ type: '*/*' }))
+
+app.post('/', (req, res) => {
+  const target = req.header('x-amz-target')
+  const secretId = req.body?.SecretId
+  console.log(`${target} ${secretId}`)
+  res.type('application/x-amz-json-1.1')
+
+  if (failRemaining > 0) {
+    failRemaining--
+    return res.status(503).send({
+      __type: 'ServiceUnavailable',
+      message: 'Stub failure',
+    })
+  }
+
+  const { versionId, secretString } = readSecret()
+  const name = String(secretId)
+  const arn = `arn:aws:secretsmanager:eu-west-2:000000000000:secret:${name}`
+
+  if (target === 'secretsmanager.GetSecretValue')
+    return res.send({
+      ARN: arn,
+      Name: name,
+      VersionId: versionId,
+      SecretString: secretString,
+      VersionStages: ['AWSCURRENT'],
+      CreatedDate: Date.now() / 1000,
+    })
+
+  if (target === 'secretsmanager.DescribeSecret')
+    return res.send({
+      ARN: arn,
+      Name: name,
+      VersionIdsToStages: { [versionId]: ['AWSCURRENT'] },
+    })
+
+  res.status(400).send({
+    __type: 'InvalidRequestException',
+    message: `Unsupported operation ${target}`,
+  })
+})
+
+app.listen(port, () =>
+  console.log(`Secrets Manager stub listening on http://localhost:${port}`),
+)
@@ -0,0 +1,73 @@
+import assert from 'node:assert/strict'
+import { after, test } from 'node:test'
+
+import {
+  closeMtlsAgents,
+  getMtlsAgent,
+  rotateMtlsAgent,
+} from '../../lib/clientConfig'
+import type { IClientConfig } from '../../lib/clientConfig'
+import { createTestPki } from '../bench/pki'
+
+const pki = createTestPki(3)
+
+after(async () => {
+  await closeMtlsAgents()
+  pki.cleanup()
+})
+
+const isClosed = (agent: ReturnType<typeof getMtlsAgent>) => agent.closed
+
+const config = (client: number, client_id = 'client-a') =>
+  ({
+    client_id,
+    mtlsKey: pki.clients[client].key,
+    mtlsBundle: pki.clients[client].cert,
+    caBundle: pki.caCert,
+  }) as IClientConfig
+
+test('rotating to new certificates replaces the agent', () => {
+  const a = config(0)
+  const b = config(1)
+  const agentA = getMtlsAgent(a)
+
+  rotateMtlsAgent(a, b)
+
+  assert.ok(isClosed(agentA))
+  assert.equal(getMtlsAgent(a), getMtlsAgent(b))
+  assert.notEqual(getMtlsAgent(b), agentA)
+})
+
+test('rotating back to earlier certificates builds a fresh agent', () => {
+  const a = config(0, 'client-b')
+  const b = config(1, 'client-b')
+  const agentA = getMtlsAgent(a)
+
+  rotateMtlsAgent(a, b)
+  const agentB = getMtlsAgent(b)
+  rotateMtlsAgent(b, a)
+
+  const current = getMtlsAgent(a)
+  assert.ok(isClosed(agentB))
+  assert.ok(!isClosed(current))
+  assert.notEqual(current, agentA)
+  assert.equal(getMtlsAgent(b), current)
+
+  // A further rotation still resolves, rather than looping over the chain
+  rotateMtlsAgent(a, b)
+  assert.ok(!isClosed(getMtlsAgent(a)))
+  assert.equal(getMtlsAgent(a), getMtlsAgent(b))
+})
+
+test('other configs with the same client_id keep their agent', () => {
+  const a = config(0, 'client-c')
+  const b = config(1, 'client-c')
+  const other = config(2, 'client-c')
+  const otherAgent = getMtlsAgent(other)
+
+  getMtlsAgent(a)
+  rotateMtlsAgent(a, b)
+
+  assert.equal(getMtlsAgent(other), otherAgent)
+  assert.ok(!isClosed(otherAgent))
+})
@@ -6,6 +6,14 @@ import { execSync } from 'child_process'
 import { tmpdir } from 'os'
 import { randomBytes } from 'crypto'
 
+// With arguments, audit certificate files, directories or globs in bulk
+// (cert_audit.ts); without, check the configured key/bundle pair
+const bulkArgs = process.argv.slice(2)
+if (bulkArgs.length) {
+  const { runBulkAudit } = await import('./cert_audit')
+  process.exit(await runBulkAudit(bulkArgs))
+}
+
 // Load .env file from the cli directory
 const __filename = fileURLToPath(import.meta.url)
 const __dirname = dirname(__filename)
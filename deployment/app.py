@@ -11,14 +11,22 @@ from deployment.policies import SecretsManagerPolicy
 
 from deployment.nextjs_service import NextJsService
 from deployment.certificate import Certificate
+from deployment.container_platform import AppImage
+from deployment.hosted_zone import HostedZoneProvider
 from deployment.ecs_cluster import SharedEcsCluster
 from deployment.kms_key import ProvenanceKmsKey
 from deployment.certificates_bucket import CertificatesBucket
 from deployment.provenance_policies import ProvenanceServicePolicy
-from deployment.provenance_service import ProvenanceService
+from deployment.provenance_service import ProvenanceService, provenance_service_url
 from deployment.truststore_bucket import TruststoreBucket
 from deployment.truststore import Truststore
 from deployment.mtls_alb import MtlsAlb
+from deployment.load_balancing import SHARED_MTLS_PORT
+from deployment.public_load_balancer import PublicLoadBalancer
+from deployment.message_store import MessageStore
+from deployment.revocation_table import RevocationTable
+from deployment.ingestion_service import IngestionService
+from deployment.monitoring import APP_METRICS_NAMESPACE, Monitoring
 from models import Context
 
 app = App()
@@ -33,6 +41,78 @@ contexts: dict[str, Context] = {
         "hosted_zone_name": "perseus-demo-cap.ib1.org",
         "auth_domain": "preprod.perseus-demo-authentication.ib1.org",
         "mtls_domain": "preprod.mtls.perseus-demo-cap.ib1.org",
+        "nextjs_scaling": {
+            "cpu": 512,
+            "memory_limit_mib": 1024,
+            "min_tasks": 1,
+            "max_tasks": 3,
+            "requests_per_target": 600,
+            "target_cpu_utilization": 60,
+            "target_memory_utilization": 75,
+            "target_response_time_seconds": 1.5,
+            "scale_in_cooldown_seconds": 300,
+            "scale_out_cooldown_seconds": 60,
+        },
+        "provenance_scaling": {
+            "cpu": 256,
+            "memory_limit_mib": 512,
+            "min_tasks": 1,
+            "max_tasks": 2,
+            "target_cpu_utilization": 60,
+            "scale_out_requests_per_minute": 300,
+            "scale_in_requests_per_minute": 60,
+            "scale_in_cooldown_seconds": 300,
+            "scale_out_cooldown_seconds": 60,
+            "dns_ttl_seconds": 10,
+        },
+        "message_sink": "sqs",
+        "target_group_health": {
+            "health_check_path": "/api/health",
+            "interval_seconds": 10,
+            "timeout_seconds": 5,
+            "healthy_threshold": 2,
+            "unhealthy_threshold": 3,
+            "deregistration_delay_seconds": 15,
+            "slow_start_seconds": 30,
+        },
+        "rolling_deployment": {
+            "min_healthy_percent": 100,
+            "max_healthy_percent": 200,
+            "health_check_grace_period_seconds": 30,
+        },
+        "load_balancer_layout": "separate",
+        "dedicated_ingestion": False,
+        "cpu_architecture": "arm64",
+        "logging": {
+            "level": "info",
+            "sample_rates": "",
+            "retention_days": 7,
+            "max_buffer_size_mib": 25,
+        },
+        "latency_alarms": {
+            "route_duration_p99_ms": 5000,
+            "target_response_time_p99_seconds": 5.0,
+            "service_cpu_p99_percent": 90,
+            "evaluation_periods": 5,
+        },
+        "kms_alarms": {
+            "sign_quota_usage_percent": 80,
+            "evaluation_periods": 5,
+        },
+        "subnet_layout": "public",
+        "service_discovery": "cloud_map",
+        "ingestion_scaling": {
+            "cpu": 256,
+            "memory_limit_mib": 512,
+            "min_tasks": 1,
+            "max_tasks": 3,
+            "requests_per_target": 1000,
+            "target_cpu_utilization": 60,
+            "target_memory_utilization": 75,
+            "target_response_time_seconds": 0.5,
+            "scale_in_cooldown_seconds": 300,
+            "scale_out_cooldown_seconds": 60,
+        },
     },
     "prod": {
         "environment_name": "prod",
@@ -40,6 +120,80 @@ contexts: dict[str, Context] = {
         "hosted_zone_name": "perseus-demo-cap.ib1.org",
         "auth_domain": "perseus-demo-authentication.ib1.org",
         "mtls_domain": "mtls.perseus-demo-cap.ib1.org",
+        "nextjs_scaling": {
+            "cpu": 1024,
+            "memory_limit_mib": 2048,
+            "min_tasks": 2,
+            "max_tasks": 10,
+            "requests_per_target": 1000,
+            "target_cpu_utilization": 55,
+            "target_memory_utilization": 70,
+            "target_response_time_seconds": 1.0,
+            "scale_in_cooldown_seconds": 300,
+            "scale_out_cooldown_seconds": 60,
+        },
+        "provenance_scaling": {
+            "cpu": 512,
+            "memory_limit_mib": 1024,
+            "min_tasks": 2,
+            "max_tasks": 6,
+            "target_cpu_utilization": 50,
+            "scale_out_requests_per_minute": 600,
+            "scale_in_requests_per_minute": 120,
+            "scale_in_cooldown_seconds": 300,
+            "scale_out_cooldown_seconds": 60,
+            "dns_ttl_seconds": 10,
+        },
+        "message_sink": "sqs",
+        "target_group_health": {
+            "health_check_path": "/api/health",
+            "interval_seconds": 10,
+            "timeout_seconds": 5,
+            "healthy_threshold": 2,
+            "unhealthy_threshold": 3,
+            "deregistration_delay_seconds": 30,
+            "slow_start_seconds": 60,
+        },
+        "rolling_deployment": {
+            "min_healthy_percent": 100,
+            "max_healthy_percent": 200,
+            "health_check_grace_period_seconds": 30,
+        },
+        "load_balancer_layout": "separate",
+        # Off until revocations are confirmed to reach the app service through
+        # the shared revocation table; an ingestion task only knows its own
+        "dedicated_ingestion": False,
+        "cpu_architecture": "arm64",
+        "logging": {
+            "level": "info",
+            "sample_rates": "/api/getData=0.1,/perseus/messages=0.01",
+            "retention_days": 30,
+            "max_buffer_size_mib": 25,
+        },
+        "latency_alarms": {
+            "route_duration_p99_ms": 3000,
+            "target_response_time_p99_seconds": 3.0,
+            "service_cpu_p99_percent": 85,
+            "evaluation_periods": 3,
+        },
+        "kms_alarms": {
+            "sign_quota_usage_percent": 70,
+            "evaluation_periods": 3,
+        },
+        "subnet_layout": "private",
+        "service_discovery": "service_connect",
+        "ingestion_scaling": {
+            "cpu": 512,
+            "memory_limit_mib": 1024,
+            "min_tasks": 2,
+            "max_tasks": 10,
+            "requests_per_target": 1500,
+            "target_cpu_utilization": 55,
+            "target_memory_utilization": 70,
+            "target_response_time_seconds": 0.5,
+            "scale_in_cooldown_seconds": 300,
+            "scale_out_cooldown_seconds": 60,
+        },
     },
 }
 
@@ -54,8 +208,22 @@ stack = Stack(
 Tags.of(stack).add("ib1:p-perseus:owner", "kip.parker@ib1.org")
 Tags.of(stack).add("ib1:p-perseus:stage", deployment_context)
 
+# `cdk synth -c subnet_layout=private -c service_discovery=service_connect`
+# override the context's network options
+subnet_layout = (
+    app.node.try_get_context("subnet_layout")
+    or contexts[deployment_context]["subnet_layout"]
+)
+service_discovery = (
+    app.node.try_get_context("service_discovery")
+    or contexts[deployment_context]["service_discovery"]
+)
+
 network = NetworkConstruct(
-    stack, "Network", environment_name=contexts[deployment_context]["environment_name"]
+    stack,
+    "Network",
+    environment_name=contexts[deployment_context]["environment_name"],
+    subnet_layout=subnet_layout,
 )
 
 # Create shared ECS cluster for all services
@@ -73,13 +241,78 @@ secrets_policy = SecretsManagerPolicy(
     env_name=contexts[deployment_context]["environment_name"],
 )
 
+# One lookup of the hosted zone for every certificate and DNS record.
+# `cdk synth -c hosted_zone_id=Z...` imports it by id instead, so synth needs
+# no AWS credentials (CI, tests)
+hosted_zone_id = app.node.try_get_context("hosted_zone_id")
+hosted_zones = HostedZoneProvider(
+    stack,
+    zone_ids=(
+        {contexts[deployment_context]["hosted_zone_name"]: hosted_zone_id}
+        if hosted_zone_id
+        else None
+    ),
+)
+hosted_zone = hosted_zones.zone(contexts[deployment_context]["hosted_zone_name"])
+
 certificate = Certificate(
     stack,
     "Certificate",
     domain_name=contexts[deployment_context]["domain"],
-    hosted_zone_name=contexts[deployment_context]["hosted_zone_name"],
+    hosted_zone=hosted_zone,
 )
 
+# `cdk synth -c load_balancer_layout=shared` overrides the context's layout
+load_balancer_layout = (
+    app.node.try_get_context("load_balancer_layout")
+    or contexts[deployment_context]["load_balancer_layout"]
+)
+shared_load_balancer = (
+    PublicLoadBalancer(stack, "SharedAlb", vpc=network.vpc)
+    if load_balancer_layout == "shared"
+    else None
+)
+
+# Durable store for messages received on /perseus/messages
+message_store = MessageStore(
+    stack,
+    "MessageStore",
+    environment_name=contexts[deployment_context]["environment_name"],
+    sink=contexts[deployment_context]["message_sink"],
+)
+
+# Revoked token identifiers, shared so every task drops revoked sessions
+revocation_table = RevocationTable(
+    stack,
+    "RevocationTable",
+    environment_name=contexts[deployment_context]["environment_name"],
+)
+
+# `cdk synth -c cpu_architecture=x86_64` overrides the context's architecture
+cpu_architecture = (
+    app.node.try_get_context("cpu_architecture")
+    or contexts[deployment_context]["cpu_architecture"]
+)
+
+# Built once and run by both the app and ingestion services
+app_image = AppImage(
+    stack,
+    "AppImage",
+    env_name=(
+        "prod"
+        if contexts[deployment_context]["environment_name"] == "prod"
+        else "preprod"
+    ),
+    cpu_architecture=cpu_architecture,
+)
+
+logging_profile = contexts[deployment_context]["logging"]
+app_logging_environment = {
+    "LOG_LEVEL": logging_profile["level"],
+    "LOG_SAMPLE_RATES": logging_profile["sample_rates"],
+    # Per-route EMF latency metrics, see deployment/monitoring.py
+    "METRICS_NAMESPACE": APP_METRICS_NAMESPACE,
+}
 
 nextjs_service = NextJsService(
     stack,
@@ -93,22 +326,69 @@ nextjs_service = NextJsService(
         "NEXT_PUBLIC_REDIRECT_URL": f"https://{contexts[deployment_context]["domain"]}?key=edpVerified",
         "NEXT_PUBLIC_CLIENT_ID": "f67916ce-de33-4e2f-a8e3-cbd5f6459c30",
         "NEXT_PUBLIC_SERVER": f"https://{contexts[deployment_context]['auth_domain']}",
-        "PROVENANCE_SERVICE_URL": f"http://provenance-service.perseus-cap-{contexts[deployment_context]['environment_name']}.local:8080",
+        "PROVENANCE_SERVICE_URL": provenance_service_url(
+            service_discovery, network.service_discovery_namespace.namespace_name
+        ),
         "APP_ENV": deployment_context,
         "NODE_ENV": "production",
         "DEPLOY_VERSION": "0.1.4",
+        **message_store.environment,
+        **revocation_table.environment,
+        **app_logging_environment,
     },
     ecs_sg=network.ecs_sg,
     certificate=certificate.certificate,
     domain_name=contexts[deployment_context]["domain"],
-    domain_zone_name=contexts[deployment_context]["hosted_zone_name"],
-    env_name=(
-        "prod"
-        if contexts[deployment_context]["environment_name"] == "prod"
-        else "preprod"
-    ),
+    domain_zone=hosted_zone,
+    image=app_image.image,
+    scaling=contexts[deployment_context]["nextjs_scaling"],
+    target_group_health=contexts[deployment_context]["target_group_health"],
+    rolling_deployment=contexts[deployment_context]["rolling_deployment"],
+    cpu_architecture=cpu_architecture,
+    logging=logging_profile,
+    task_subnets=network.task_subnets,
+    assign_public_ip=network.assign_public_ip,
+    load_balancer=shared_load_balancer.alb if shared_load_balancer else None,
 )
 
+message_store.grant_write(nextjs_service.task_role)
+revocation_table.grant_read_write(nextjs_service.task_role)
+
+# `cdk synth -c dedicated_ingestion=true` overrides the context's setting
+dedicated_ingestion = app.node.try_get_context("dedicated_ingestion")
+if dedicated_ingestion is None:
+    dedicated_ingestion = contexts[deployment_context]["dedicated_ingestion"]
+elif isinstance(dedicated_ingestion, str):
+    dedicated_ingestion = dedicated_ingestion.lower() == "true"
+
+ingestion_service = None
+if dedicated_ingestion:
+    # Same image in ingestion mode, so message bursts scale on their own
+    # tasks rather than competing with the UI and OAuth flows
+    ingestion_service = IngestionService(
+        stack,
+        "IngestionService",
+        cluster=shared_cluster.cluster,
+        ecs_sg=network.ecs_sg,
+        environment={
+            "APP_ENV": deployment_context,
+            "NODE_ENV": "production",
+            "DEPLOY_VERSION": "0.1.4",
+            **message_store.environment,
+            **revocation_table.environment,
+            **app_logging_environment,
+        },
+        image=app_image.image,
+        scaling=contexts[deployment_context]["ingestion_scaling"],
+        rolling_deployment=contexts[deployment_context]["rolling_deployment"],
+        cpu_architecture=cpu_architecture,
+        logging=logging_profile,
+        task_subnets=network.task_subnets,
+        assign_public_ip=network.assign_public_ip,
+    )
+    message_store.grant_write(ingestion_service.task_role)
+    revocation_table.grant_read_write(ingestion_service.task_role)
+
 # mTLS ALB for /perseus/messages endpoint
 env_name = contexts[deployment_context]["environment_name"]
 truststore_dir = (
@@ -140,9 +420,17 @@ mtls_certificate = Certificate(
     stack,
     "MtlsCertificate",
     domain_name=contexts[deployment_context]["mtls_domain"],
-    hosted_zone_name=contexts[deployment_context]["hosted_zone_name"],
+    hosted_zone=hosted_zone,
 )
 
+if ingestion_service:
+    mtls_target_group, mtls_target = None, ingestion_service.load_balancer_target
+elif shared_load_balancer:
+    # Both listeners of the shared ALB forward to the app's one target group
+    mtls_target_group, mtls_target = nextjs_service.target_group, None
+else:
+    mtls_target_group, mtls_target = None, nextjs_service.service
+
 mtls_alb = MtlsAlb(
     stack,
     "MtlsAlb",
@@ -150,16 +438,22 @@ mtls_alb = MtlsAlb(
     trust_store=truststore.trust_store,
     certificate=mtls_certificate.certificate,
     mtls_domain=contexts[deployment_context]["mtls_domain"],
-    hosted_zone_name=contexts[deployment_context]["hosted_zone_name"],
+    hosted_zone=hosted_zone,
+    target_group_health=contexts[deployment_context]["target_group_health"],
+    load_balancer=shared_load_balancer,
+    target_group=mtls_target_group,
+    target=mtls_target,
+    port=SHARED_MTLS_PORT if shared_load_balancer else 443,
 )
 
-# Allow mTLS ALB to reach the ECS tasks on port 3000
-network.ecs_sg.add_ingress_rule(
-    mtls_alb.alb_sg, ec2.Port.tcp(3000), "Allow mTLS ALB to reach ECS"
-)
+if not shared_load_balancer:
+    # Allow mTLS ALB to reach the ECS tasks on port 3000
+    network.ecs_sg.add_ingress_rule(
+        mtls_alb.alb_sg, ec2.Port.tcp(3000), "Allow mTLS ALB to reach ECS"
+    )
 
-# Register the Fargate service with the mTLS target group
-nextjs_service.service.attach_to_application_target_group(mtls_alb.target_group)
+if ingestion_service:
+    ingestion_service.scale_on_request_count(mtls_alb.target_group)
 
 # Provenance Service Resources
 provenance_kms_key = ProvenanceKmsKey(
@@ -195,6 +489,39 @@ provenance_service = ProvenanceService(
     ecs_sg=network.ecs_sg,
     environment_name=contexts[deployment_context]["environment_name"],
     service_discovery_namespace=network.service_discovery_namespace,
+    scaling=contexts[deployment_context]["provenance_scaling"],
+    rolling_deployment=contexts[deployment_context]["rolling_deployment"],
+    logging=logging_profile,
+    task_subnets=network.task_subnets,
+    assign_public_ip=network.assign_public_ip,
+    service_discovery=service_discovery,
+)
+provenance_service.connect_client(nextjs_service.service)
+if ingestion_service:
+    provenance_service.connect_client(ingestion_service.service)
+
+# Throttling alarm for the signing key
+signing_alarms = provenance_kms_key.add_alarms(
+    contexts[deployment_context]["kms_alarms"]
+)
+
+# Dashboard and p99 latency alarms
+Monitoring(
+    stack,
+    "Monitoring",
+    environment_name=contexts[deployment_context]["environment_name"],
+    alarms=contexts[deployment_context]["latency_alarms"],
+    services={
+        "NextJs": nextjs_service.service,
+        "Provenance": provenance_service.service,
+        **({"Ingestion": ingestion_service.service} if ingestion_service else {}),
+    },
+    load_balancers=(
+        {"Shared": shared_load_balancer.alb}
+        if shared_load_balancer
+        else {"App": nextjs_service.load_balancer, "Mtls": mtls_alb.alb}
+    ),
+    signing_alarms=signing_alarms,
 )
 
 app.synth()
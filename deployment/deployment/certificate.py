@@ -4,12 +4,13 @@ from constructs import Construct
 
 class Certificate(Construct):
     def __init__(
-        self, scope: Construct, id: str, domain_name: str, hosted_zone_name: str
+        self,
+        scope: Construct,
+        id: str,
+        domain_name: str,
+        hosted_zone: route53.IHostedZone,
     ):
         super().__init__(scope, id)
-        hosted_zone = route53.HostedZone.from_lookup(
-            self, "HostedZone", domain_name=hosted_zone_name
-        )
         # Create a new ACM certificate
         self.certificate = acm.Certificate(
             self,
@@ -6,6 +6,10 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+# Objects the provenance service signs with and callers verify against
+ROOT_CA_CERTIFICATE_KEY = "root-ca.pem"
+SIGNING_BUNDLE_KEY = "signing-bundle.pem"
+
 
 class CertificatesBucket(Construct):
     """Creates an S3 bucket for storing certificates and signing bundles."""
@@ -0,0 +1,81 @@
+import os
+from typing import Literal
+
+from aws_cdk import aws_ecr_assets as ecr_assets, aws_ecs as ecs
+from constructs import Construct
+
+CpuArchitecture = Literal["arm64", "x86_64"]
+
+# Image build platform and Fargate runtime for each supported architecture.
+# Graviton (arm64) tasks are cheaper per vCPU and the node:20-alpine base
+# image is multi-arch, so the same Dockerfile builds for either.
+_PLATFORMS = {
+    "arm64": (ecr_assets.Platform.LINUX_ARM64, ecs.CpuArchitecture.ARM64),
+    "x86_64": (ecr_assets.Platform.LINUX_AMD64, ecs.CpuArchitecture.X86_64),
+}
+
+
+def image_platform(architecture: CpuArchitecture) -> ecr_assets.Platform:
+    return _PLATFORMS[architecture][0]
+
+
+def runtime_platform(architecture: CpuArchitecture) -> ecs.RuntimePlatform:
+    """Fargate runtime matching images built with `image_platform`."""
+    return ecs.RuntimePlatform(
+        cpu_architecture=_PLATFORMS[architecture][1],
+        operating_system_family=ecs.OperatingSystemFamily.LINUX,
+    )
+
+
+# Repository paths that never reach the image: the runner stage only copies
+# the Next.js build output, so docs, certificates, the CLI and deployment code
+# only slow down fingerprinting and the Docker build context. Added to the
+# patterns in the repository's .dockerignore.
+APP_IMAGE_EXCLUDES = [
+    ".git",
+    ".github",
+    ".next",
+    "node_modules",
+    "cli",
+    "deployment",
+    "docs",
+    "certs",
+    "scripts",
+    "README.md",
+    "CHANGELOG.md",
+    "LICENSE.txt",
+    "requests.jsonl",
+    "compose.yml",
+    "Dockerfile.dev",
+    ".env.local*",
+    ".env.bench",
+]
+
+REPOSITORY_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+class AppImage(Construct):
+    """The app's Docker image asset, fingerprinted once per synth.
+
+    Every service running the app (NextJsService, IngestionService) uses
+    `image`, so the repository is hashed and the image built only once.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        id: str,
+        env_name: str,
+        cpu_architecture: CpuArchitecture,
+    ):
+        super().__init__(scope, id)
+
+        self.asset = ecr_assets.DockerImageAsset(
+            self,
+            "Asset",
+            directory=REPOSITORY_ROOT,
+            platform=image_platform(cpu_architecture),
+            build_args={"ENV": env_name},
+            exclude=APP_IMAGE_EXCLUDES,
+        )
+        self.image = ecs.ContainerImage.from_docker_image_asset(self.asset)
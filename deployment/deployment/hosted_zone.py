@@ -0,0 +1,36 @@
+from aws_cdk import aws_route53 as route53
+from constructs import Construct
+
+
+class HostedZoneProvider:
+    """Resolves each Route 53 hosted zone once for every construct that needs it.
+
+    By default a zone is found with `HostedZone.from_lookup`, which needs AWS
+    credentials on the first synth and then reads cdk.context.json. Zones
+    given in `zone_ids` (zone name -> hosted zone id) are imported by id
+    instead, so synth needs neither credentials nor a context file; tests
+    and CI use this.
+    """
+
+    def __init__(self, scope: Construct, zone_ids: dict[str, str] | None = None):
+        self.scope = scope
+        self.zone_ids = zone_ids or {}
+        self.zones: dict[str, route53.IHostedZone] = {}
+
+    def zone(self, zone_name: str) -> route53.IHostedZone:
+        if zone_name not in self.zones:
+            zone_id = self.zone_ids.get(zone_name)
+            construct_id = f"HostedZone-{zone_name}"
+            self.zones[zone_name] = (
+                route53.HostedZone.from_hosted_zone_attributes(
+                    self.scope,
+                    construct_id,
+                    hosted_zone_id=zone_id,
+                    zone_name=zone_name,
+                )
+                if zone_id
+                else route53.HostedZone.from_lookup(
+                    self.scope, construct_id, domain_name=zone_name
+                )
+            )
+        return self.zones[zone_name]
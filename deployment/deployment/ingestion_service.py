@@ -0,0 +1,119 @@
+from aws_cdk import (
+    aws_ec2 as ec2,
+    aws_ecs as ecs,
+    aws_elasticloadbalancingv2 as elbv2,
+    Duration,
+)
+from constructs import Construct
+
+from deployment.container_platform import CpuArchitecture, runtime_platform
+from deployment.load_balancing import APP_KEEP_ALIVE_TIMEOUT_MS
+from deployment.log_driver import aws_log_driver
+from models import LoggingProfile, RollingDeployment, ScalingProfile
+
+CONTAINER_NAME = "web"
+CONTAINER_PORT = 3000
+
+
+class IngestionService(Construct):
+    """The app image in ingestion mode, serving only /perseus/messages.
+
+    Runs as its own ECS service behind the mTLS ALB so bursts of trust
+    framework messages scale separately from the UI and OAuth traffic.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        id: str,
+        cluster: ecs.ICluster,
+        ecs_sg: ec2.SecurityGroup,
+        environment: dict,
+        image: ecs.ContainerImage,
+        scaling: ScalingProfile,
+        rolling_deployment: RollingDeployment,
+        logging: LoggingProfile,
+        cpu_architecture: CpuArchitecture = "x86_64",
+        task_subnets: ec2.SubnetSelection | None = None,
+        assign_public_ip: bool = True,
+        **kwargs,
+    ):
+        super().__init__(scope, id, **kwargs)
+
+        self._scaling_profile = scaling
+
+        task_definition = ecs.FargateTaskDefinition(
+            self,
+            "IngestionTaskDefinition",
+            cpu=scaling["cpu"],
+            memory_limit_mib=scaling["memory_limit_mib"],
+            runtime_platform=runtime_platform(cpu_architecture),
+        )
+        task_definition.add_container(
+            CONTAINER_NAME,
+            # The same AppImage as NextJsService
+            image=image,
+            environment={
+                "APP_MODE": "ingestion",
+                "STARTUP_MODE": "eager",
+                "KEEP_ALIVE_TIMEOUT": str(APP_KEEP_ALIVE_TIMEOUT_MS),
+                **environment,
+            },
+            logging=aws_log_driver(self, "ingestion", logging),
+            port_mappings=[ecs.PortMapping(container_port=CONTAINER_PORT)],
+        )
+
+        self.service = ecs.FargateService(
+            self,
+            "IngestionService",
+            cluster=cluster,
+            task_definition=task_definition,
+            desired_count=scaling["min_tasks"],
+            security_groups=[ecs_sg],
+            # Public subnets have no NAT, so tasks there need a public IP
+            vpc_subnets=task_subnets,
+            assign_public_ip=assign_public_ip,
+            min_healthy_percent=rolling_deployment["min_healthy_percent"],
+            max_healthy_percent=rolling_deployment["max_healthy_percent"],
+            circuit_breaker=ecs.DeploymentCircuitBreaker(rollback=True),
+            health_check_grace_period=Duration.seconds(
+                rolling_deployment["health_check_grace_period_seconds"]
+            ),
+        )
+        self.task_role = task_definition.task_role
+        self.load_balancer_target = self.service.load_balancer_target(
+            container_name=CONTAINER_NAME, container_port=CONTAINER_PORT
+        )
+
+        self.scaling = self.service.auto_scale_task_count(
+            min_capacity=scaling["min_tasks"],
+            max_capacity=scaling["max_tasks"],
+        )
+        self.scaling.scale_on_cpu_utilization(
+            "CpuScaling",
+            target_utilization_percent=scaling["target_cpu_utilization"],
+            scale_in_cooldown=Duration.seconds(scaling["scale_in_cooldown_seconds"]),
+            scale_out_cooldown=Duration.seconds(scaling["scale_out_cooldown_seconds"]),
+        )
+        self.scaling.scale_on_memory_utilization(
+            "MemoryScaling",
+            target_utilization_percent=scaling["target_memory_utilization"],
+            scale_in_cooldown=Duration.seconds(scaling["scale_in_cooldown_seconds"]),
+            scale_out_cooldown=Duration.seconds(scaling["scale_out_cooldown_seconds"]),
+        )
+
+    def scale_on_request_count(
+        self, target_group: elbv2.ApplicationTargetGroup
+    ) -> None:
+        """Track requests per task once the service is behind a target group."""
+        self.scaling.scale_on_request_count(
+            "RequestCountScaling",
+            requests_per_target=self._scaling_profile["requests_per_target"],
+            target_group=target_group,
+            scale_in_cooldown=Duration.seconds(
+                self._scaling_profile["scale_in_cooldown_seconds"]
+            ),
+            scale_out_cooldown=Duration.seconds(
+                self._scaling_profile["scale_out_cooldown_seconds"]
+            ),
+        )
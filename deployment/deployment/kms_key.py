@@ -1,7 +1,17 @@
-from aws_cdk import aws_kms as kms, aws_iam as iam, Tags, Aws, CfnOutput
+from aws_cdk import (
+    aws_cloudwatch as cloudwatch,
+    aws_kms as kms,
+    aws_iam as iam,
+    Tags,
+    Aws,
+    CfnOutput,
+    Duration,
+)
 
 from constructs import Construct
 
+from models import KmsAlarms
+
 
 class ProvenanceKmsKey(Construct):
     """Creates a KMS key for ECC P-256 signing operations."""
@@ -52,3 +62,48 @@ class ProvenanceKmsKey(Construct):
             description=f"ARN of the Provenance signing key (ECDSA P-256) for {environment_name}",
             export_name=f"provenance-signing-key-arn-{environment_name}",
         )
+
+    def sign_quota_usage_metric(self) -> cloudwatch.MathExpression:
+        """Sign requests per second as a percentage of the account's quota.
+
+        KMS publishes call counts per account and operation, not per key, and
+        Sign on every ECC key shares one request-rate quota. Requests over
+        the quota are throttled, so this is the early warning for throttling.
+        """
+        calls = cloudwatch.Metric(
+            namespace="AWS/Usage",
+            metric_name="CallCount",
+            dimensions_map={
+                "Service": "KMS",
+                "Type": "API",
+                "Resource": "Sign",
+                "Class": "None",
+            },
+            statistic="Sum",
+            period=Duration.minutes(1),
+        )
+        return cloudwatch.MathExpression(
+            expression="(calls / 60) / SERVICE_QUOTA(calls) * 100",
+            using_metrics={"calls": calls},
+            label="KMS Sign quota usage (%)",
+            period=Duration.minutes(1),
+        )
+
+    def add_alarms(self, alarms: KmsAlarms) -> dict[str, cloudwatch.Alarm]:
+        """Alarm on Sign nearing its throttling quota.
+
+        KMS publishes no latency metric, and nothing deployed measures signing
+        latency from the caller's side, so there is no latency alarm.
+        """
+        return {
+            "KMS Sign quota usage (%)": self.sign_quota_usage_metric().create_alarm(
+                self,
+                "SignQuotaAlarm",
+                threshold=alarms["sign_quota_usage_percent"],
+                evaluation_periods=alarms["evaluation_periods"],
+                datapoints_to_alarm=alarms["evaluation_periods"],
+                comparison_operator=cloudwatch.ComparisonOperator.GREATER_THAN_THRESHOLD,
+                treat_missing_data=cloudwatch.TreatMissingData.NOT_BREACHING,
+                alarm_description="KMS Sign requests as a percentage of the quota",
+            ),
+        }
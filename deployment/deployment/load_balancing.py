@@ -0,0 +1,45 @@
+from aws_cdk import aws_elasticloadbalancingv2 as elbv2, Duration
+
+from models import TargetGroupHealth
+
+# Long enough for streamed /api/getData responses between NDJSON lines
+ALB_IDLE_TIMEOUT_SECONDS = 120
+
+# Node must keep idle sockets open longer than the ALB does, otherwise the ALB
+# can reuse a connection the app has just closed and return a 502
+APP_KEEP_ALIVE_TIMEOUT_MS = (ALB_IDLE_TIMEOUT_SECONDS + 5) * 1000
+
+# ALB mutual authentication is set per listener and listeners cannot share a
+# port, so with a shared ALB the mTLS listener moves off 443
+SHARED_MTLS_PORT = 8443
+
+
+def tune_load_balancer(alb: elbv2.ApplicationLoadBalancer) -> None:
+    """Apply the shared idle timeout and keep HTTP/2 explicitly enabled."""
+    alb.set_attribute("idle_timeout.timeout_seconds", str(ALB_IDLE_TIMEOUT_SECONDS))
+    alb.set_attribute("routing.http2.enabled", "true")
+
+
+def tune_target_group(
+    target_group: elbv2.ApplicationTargetGroup, health: TargetGroupHealth
+) -> None:
+    """Apply the shared health check, deregistration delay and slow start.
+
+    Slow start ramps traffic to a new task over the window instead of giving
+    it a full share straight away, while caches and pools are still cold.
+    """
+    target_group.configure_health_check(
+        path=health["health_check_path"],
+        interval=Duration.seconds(health["interval_seconds"]),
+        timeout=Duration.seconds(health["timeout_seconds"]),
+        healthy_threshold_count=health["healthy_threshold"],
+        unhealthy_threshold_count=health["unhealthy_threshold"],
+        healthy_http_codes="200",
+    )
+    target_group.set_attribute(
+        "deregistration_delay.timeout_seconds",
+        str(health["deregistration_delay_seconds"]),
+    )
+    target_group.set_attribute(
+        "slow_start.duration_seconds", str(health["slow_start_seconds"])
+    )
@@ -0,0 +1,42 @@
+from aws_cdk import Size, aws_ecs as ecs, aws_logs as logs
+from constructs import Construct
+
+from models import LoggingProfile
+
+# Retention periods CloudWatch Logs accepts, by number of days
+RETENTION_DAYS = {
+    1: logs.RetentionDays.ONE_DAY,
+    3: logs.RetentionDays.THREE_DAYS,
+    5: logs.RetentionDays.FIVE_DAYS,
+    7: logs.RetentionDays.ONE_WEEK,
+    14: logs.RetentionDays.TWO_WEEKS,
+    30: logs.RetentionDays.ONE_MONTH,
+    60: logs.RetentionDays.TWO_MONTHS,
+    90: logs.RetentionDays.THREE_MONTHS,
+    180: logs.RetentionDays.SIX_MONTHS,
+    365: logs.RetentionDays.ONE_YEAR,
+}
+
+
+def aws_log_driver(
+    scope: Construct, stream_prefix: str, logging: LoggingProfile
+) -> ecs.LogDriver:
+    """awslogs driver in non-blocking mode, writing to a log group with the
+    context's retention.
+
+    In the default blocking mode a slow CloudWatch Logs endpoint stalls the
+    container's stdout writes, and with it the request path. Non-blocking
+    mode buffers up to max_buffer_size_mib in memory and drops entries when
+    the buffer is full instead.
+    """
+    log_group = logs.LogGroup(
+        scope,
+        "LogGroup",
+        retention=RETENTION_DAYS[logging["retention_days"]],
+    )
+    return ecs.LogDrivers.aws_logs(
+        stream_prefix=stream_prefix,
+        log_group=log_group,
+        mode=ecs.AwsLogDriverMode.NON_BLOCKING,
+        max_buffer_size=Size.mebibytes(logging["max_buffer_size_mib"]),
+    )
@@ -0,0 +1,78 @@
+from aws_cdk import (
+    aws_dynamodb as dynamodb,
+    aws_iam as iam,
+    aws_sqs as sqs,
+    Duration,
+    RemovalPolicy,
+)
+from constructs import Construct
+
+
+class MessageStore(Construct):
+    """Durable destination for IB1 messages received on /perseus/messages.
+
+    Creates either an SQS queue (with a dead-letter queue) or a DynamoDB table,
+    and exposes the environment variables the app needs to write to it.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        id: str,
+        environment_name: str,
+        sink: str,
+        **kwargs,
+    ):
+        super().__init__(scope, id, **kwargs)
+
+        self.queue = None
+        self.table = None
+
+        if sink == "sqs":
+            dead_letter_queue = sqs.Queue(
+                self,
+                "MessageDeadLetterQueue",
+                queue_name=f"perseus-cap-{environment_name}-messages-dlq",
+                encryption=sqs.QueueEncryption.SQS_MANAGED,
+                enforce_ssl=True,
+                retention_period=Duration.days(14),
+            )
+            self.queue = sqs.Queue(
+                self,
+                "MessageQueue",
+                queue_name=f"perseus-cap-{environment_name}-messages",
+                encryption=sqs.QueueEncryption.SQS_MANAGED,
+                enforce_ssl=True,
+                retention_period=Duration.days(14),
+                dead_letter_queue=sqs.DeadLetterQueue(
+                    max_receive_count=5, queue=dead_letter_queue
+                ),
+            )
+            self.environment = {
+                "MESSAGE_SINK": "sqs",
+                "MESSAGE_QUEUE_URL": self.queue.queue_url,
+            }
+        elif sink == "dynamodb":
+            self.table = dynamodb.Table(
+                self,
+                "MessageTable",
+                table_name=f"perseus-cap-{environment_name}-messages",
+                partition_key=dynamodb.Attribute(
+                    name="messageId", type=dynamodb.AttributeType.STRING
+                ),
+                billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+                point_in_time_recovery=True,
+                removal_policy=RemovalPolicy.RETAIN,
+            )
+            self.environment = {
+                "MESSAGE_SINK": "dynamodb",
+                "MESSAGE_TABLE_NAME": self.table.table_name,
+            }
+        else:
+            raise ValueError(f"Unsupported message sink: {sink}")
+
+    def grant_write(self, grantee: iam.IGrantable) -> iam.Grant:
+        """Allow the grantee to write batches to the store."""
+        if self.queue:
+            return self.queue.grant_send_messages(grantee)
+        return self.table.grant_write_data(grantee)
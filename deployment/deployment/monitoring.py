@@ -0,0 +1,185 @@
+from aws_cdk import (
+    aws_cloudwatch as cloudwatch,
+    aws_ecs as ecs,
+    aws_elasticloadbalancingv2 as elbv2,
+    Duration,
+)
+from constructs import Construct
+
+from models import LatencyAlarms
+
+# Namespace of the per-request EMF metrics written by lib/metrics.ts
+APP_METRICS_NAMESPACE = "PerseusCap/App"
+
+# Routes wrapped in withRouteMetrics
+ROUTES = ["/api/getData", "/auth/login", "/auth/callback", "/perseus/messages"]
+
+# Phases timed inside /api/getData, followed by the outbound connection
+# timings the mTLS agent records for every route
+GET_DATA_PHASES = [
+    "session",
+    "clientConfig",
+    "discovery",
+    "tokenExchange",
+    "tokenRefresh",
+    "meterList",
+    "meterData",
+]
+OUTBOUND_TIMINGS = ["dns", "connect", "tls", "ttfb"]
+
+# Phases timed inside /auth/login. They overlap, so they are not stacked.
+LOGIN_PHASES = ["clientConfig", "discovery", "pkce", "sessionSave", "par"]
+
+PERIOD = Duration.minutes(1)
+
+
+class Monitoring(Construct):
+    """Dashboard and p99 alarms for the app's routes, services and ALBs.
+
+    Route and phase latencies come from the EMF lines the app writes to its
+    logs; ALB and ECS metrics are the ones AWS publishes.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        id: str,
+        environment_name: str,
+        alarms: LatencyAlarms,
+        services: dict[str, ecs.BaseService],
+        load_balancers: dict[str, elbv2.IApplicationLoadBalancer],
+        signing_alarms: dict[str, cloudwatch.Alarm] | None = None,
+    ):
+        super().__init__(scope, id)
+
+        self.environment_name = environment_name
+        self.alarms: list[cloudwatch.Alarm] = []
+
+        route_metrics = {route: self.app_metric("Duration", route) for route in ROUTES}
+        for route, metric in route_metrics.items():
+            self.add_p99_alarm(
+                "".join(part[:1].upper() + part[1:] for part in route.split("/")),
+                metric,
+                alarms["route_duration_p99_ms"],
+                alarms["evaluation_periods"],
+                f"p99 latency of {route} (ms)",
+            )
+
+        alb_metrics = {
+            name: alb.metrics.target_response_time(statistic="p99", period=PERIOD)
+            for name, alb in load_balancers.items()
+        }
+        for name, metric in alb_metrics.items():
+            self.add_p99_alarm(
+                f"{name}TargetResponseTime",
+                metric,
+                alarms["target_response_time_p99_seconds"],
+                alarms["evaluation_periods"],
+                f"p99 target response time of the {name} ALB (s)",
+            )
+
+        cpu_metrics = {
+            name: service.metric_cpu_utilization(statistic="p99", period=PERIOD)
+            for name, service in services.items()
+        }
+        for name, metric in cpu_metrics.items():
+            self.add_p99_alarm(
+                f"{name}Cpu",
+                metric,
+                alarms["service_cpu_p99_percent"],
+                alarms["evaluation_periods"],
+                f"p99 CPU utilisation of the {name} service (%)",
+            )
+
+        self.dashboard = cloudwatch.Dashboard(
+            self,
+            "Dashboard",
+            dashboard_name=f"perseus-cap-{environment_name}",
+        )
+        self.dashboard.add_widgets(
+            cloudwatch.GraphWidget(
+                title="Route latency p99 (ms)",
+                left=[
+                    metric.with_(label=route) for route, metric in route_metrics.items()
+                ],
+                width=12,
+            ),
+            cloudwatch.GraphWidget(
+                title="/api/getData phases p99 (ms)",
+                left=[
+                    self.app_metric(phase, "/api/getData").with_(label=phase)
+                    for phase in GET_DATA_PHASES + OUTBOUND_TIMINGS
+                ],
+                stacked=True,
+                width=12,
+            ),
+        )
+        self.dashboard.add_widgets(
+            cloudwatch.GraphWidget(
+                title="/auth/login phases p99 (ms)",
+                left=[
+                    self.app_metric(phase, "/auth/login").with_(label=phase)
+                    for phase in LOGIN_PHASES + OUTBOUND_TIMINGS
+                ],
+                width=12,
+            ),
+        )
+        self.dashboard.add_widgets(
+            cloudwatch.GraphWidget(
+                title="ALB target response time p99 (s)",
+                left=[metric.with_(label=name) for name, metric in alb_metrics.items()],
+                width=12,
+            ),
+            cloudwatch.GraphWidget(
+                title="Service CPU p99 (%)",
+                left=[metric.with_(label=name) for name, metric in cpu_metrics.items()],
+                width=12,
+            ),
+        )
+        # Provenance signing: KMS quota usage and signing latency
+        signing_alarms = signing_alarms or {}
+        if signing_alarms:
+            self.dashboard.add_widgets(
+                *(
+                    cloudwatch.AlarmWidget(title=title, alarm=alarm, width=12)
+                    for title, alarm in signing_alarms.items()
+                )
+            )
+        self.dashboard.add_widgets(
+            cloudwatch.AlarmStatusWidget(
+                title="p99 alarms",
+                alarms=self.alarms + list(signing_alarms.values()),
+                width=24,
+            )
+        )
+
+    def app_metric(self, name: str, route: str) -> cloudwatch.Metric:
+        return cloudwatch.Metric(
+            namespace=APP_METRICS_NAMESPACE,
+            metric_name=name,
+            dimensions_map={"Environment": self.environment_name, "Route": route},
+            statistic="p99",
+            period=PERIOD,
+        )
+
+    def add_p99_alarm(
+        self,
+        id: str,
+        metric: cloudwatch.IMetric,
+        threshold: float,
+        evaluation_periods: int,
+        description: str,
+    ) -> None:
+        # Missing data means no traffic, which is not a latency problem
+        self.alarms.append(
+            metric.create_alarm(
+                self,
+                f"{id}P99Alarm",
+                threshold=threshold,
+                evaluation_periods=evaluation_periods,
+                datapoints_to_alarm=evaluation_periods,
+                comparison_operator=cloudwatch.ComparisonOperator.GREATER_THAN_THRESHOLD,
+                treat_missing_data=cloudwatch.TreatMissingData.NOT_BREACHING,
+                alarm_description=description,
+            )
+        )
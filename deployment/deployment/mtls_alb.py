@@ -7,8 +7,19 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+from deployment.load_balancing import tune_load_balancer, tune_target_group
+from deployment.public_load_balancer import PublicLoadBalancer
+from models import TargetGroupHealth
+
 
 class MtlsAlb(Construct):
+    """mTLS listener for /perseus/messages.
+
+    Traffic goes to `target_group` when given (the app's own target group on
+    a shared ALB), otherwise to a new target group registering `target`, any
+    ECS load balancer target such as `service.load_balancer_target(...)`.
+    """
+
     def __init__(
         self,
         scope: Construct,
@@ -17,45 +28,81 @@ class MtlsAlb(Construct):
         trust_store: elbv2.CfnTrustStore,
         certificate: acm.ICertificate,
         mtls_domain: str,
-        hosted_zone_name: str,
+        hosted_zone: route53.IHostedZone,
+        target_group_health: TargetGroupHealth,
+        load_balancer: PublicLoadBalancer | None = None,
+        target_group: elbv2.IApplicationTargetGroup | None = None,
+        target: elbv2.IApplicationLoadBalancerTarget | None = None,
+        port: int = 443,
     ):
         super().__init__(scope, id)
 
-        # Security group for the mTLS ALB
-        self.alb_sg = ec2.SecurityGroup(self, "MtlsAlbSG", vpc=vpc)
-        self.alb_sg.add_ingress_rule(
-            ec2.Peer.any_ipv4(), ec2.Port.tcp(443), "Allow HTTPS traffic"
-        )
+        if load_balancer:
+            # Shared layout: add the mTLS listener to the shared ALB
+            self.alb_sg = load_balancer.alb_sg
+            self.alb = load_balancer.alb
+        else:
+            # Security group for the mTLS ALB
+            self.alb_sg = ec2.SecurityGroup(self, "MtlsAlbSG", vpc=vpc)
 
-        # mTLS ALB
-        self.alb = elbv2.ApplicationLoadBalancer(
-            self,
-            "MtlsAlb",
-            vpc=vpc,
-            internet_facing=True,
-            security_group=self.alb_sg,
-        )
+            # mTLS ALB
+            self.alb = elbv2.ApplicationLoadBalancer(
+                self,
+                "MtlsAlb",
+                vpc=vpc,
+                internet_facing=True,
+                security_group=self.alb_sg,
+            )
+            tune_load_balancer(self.alb)
 
-        # Target group for Fargate service (IP targets, port 3000)
-        self.target_group = elbv2.ApplicationTargetGroup(
-            self,
-            "MtlsTargetGroup",
-            vpc=vpc,
-            target_type=elbv2.TargetType.IP,
-            port=3000,
-            protocol=elbv2.ApplicationProtocol.HTTP,
-            health_check=elbv2.HealthCheck(path="/"),
+        self.alb_sg.add_ingress_rule(
+            ec2.Peer.any_ipv4(), ec2.Port.tcp(port), "Allow HTTPS traffic"
         )
 
-        # HTTPS listener with L2 construct (properly associates target group with ALB)
-        self.listener = self.alb.add_listener(
-            "MtlsHttpsListener",
-            port=443,
-            protocol=elbv2.ApplicationProtocol.HTTPS,
-            certificates=[certificate],
-            ssl_policy=elbv2.SslPolicy.TLS12,
-            default_target_groups=[self.target_group],
-        )
+        if target_group:
+            # Shared layout: reuse the app's existing target group
+            self.target_group = target_group
+        else:
+            # Target group for Fargate service (IP targets, port 3000)
+            self.target_group = elbv2.ApplicationTargetGroup(
+                self,
+                "MtlsTargetGroup",
+                vpc=vpc,
+                target_type=elbv2.TargetType.IP,
+                port=3000,
+                protocol=elbv2.ApplicationProtocol.HTTP,
+            )
+            tune_target_group(self.target_group, target_group_health)
+            if target:
+                self.target_group.add_target(target)
+
+        if load_balancer:
+            # Shared layout: forward mtls_domain to the target group and
+            # reject any other host on this listener
+            self.listener = self.alb.add_listener(
+                "MtlsHttpsListener",
+                port=port,
+                protocol=elbv2.ApplicationProtocol.HTTPS,
+                certificates=[certificate],
+                ssl_policy=elbv2.SslPolicy.TLS12,
+                default_action=elbv2.ListenerAction.fixed_response(404),
+            )
+            self.listener.add_target_groups(
+                "MtlsHost",
+                priority=10,
+                conditions=[elbv2.ListenerCondition.host_headers([mtls_domain])],
+                target_groups=[self.target_group],
+            )
+        else:
+            # HTTPS listener with L2 construct (properly associates target group with ALB)
+            self.listener = self.alb.add_listener(
+                "MtlsHttpsListener",
+                port=port,
+                protocol=elbv2.ApplicationProtocol.HTTPS,
+                certificates=[certificate],
+                ssl_policy=elbv2.SslPolicy.TLS12,
+                default_target_groups=[self.target_group],
+            )
 
         # Add mTLS mutual authentication via escape hatch on the L1 CfnListener
         cfn_listener = self.listener.node.default_child
@@ -65,10 +112,6 @@ class MtlsAlb(Construct):
         }
 
         # Route53 DNS record
-        hosted_zone = route53.HostedZone.from_lookup(
-            self, "HostedZone", domain_name=hosted_zone_name
-        )
-
         route53.ARecord(
             self,
             "MtlsAlbAliasRecord",
@@ -5,29 +5,76 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+from models import SubnetLayout
+
+# AWS APIs the tasks call, reached through interface endpoints in the private
+# layout: KMS Sign, Secrets Manager, ECR image pulls and CloudWatch Logs
+INTERFACE_ENDPOINTS = {
+    "Kms": ec2.InterfaceVpcEndpointAwsService.KMS,
+    "SecretsManager": ec2.InterfaceVpcEndpointAwsService.SECRETS_MANAGER,
+    "EcrApi": ec2.InterfaceVpcEndpointAwsService.ECR,
+    "EcrDocker": ec2.InterfaceVpcEndpointAwsService.ECR_DOCKER,
+    "Logs": ec2.InterfaceVpcEndpointAwsService.CLOUDWATCH_LOGS,
+}
+
 
 class NetworkConstruct(Construct):
-    def __init__(self, scope: Construct, id: str, environment_name: str):
+    """VPC, task security group and service discovery namespace.
+
+    With `subnet_layout="public"` tasks run in the public subnets with public
+    IPs and reach AWS APIs through the internet gateway. With "private" they
+    run in private subnets behind a single NAT gateway (still needed for the
+    authorisation and data servers and public ECR), and KMS, S3, Secrets
+    Manager, ECR, CloudWatch Logs and DynamoDB traffic stays inside the VPC
+    through endpoints. The ALBs stay in the public subnets either way.
+    """
+
+    def __init__(
+        self,
+        scope: Construct,
+        id: str,
+        environment_name: str,
+        subnet_layout: SubnetLayout = "public",
+    ):
         super().__init__(scope, id)
 
-        # Create VPC with only public subnets (no NAT gateways needed)
+        private = subnet_layout == "private"
+        subnet_configuration = [
+            ec2.SubnetConfiguration(
+                name=f"EDP-{environment_name}-PublicSubnets",
+                subnet_type=ec2.SubnetType.PUBLIC,
+                cidr_mask=25,  # Changed from 24 to avoid CIDR conflicts
+            ),
+        ]
+        if private:
+            subnet_configuration.append(
+                ec2.SubnetConfiguration(
+                    name=f"EDP-{environment_name}-PrivateSubnets",
+                    subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS,
+                    cidr_mask=24,
+                )
+            )
+
         self.vpc = ec2.Vpc(
             self,
             f"CapVpc-{environment_name}",
             max_azs=2,  # ALB requires at least 2 AZs
-            nat_gateways=0,  # No NAT gateways - use public IPs instead
+            # Public layout: no NAT gateways, tasks use public IPs instead
+            nat_gateways=1 if private else 0,
             ip_addresses=ec2.IpAddresses.cidr(
                 "172.16.0.0/16"
             ),  # Use different CIDR range
-            subnet_configuration=[
-                ec2.SubnetConfiguration(
-                    name=f"EDP-{environment_name}-PublicSubnets",
-                    subnet_type=ec2.SubnetType.PUBLIC,
-                    cidr_mask=25,  # Changed from 24 to avoid CIDR conflicts
-                ),
-            ],
+            subnet_configuration=subnet_configuration,
         )
 
+        # Where ECS tasks run, and whether they need a public IP to get out
+        self.task_subnets = ec2.SubnetSelection(
+            subnet_type=(
+                ec2.SubnetType.PRIVATE_WITH_EGRESS if private else ec2.SubnetType.PUBLIC
+            )
+        )
+        self.assign_public_ip = not private
+
         self.ecs_sg = ec2.SecurityGroup(self, f"{environment_name}-EcsSG", vpc=self.vpc)
 
         # Create Cloud Map namespace for service discovery (internal services)
@@ -38,3 +85,28 @@ class NetworkConstruct(Construct):
             vpc=self.vpc,
             description=f"Service discovery namespace for {environment_name} environment",
         )
+
+        if private:
+            self.add_endpoints()
+
+    def add_endpoints(self) -> None:
+        # Gateway endpoints are free and route through the subnet route tables
+        self.vpc.add_gateway_endpoint(
+            "S3Endpoint", service=ec2.GatewayVpcEndpointAwsService.S3
+        )
+        self.vpc.add_gateway_endpoint(
+            "DynamoDbEndpoint", service=ec2.GatewayVpcEndpointAwsService.DYNAMODB
+        )
+
+        endpoint_sg = ec2.SecurityGroup(self, "EndpointSG", vpc=self.vpc)
+        endpoint_sg.add_ingress_rule(
+            self.ecs_sg, ec2.Port.tcp(443), "Allow ECS tasks to reach AWS APIs"
+        )
+        for name, service in INTERFACE_ENDPOINTS.items():
+            self.vpc.add_interface_endpoint(
+                f"{name}Endpoint",
+                service=service,
+                subnets=self.task_subnets,
+                security_groups=[endpoint_sg],
+                private_dns_enabled=True,
+            )
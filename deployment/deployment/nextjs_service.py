@@ -2,14 +2,30 @@ from aws_cdk import (
     aws_ec2 as ec2,
     aws_ecs as ecs,
     aws_iam as iam,
-    aws_ecr_assets as ecr_assets,
     aws_ecs_patterns as ecs_patterns,
+    aws_elasticloadbalancingv2 as elbv2,
     aws_certificatemanager as acm,
+    aws_applicationautoscaling as appscaling,
     aws_route53 as route53,
+    Duration,
     Tags,
 )
 from constructs import Construct
 
+from deployment.container_platform import CpuArchitecture, runtime_platform
+from deployment.log_driver import aws_log_driver
+from deployment.load_balancing import (
+    APP_KEEP_ALIVE_TIMEOUT_MS,
+    tune_load_balancer,
+    tune_target_group,
+)
+from models import (
+    LoggingProfile,
+    RollingDeployment,
+    ScalingProfile,
+    TargetGroupHealth,
+)
+
 
 class NextJsService(Construct):
     def __init__(
@@ -23,8 +39,16 @@ class NextJsService(Construct):
         ecs_sg: ec2.SecurityGroup,
         certificate: acm.ICertificate,
         domain_name: str,
-        domain_zone_name: str,
-        env_name: str,
+        domain_zone: route53.IHostedZone,
+        image: ecs.ContainerImage,
+        scaling: ScalingProfile,
+        target_group_health: TargetGroupHealth,
+        rolling_deployment: RollingDeployment,
+        logging: LoggingProfile,
+        cpu_architecture: CpuArchitecture = "x86_64",
+        task_subnets: ec2.SubnetSelection | None = None,
+        assign_public_ip: bool = True,
+        load_balancer: elbv2.IApplicationLoadBalancer | None = None,
         **kwargs
     ):
         super().__init__(scope, id, **kwargs)
@@ -34,32 +58,109 @@ class NextJsService(Construct):
             self,
             "CapNextJsAppService",
             cluster=cluster,
-            cpu=256,
-            memory_limit_mib=512,
-            desired_count=1,
+            cpu=scaling["cpu"],
+            memory_limit_mib=scaling["memory_limit_mib"],
+            desired_count=scaling["min_tasks"],
+            runtime_platform=runtime_platform(cpu_architecture),
             task_image_options=ecs_patterns.ApplicationLoadBalancedTaskImageOptions(
-                image=ecs.ContainerImage.from_asset(
-                    "../",
-                    platform=ecr_assets.Platform.LINUX_AMD64,
-                    build_args={"ENV": env_name},
-                ),
+                image=image,
                 container_port=3000,
-                environment=environment,
+                log_driver=aws_log_driver(self, "nextjs", logging),
+                environment={
+                    # Read by the Next.js standalone server
+                    "KEEP_ALIVE_TIMEOUT": str(APP_KEEP_ALIVE_TIMEOUT_MS),
+                    # Load secrets and discovery before passing health checks
+                    "STARTUP_MODE": "eager",
+                    **environment,
+                },
             ),
+            # An existing ALB is passed in for the shared load balancer layout
+            load_balancer=load_balancer,
             public_load_balancer=True,
-            assign_public_ip=True,
+            task_subnets=task_subnets,
+            assign_public_ip=assign_public_ip,
             security_groups=[ecs_sg],
             enable_execute_command=True,
             domain_name=domain_name,
-            domain_zone=route53.HostedZone.from_lookup(
-                self, "DomainZone", domain_name=domain_zone_name
-            ),
+            domain_zone=domain_zone,
             certificate=certificate,
+            # Keep full capacity during deploys and roll back a release whose
+            # tasks never become healthy
+            min_healthy_percent=rolling_deployment["min_healthy_percent"],
+            max_healthy_percent=rolling_deployment["max_healthy_percent"],
+            circuit_breaker=ecs.DeploymentCircuitBreaker(rollback=True),
+            health_check_grace_period=Duration.seconds(
+                rolling_deployment["health_check_grace_period_seconds"]
+            ),
         )
 
-        # Configure health check path
-        fargate_service.target_group.configure_health_check(path="/")
+        # Health check, draining and ALB connection settings shared with the mTLS ALB
+        tune_target_group(fargate_service.target_group, target_group_health)
+        tune_load_balancer(fargate_service.load_balancer)
+
+        if load_balancer:
+            # The shared ALB also fronts mtls_domain; serve only our host here
+            fargate_service.listener.add_action(
+                "Default", action=elbv2.ListenerAction.fixed_response(404)
+            )
+            fargate_service.listener.add_target_groups(
+                "AppHost",
+                priority=10,
+                conditions=[elbv2.ListenerCondition.host_headers([domain_name])],
+                target_groups=[fargate_service.target_group],
+            )
+
         fargate_service.task_definition.task_role.add_managed_policy(secrets_policy)
 
+        # Scale between min_tasks and max_tasks on request rate, CPU and memory
+        scale_in_cooldown = Duration.seconds(scaling["scale_in_cooldown_seconds"])
+        scale_out_cooldown = Duration.seconds(scaling["scale_out_cooldown_seconds"])
+
+        self.scaling = fargate_service.service.auto_scale_task_count(
+            min_capacity=scaling["min_tasks"],
+            max_capacity=scaling["max_tasks"],
+        )
+        self.scaling.scale_on_request_count(
+            "RequestCountScaling",
+            requests_per_target=scaling["requests_per_target"],
+            target_group=fargate_service.target_group,
+            scale_in_cooldown=scale_in_cooldown,
+            scale_out_cooldown=scale_out_cooldown,
+        )
+        self.scaling.scale_on_cpu_utilization(
+            "CpuScaling",
+            target_utilization_percent=scaling["target_cpu_utilization"],
+            scale_in_cooldown=scale_in_cooldown,
+            scale_out_cooldown=scale_out_cooldown,
+        )
+        self.scaling.scale_on_memory_utilization(
+            "MemoryScaling",
+            target_utilization_percent=scaling["target_memory_utilization"],
+            scale_in_cooldown=scale_in_cooldown,
+            scale_out_cooldown=scale_out_cooldown,
+        )
+
+        # Step out when p99 target response time breaches the latency target,
+        # even if request count and CPU still look healthy (e.g. slow upstreams)
+        latency_target = scaling["target_response_time_seconds"]
+        self.scaling.scale_on_metric(
+            "LatencyScaling",
+            metric=fargate_service.target_group.metrics.target_response_time(
+                statistic="p99",
+                period=Duration.minutes(1),
+            ),
+            scaling_steps=[
+                appscaling.ScalingInterval(lower=latency_target, change=1),
+                appscaling.ScalingInterval(lower=latency_target * 2, change=2),
+            ],
+            adjustment_type=appscaling.AdjustmentType.CHANGE_IN_CAPACITY,
+            cooldown=scale_out_cooldown,
+            evaluation_periods=2,
+            datapoints_to_alarm=2,
+        )
+
         # Expose the underlying Fargate service for additional target group registration
         self.service = fargate_service.service
+        self.target_group = fargate_service.target_group
+        self.load_balancer = fargate_service.load_balancer
+        self.task_role = fargate_service.task_definition.task_role
@@ -10,8 +10,13 @@ class SecretsManagerPolicy(Construct):
             "SSMAccessPolicy",
             managed_policy_name=f"{app_name}-{env_name}-SecretsManagerPolicy",
             statements=[
+                # DescribeSecret lets tasks check for a rotated version
+                # without re-reading the secret value
                 iam.PolicyStatement(
-                    actions=["secretsmanager:GetSecretValue"],
+                    actions=[
+                        "secretsmanager:GetSecretValue",
+                        "secretsmanager:DescribeSecret",
+                    ],
                     resources=[
                         f"arn:aws:secretsmanager:{Aws.REGION}:{Aws.ACCOUNT_ID}:secret:{env_name}/perseus-demo-cap/mtls-key-bundle*"
                     ],
@@ -19,6 +24,11 @@ class SecretsManagerPolicy(Construct):
                 iam.PolicyStatement(
                     actions=["kms:Decrypt"],
                     resources=["*"],
+                    conditions={
+                        "StringEquals": {
+                            "kms:ViaService": f"secretsmanager.{Aws.REGION}.amazonaws.com"
+                        }
+                    },
                 ),
             ],
         )
@@ -1,14 +1,41 @@
 from aws_cdk import (
+    aws_applicationautoscaling as appscaling,
+    aws_cloudwatch as cloudwatch,
     aws_ec2 as ec2,
     aws_ecs as ecs,
     aws_iam as iam,
     aws_kms as kms,
     aws_s3 as s3,
     aws_servicediscovery as servicediscovery,
+    Duration,
     Tags,
 )
 from constructs import Construct
 
+from deployment.certificates_bucket import ROOT_CA_CERTIFICATE_KEY, SIGNING_BUNDLE_KEY
+from deployment.log_driver import aws_log_driver
+from models import (
+    LoggingProfile,
+    ProvenanceScalingProfile,
+    RollingDeployment,
+    ServiceDiscovery,
+)
+
+PROVENANCE_DNS_NAME = "provenance-service"
+PROVENANCE_PORT = 8080
+# Service Connect port name, also the DiscoveryName of its metrics
+PROVENANCE_PORT_NAME = "provenance"
+
+
+def provenance_service_url(
+    service_discovery: ServiceDiscovery, namespace_name: str
+) -> str:
+    """PROVENANCE_SERVICE_URL for callers, by how they discover the service."""
+    if service_discovery == "service_connect":
+        # Resolved by the Service Connect proxy in the calling task
+        return f"http://{PROVENANCE_DNS_NAME}:{PROVENANCE_PORT}"
+    return f"http://{PROVENANCE_DNS_NAME}.{namespace_name}:{PROVENANCE_PORT}"
+
 
 class ProvenanceService(Construct):
     """Internal-only provenance service accessible via ECS service discovery."""
@@ -25,14 +52,20 @@ class ProvenanceService(Construct):
         ecs_sg: ec2.SecurityGroup,
         environment_name: str,
         service_discovery_namespace: servicediscovery.INamespace,
+        scaling: ProvenanceScalingProfile,
+        rolling_deployment: RollingDeployment,
+        logging: LoggingProfile,
+        task_subnets: ec2.SubnetSelection | None = None,
+        assign_public_ip: bool = True,
+        service_discovery: ServiceDiscovery = "cloud_map",
         **kwargs,
     ):
         super().__init__(scope, id, **kwargs)
 
         # Build environment variables
         environment = {
-            "ROOT_CA_CERTIFICATE": f"s3://{certificates_bucket.bucket_name}/root-ca.pem",
-            "SIGNING_BUNDLE": f"s3://{certificates_bucket.bucket_name}/signing-bundle.pem",
+            "ROOT_CA_CERTIFICATE": f"s3://{certificates_bucket.bucket_name}/{ROOT_CA_CERTIFICATE_KEY}",
+            "SIGNING_BUNDLE": f"s3://{certificates_bucket.bucket_name}/{SIGNING_BUNDLE_KEY}",
             "KMS_KEY_ID": kms_key.key_id,
             "SCHEME_URI": "https://registry.core.sandbox.trust.ib1.org/scheme/perseus",
             "TRUST_FRAMEWORK_URL": "https://registry.core.sandbox.trust.ib1.org/trust-framework",
@@ -42,8 +75,8 @@ class ProvenanceService(Construct):
         task_definition = ecs.FargateTaskDefinition(
             self,
             "ProvenanceTaskDefinition",
-            cpu=256,
-            memory_limit_mib=512,
+            cpu=scaling["cpu"],
+            memory_limit_mib=scaling["memory_limit_mib"],
         )
 
         # Add container to task definition
@@ -53,18 +86,28 @@ class ProvenanceService(Construct):
                 "public.ecr.aws/q9k4j5t2/ib1/provenance-service:latest"
             ),
             environment=environment,
-            logging=ecs.LogDrivers.aws_logs(
-                stream_prefix="provenance-service",
-            ),
+            logging=aws_log_driver(self, "provenance-service", logging),
         )
 
+        service_connect = service_discovery == "service_connect"
         container.add_port_mappings(
             ecs.PortMapping(
-                container_port=8080,
+                container_port=PROVENANCE_PORT,
                 protocol=ecs.Protocol.TCP,
+                # Service Connect refers to the port by name and needs its
+                # protocol to load balance and retry per request
+                name=PROVENANCE_PORT_NAME if service_connect else None,
+                app_protocol=ecs.AppProtocol.http if service_connect else None,
             )
         )
 
+        # Callers (the app and ingestion tasks) share ecs_sg with this service
+        ecs_sg.add_ingress_rule(
+            ecs_sg,
+            ec2.Port.tcp(PROVENANCE_PORT),
+            "Allow app tasks to reach the provenance service",
+        )
+
         # Attach the provenance service policy to the task role
         task_definition.task_role.add_managed_policy(provenance_service_policy)
 
@@ -74,21 +117,123 @@ class ProvenanceService(Construct):
             "ProvenanceService",
             cluster=cluster,
             task_definition=task_definition,
-            desired_count=1,
+            desired_count=scaling["min_tasks"],
             security_groups=[ecs_sg],
-            assign_public_ip=True,  # Needed for public subnets without NAT
+            # Public subnets have no NAT, so tasks there need a public IP
+            vpc_subnets=task_subnets,
+            assign_public_ip=assign_public_ip,
             enable_execute_command=True,
-            # Enable service discovery
-            cloud_map_options=ecs.CloudMapOptions(
-                name="provenance-service",
-                cloud_map_namespace=service_discovery_namespace,
-                container=container,
-                container_port=8080,
+            min_healthy_percent=rolling_deployment["min_healthy_percent"],
+            max_healthy_percent=rolling_deployment["max_healthy_percent"],
+            circuit_breaker=ecs.DeploymentCircuitBreaker(rollback=True),
+            # Service Connect: callers' proxies balance requests across tasks,
+            # retry failed ones and publish per-service connection metrics
+            service_connect_configuration=(
+                ecs.ServiceConnectProps(
+                    namespace=service_discovery_namespace.namespace_arn,
+                    services=[
+                        ecs.ServiceConnectService(
+                            port_mapping_name=PROVENANCE_PORT_NAME,
+                            dns_name=PROVENANCE_DNS_NAME,
+                            port=PROVENANCE_PORT,
+                        )
+                    ],
+                )
+                if service_connect
+                else None
             ),
         )
+        self._service_connect_namespace = (
+            service_discovery_namespace if service_connect else None
+        )
+
+        # Cloud Map: A records with a multivalue routing policy, so every
+        # healthy task is returned and a short TTL lets callers pick up new
+        # tasks as the service scales
+        if not service_connect:
+            self.cloud_map_service = servicediscovery.Service(
+                self,
+                "CloudMapService",
+                namespace=service_discovery_namespace,
+                name=PROVENANCE_DNS_NAME,
+                dns_record_type=servicediscovery.DnsRecordType.A,
+                dns_ttl=Duration.seconds(scaling["dns_ttl_seconds"]),
+                routing_policy=servicediscovery.RoutingPolicy.MULTIVALUE,
+                custom_health_check=servicediscovery.HealthCheckCustomConfig(
+                    failure_threshold=1
+                ),
+            )
+            fargate_service.associate_cloud_map_service(
+                service=self.cloud_map_service,
+                container=container,
+                container_port=PROVENANCE_PORT,
+            )
+
+        # Requests the Service Connect proxies in front of the tasks received.
+        # Cloud Map has no equivalent, since callers connect to tasks directly.
+        self.request_count_metric = (
+            cloudwatch.Metric(
+                namespace="AWS/ECS",
+                metric_name="RequestCount",
+                dimensions_map={
+                    "ClusterName": cluster.cluster_name,
+                    "ServiceName": fargate_service.service_name,
+                    "DiscoveryName": PROVENANCE_PORT_NAME,
+                },
+                statistic="Sum",
+                period=Duration.minutes(1),
+            )
+            if service_connect
+            else None
+        )
+
+        # Track CPU between min_tasks and max_tasks, and with Service Connect
+        # step on request volume to scale out before CPU catches up
+        self.scaling = fargate_service.auto_scale_task_count(
+            min_capacity=scaling["min_tasks"],
+            max_capacity=scaling["max_tasks"],
+        )
+        self.scaling.scale_on_cpu_utilization(
+            "CpuScaling",
+            target_utilization_percent=scaling["target_cpu_utilization"],
+            scale_in_cooldown=Duration.seconds(scaling["scale_in_cooldown_seconds"]),
+            scale_out_cooldown=Duration.seconds(scaling["scale_out_cooldown_seconds"]),
+        )
+        if self.request_count_metric:
+            self.scaling.scale_on_metric(
+                "RequestCountScaling",
+                metric=self.request_count_metric,
+                scaling_steps=[
+                    appscaling.ScalingInterval(
+                        upper=scaling["scale_in_requests_per_minute"], change=-1
+                    ),
+                    appscaling.ScalingInterval(
+                        lower=scaling["scale_out_requests_per_minute"], change=1
+                    ),
+                    appscaling.ScalingInterval(
+                        lower=scaling["scale_out_requests_per_minute"] * 3, change=3
+                    ),
+                ],
+                adjustment_type=appscaling.AdjustmentType.CHANGE_IN_CAPACITY,
+                cooldown=Duration.seconds(scaling["scale_out_cooldown_seconds"]),
+            )
         # Store references for potential exports
         self.service = fargate_service
         self.cluster = cluster
         self.service_discovery_name = (
-            f"provenance-service.{service_discovery_namespace.namespace_name}"
+            f"{PROVENANCE_DNS_NAME}.{service_discovery_namespace.namespace_name}"
+        )
+
+    def connect_client(self, service: ecs.BaseService) -> None:
+        """Let `service` call this one through Service Connect.
+
+        A no-op with Cloud Map, where callers use plain DNS. Service Connect
+        clients only learn endpoints that exist when they deploy, so the client
+        is deployed after this service.
+        """
+        if not self._service_connect_namespace:
+            return
+        service.enable_service_connect(
+            namespace=self._service_connect_namespace.namespace_arn
         )
+        service.node.add_dependency(self.service)
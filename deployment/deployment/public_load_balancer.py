@@ -0,0 +1,26 @@
+from aws_cdk import aws_ec2 as ec2, aws_elasticloadbalancingv2 as elbv2
+from constructs import Construct
+
+from deployment.load_balancing import tune_load_balancer
+
+
+class PublicLoadBalancer(Construct):
+    """Internet-facing ALB shared by the public and mTLS listeners.
+
+    Used for the "shared" load balancer layout, where one ALB serves both
+    `domain` and `mtls_domain` instead of NextJsService and MtlsAlb each
+    creating their own.
+    """
+
+    def __init__(self, scope: Construct, id: str, vpc: ec2.Vpc, **kwargs):
+        super().__init__(scope, id, **kwargs)
+
+        self.alb_sg = ec2.SecurityGroup(self, "AlbSG", vpc=vpc)
+        self.alb = elbv2.ApplicationLoadBalancer(
+            self,
+            "Alb",
+            vpc=vpc,
+            internet_facing=True,
+            security_group=self.alb_sg,
+        )
+        tune_load_balancer(self.alb)
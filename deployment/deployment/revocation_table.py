@@ -0,0 +1,30 @@
+from aws_cdk import (
+    aws_dynamodb as dynamodb,
+    aws_iam as iam,
+    RemovalPolicy,
+)
+from constructs import Construct
+
+
+class RevocationTable(Construct):
+    """DynamoDB table sharing revoked token and grant identifiers between tasks."""
+
+    def __init__(self, scope: Construct, id: str, environment_name: str, **kwargs):
+        super().__init__(scope, id, **kwargs)
+
+        self.table = dynamodb.Table(
+            self,
+            "RevocationTable",
+            table_name=f"perseus-cap-{environment_name}-revocations",
+            partition_key=dynamodb.Attribute(
+                name="revokedId", type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            # Entries only need to outlive the tokens they revoke
+            time_to_live_attribute="expiresAt",
+            removal_policy=RemovalPolicy.DESTROY,
+        )
+        self.environment = {"REVOCATION_DYNAMODB_TABLE": self.table.table_name}
+
+    def grant_read_write(self, grantee: iam.IGrantable) -> iam.Grant:
+        return self.table.grant_read_write_data(grantee)
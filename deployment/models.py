@@ -1,4 +1,72 @@
-from typing import TypedDict, Optional
+from typing import Literal, TypedDict, Optional
+
+SubnetLayout = Literal["public", "private"]
+ServiceDiscovery = Literal["cloud_map", "service_connect"]
+
+
+class ScalingProfile(TypedDict):
+    cpu: int
+    memory_limit_mib: int
+    min_tasks: int
+    max_tasks: int
+    requests_per_target: int
+    target_cpu_utilization: int
+    target_memory_utilization: int
+    target_response_time_seconds: float
+    scale_in_cooldown_seconds: int
+    scale_out_cooldown_seconds: int
+
+
+class ProvenanceScalingProfile(TypedDict):
+    cpu: int
+    memory_limit_mib: int
+    min_tasks: int
+    max_tasks: int
+    target_cpu_utilization: int
+    scale_out_requests_per_minute: int
+    scale_in_requests_per_minute: int
+    scale_in_cooldown_seconds: int
+    scale_out_cooldown_seconds: int
+    dns_ttl_seconds: int
+
+
+class TargetGroupHealth(TypedDict):
+    health_check_path: str
+    interval_seconds: int
+    timeout_seconds: int
+    healthy_threshold: int
+    unhealthy_threshold: int
+    deregistration_delay_seconds: int
+    slow_start_seconds: int
+
+
+class RollingDeployment(TypedDict):
+    min_healthy_percent: int
+    max_healthy_percent: int
+    health_check_grace_period_seconds: int
+
+
+class LoggingProfile(TypedDict):
+    # LOG_LEVEL and LOG_SAMPLE_RATES for the app containers
+    level: Literal["debug", "info", "warn", "error"]
+    sample_rates: str
+    retention_days: int
+    # Memory the non-blocking awslogs driver buffers before dropping entries
+    max_buffer_size_mib: int
+
+
+class LatencyAlarms(TypedDict):
+    route_duration_p99_ms: int
+    target_response_time_p99_seconds: float
+    service_cpu_p99_percent: int
+    # Consecutive one-minute periods over the threshold before alarming
+    evaluation_periods: int
+
+
+class KmsAlarms(TypedDict):
+    # KMS Sign requests per second as a percentage of the account quota
+    sign_quota_usage_percent: int
+    evaluation_periods: int
 
 
 class Context(TypedDict):
@@ -7,3 +75,26 @@ class Context(TypedDict):
     hosted_zone_name: str
     auth_domain: str
     mtls_domain: str
+    nextjs_scaling: ScalingProfile
+    provenance_scaling: ProvenanceScalingProfile
+    message_sink: Literal["sqs", "dynamodb"]
+    target_group_health: TargetGroupHealth
+    rolling_deployment: RollingDeployment
+    # "separate": one ALB each for the app and mTLS endpoints; "shared": one
+    # ALB with a listener per endpoint (mTLS on SHARED_MTLS_PORT)
+    load_balancer_layout: Literal["separate", "shared"]
+    # Serve /perseus/messages from its own ECS service (APP_MODE=ingestion)
+    # instead of the app service, scaled by ingestion_scaling
+    dedicated_ingestion: bool
+    # Architecture the app image is built for and its Fargate tasks run on
+    cpu_architecture: Literal["arm64", "x86_64"]
+    logging: LoggingProfile
+    latency_alarms: LatencyAlarms
+    kms_alarms: KmsAlarms
+    # "public": tasks in public subnets with public IPs; "private": private
+    # subnets with a NAT gateway and VPC endpoints for AWS APIs
+    subnet_layout: SubnetLayout
+    # How the app reaches the provenance service: plain Cloud Map DNS, or ECS
+    # Service Connect (client-side load balancing, retries and metrics)
+    service_discovery: ServiceDiscovery
+    ingestion_scaling: ScalingProfile
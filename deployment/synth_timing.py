@@ -0,0 +1,128 @@
+"""Time `cdk synth` of app.py for each deployment context.
+
+Runs app.py the way the CDK CLI does (a fresh process with CDK_CONTEXT_JSON
+and CDK_OUTDIR), so the numbers include Python and jsii start-up, hosted
+zone resolution and asset fingerprinting. No AWS credentials are needed:
+the hosted zone is imported by id, and a pre-seeded lookup result covers
+revisions that still look it up.
+
+    python synth_timing.py                      # working tree, dev and prod
+    python synth_timing.py --ref HEAD~1         # also time another revision
+    python synth_timing.py --runs 5 --contexts prod
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DEPLOYMENT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPOSITORY_ROOT = os.path.dirname(DEPLOYMENT_DIR)
+
+ACCOUNT = "123456789012"
+REGION = "eu-west-2"
+HOSTED_ZONE_NAME = "perseus-demo-cap.ib1.org"
+HOSTED_ZONE_ID = "Z0000000000000000000"
+
+
+def synth_context(deployment_context: str) -> dict:
+    return {
+        "deployment_context": deployment_context,
+        "hosted_zone_id": HOSTED_ZONE_ID,
+        f"hosted-zone:account={ACCOUNT}:domainName={HOSTED_ZONE_NAME}:region={REGION}": {
+            "Id": f"/hostedzone/{HOSTED_ZONE_ID}",
+            "Name": f"{HOSTED_ZONE_NAME}.",
+        },
+    }
+
+
+def time_synth(deployment_dir: str, deployment_context: str) -> float:
+    """Wall-clock seconds for one synth of deployment_dir/app.py."""
+    with tempfile.TemporaryDirectory() as outdir:
+        env = {
+            **os.environ,
+            "CDK_CONTEXT_JSON": json.dumps(synth_context(deployment_context)),
+            "CDK_OUTDIR": outdir,
+            "CDK_DEFAULT_ACCOUNT": ACCOUNT,
+            "CDK_DEFAULT_REGION": REGION,
+            "JSII_SILENCE_WARNING_DEPRECATED_NODE_VERSION": "1",
+        }
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "app.py"],
+            cwd=deployment_dir,
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        return time.perf_counter() - started
+
+
+def time_revision(
+    label: str, deployment_dir: str, contexts: list[str], runs: int
+) -> list[dict]:
+    results = []
+    for deployment_context in contexts:
+        seconds = [time_synth(deployment_dir, deployment_context) for _ in range(runs)]
+        results.append(
+            {
+                "revision": label,
+                "context": deployment_context,
+                "runs": runs,
+                "median_s": round(statistics.median(seconds), 2),
+                "min_s": round(min(seconds), 2),
+            }
+        )
+        print(
+            f"{label:<16} {deployment_context:<6} "
+            f"median {results[-1]['median_s']:>6.2f}s  min {results[-1]['min_s']:>6.2f}s",
+            file=sys.stderr,
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--contexts", nargs="+", default=["dev", "prod"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument(
+        "--ref",
+        action="append",
+        default=[],
+        help="git revision to time as well, e.g. the commit before a change",
+    )
+    args = parser.parse_args()
+
+    results = time_revision("working tree", DEPLOYMENT_DIR, args.contexts, args.runs)
+    for ref in args.ref:
+        # A detached worktree, so the revision is timed as it was committed
+        with tempfile.TemporaryDirectory() as worktree:
+            subprocess.run(
+                ["git", "worktree", "add", "--detach", worktree, ref],
+                cwd=REPOSITORY_ROOT,
+                check=True,
+                capture_output=True,
+            )
+            try:
+                results += time_revision(
+                    ref,
+                    os.path.join(worktree, "deployment"),
+                    args.contexts,
+                    args.runs,
+                )
+            finally:
+                subprocess.run(
+                    ["git", "worktree", "remove", "--force", worktree],
+                    cwd=REPOSITORY_ROOT,
+                    check=True,
+                )
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
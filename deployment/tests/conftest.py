@@ -0,0 +1,87 @@
+import os
+import runpy
+import sys
+from unittest import mock
+
+import aws_cdk as cdk
+import pytest
+from aws_cdk import App
+from aws_cdk.assertions import Template
+
+DEPLOYMENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DEPLOYMENT_DIR)
+
+ACCOUNT = "123456789012"
+REGION = "eu-west-2"
+HOSTED_ZONE_NAME = "perseus-demo-cap.ib1.org"
+# Imported by id through HostedZoneProvider, so synth does no lookup
+HOSTED_ZONE_ID = "Z1111111111111111111"
+# Returned by the pre-seeded lookup when hosted_zone_id is left unset
+LOOKUP_HOSTED_ZONE_ID = "Z0000000000000000000"
+
+
+def lookup_context() -> dict:
+    """Pre-seeded context values so synth never calls out to AWS."""
+    return {
+        "hosted_zone_id": HOSTED_ZONE_ID,
+        # For synths that pass hosted_zone_id="" to exercise the lookup
+        f"hosted-zone:account={ACCOUNT}:domainName={HOSTED_ZONE_NAME}:region={REGION}": {
+            "Id": f"/hostedzone/{LOOKUP_HOSTED_ZONE_ID}",
+            "Name": f"{HOSTED_ZONE_NAME}.",
+        },
+    }
+
+
+def synth_app(deployment_context: str, outdir: str, **extra_context) -> dict:
+    """Run app.py for a deployment context and return its module globals.
+
+    The jsii kernel is a separate node process that never sees later changes
+    to os.environ, so context is injected by wrapping the App constructor.
+    Extra context (e.g. load_balancer_layout) is passed as with `cdk -c`.
+    """
+    context = {
+        "deployment_context": deployment_context,
+        **lookup_context(),
+        **extra_context,
+    }
+    env = {"CDK_DEFAULT_ACCOUNT": ACCOUNT, "CDK_DEFAULT_REGION": REGION}
+    previous_env = {key: os.environ.get(key) for key in env}
+    os.environ.update(env)
+    try:
+        with mock.patch.object(
+            cdk, "App", lambda **kwargs: App(context=context, outdir=outdir, **kwargs)
+        ):
+            return runpy.run_path(os.path.join(DEPLOYMENT_DIR, "app.py"))
+    finally:
+        for key, value in previous_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+@pytest.fixture(scope="session")
+def synthesized(tmp_path_factory):
+    """Synthesise each deployment context (and extra context) once per session."""
+    cache: dict[tuple, dict] = {}
+
+    def _synth(deployment_context: str, **extra_context) -> dict:
+        key = (deployment_context, *sorted(extra_context.items()))
+        if key not in cache:
+            outdir = tmp_path_factory.mktemp(f"cdk-{deployment_context}")
+            cache[key] = synth_app(deployment_context, str(outdir), **extra_context)
+        return cache[key]
+
+    return _synth
+
+
+@pytest.fixture(scope="session")
+def template(synthesized):
+    """Return the assertions Template for a deployment context."""
+
+    def _template(deployment_context: str, **extra_context) -> Template:
+        return Template.from_stack(
+            synthesized(deployment_context, **extra_context)["stack"]
+        )
+
+    return _template
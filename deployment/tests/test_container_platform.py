@@ -0,0 +1,40 @@
+import pytest
+
+
+def app_task_definitions(stack_template):
+    # The provenance service runs a prebuilt registry image of its own
+    return [
+        task_definition["Properties"]
+        for logical_id, task_definition in stack_template.find_resources(
+            "AWS::ECS::TaskDefinition"
+        ).items()
+        if not logical_id.startswith("ProvenanceService")
+    ]
+
+
+def container_environment(task_definition):
+    (container,) = task_definition["ContainerDefinitions"]
+    return {
+        variable["Name"]: variable["Value"] for variable in container["Environment"]
+    }
+
+
+@pytest.mark.parametrize("deployment_context", ["dev", "prod"])
+def test_app_tasks_run_on_the_context_architecture(deployment_context, template):
+    stack_template = template(deployment_context)
+
+    task_definitions = app_task_definitions(stack_template)
+    assert task_definitions
+    for task_definition in task_definitions:
+        assert task_definition["RuntimePlatform"] == {
+            "CpuArchitecture": "ARM64",
+            "OperatingSystemFamily": "LINUX",
+        }
+        assert container_environment(task_definition)["STARTUP_MODE"] == "eager"
+
+
+def test_architecture_can_be_overridden(template):
+    stack_template = template("dev", cpu_architecture="x86_64")
+
+    for task_definition in app_task_definitions(stack_template):
+        assert task_definition["RuntimePlatform"]["CpuArchitecture"] == "X86_64"
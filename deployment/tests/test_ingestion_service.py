@@ -0,0 +1,85 @@
+import pytest
+from aws_cdk.assertions import Match
+
+
+def environment_value(container, name):
+    for variable in container["Environment"]:
+        if variable["Name"] == name:
+            return variable["Value"]
+    return None
+
+
+def ingestion_container(stack_template):
+    for logical_id, task_definition in stack_template.find_resources(
+        "AWS::ECS::TaskDefinition"
+    ).items():
+        if logical_id.startswith("IngestionService"):
+            (container,) = task_definition["Properties"]["ContainerDefinitions"]
+            return container
+    raise AssertionError("no ingestion task definition")
+
+
+@pytest.mark.parametrize("deployment_context", ["dev", "prod"])
+def test_messages_served_from_the_app_service_by_default(deployment_context, template):
+    stack_template = template(deployment_context)
+
+    stack_template.resource_count_is("AWS::ECS::Service", 2)
+    for task_definition in stack_template.find_resources(
+        "AWS::ECS::TaskDefinition"
+    ).values():
+        for container in task_definition["Properties"]["ContainerDefinitions"]:
+            assert environment_value(container, "APP_MODE") is None
+
+
+@pytest.mark.parametrize(
+    "deployment_context,extra",
+    [
+        ("prod", {"dedicated_ingestion": "true"}),
+        ("dev", {"dedicated_ingestion": "true"}),
+    ],
+)
+def test_dedicated_ingestion_service(deployment_context, extra, template):
+    stack_template = template(deployment_context, **extra)
+
+    stack_template.resource_count_is("AWS::ECS::Service", 3)
+    container = ingestion_container(stack_template)
+    assert environment_value(container, "APP_MODE") == "ingestion"
+    assert environment_value(container, "MESSAGE_SINK") is not None
+
+    # Only the ingestion service sits behind the mTLS target group
+    (service_id,) = [
+        logical_id
+        for logical_id, service in stack_template.find_resources(
+            "AWS::ECS::Service"
+        ).items()
+        if service["Properties"].get("LoadBalancers")
+        and any(
+            "MtlsAlb" in balancer["TargetGroupArn"]["Ref"]
+            for balancer in service["Properties"]["LoadBalancers"]
+        )
+    ]
+    assert service_id.startswith("IngestionService")
+
+    stack_template.has_resource_properties(
+        "AWS::ApplicationAutoScaling::ScalingPolicy",
+        {
+            "TargetTrackingScalingPolicyConfiguration": Match.object_like(
+                {
+                    "PredefinedMetricSpecification": Match.object_like(
+                        {"PredefinedMetricType": "ALBRequestCountPerTarget"}
+                    )
+                }
+            ),
+            "ScalingTargetId": {"Ref": Match.string_like_regexp("^IngestionService")},
+        },
+    )
+
+
+def test_dedicated_ingestion_on_shared_load_balancer(template):
+    stack_template = template(
+        "prod", load_balancer_layout="shared", dedicated_ingestion=True
+    )
+
+    stack_template.resource_count_is("AWS::ElasticLoadBalancingV2::LoadBalancer", 1)
+    stack_template.resource_count_is("AWS::ElasticLoadBalancingV2::TargetGroup", 2)
+    stack_template.resource_count_is("AWS::ElasticLoadBalancingV2::ListenerRule", 2)
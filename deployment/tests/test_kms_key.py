@@ -0,0 +1,62 @@
+import json
+
+import pytest
+from aws_cdk.assertions import Match
+
+
+def kms_alarms(synthesized, deployment_context):
+    return synthesized(deployment_context)["contexts"][deployment_context]["kms_alarms"]
+
+
+@pytest.mark.parametrize("deployment_context", ["dev", "prod"])
+def test_sign_quota_alarm(deployment_context, synthesized, template):
+    alarms = kms_alarms(synthesized, deployment_context)
+
+    template(deployment_context).has_resource_properties(
+        "AWS::CloudWatch::Alarm",
+        {
+            "Threshold": alarms["sign_quota_usage_percent"],
+            "EvaluationPeriods": alarms["evaluation_periods"],
+            "Metrics": Match.array_with(
+                [
+                    Match.object_like(
+                        {"Expression": Match.string_like_regexp("SERVICE_QUOTA")}
+                    ),
+                    Match.object_like(
+                        {
+                            "MetricStat": Match.object_like(
+                                {
+                                    "Metric": Match.object_like(
+                                        {
+                                            "Namespace": "AWS/Usage",
+                                            "MetricName": "CallCount",
+                                            "Dimensions": Match.array_with(
+                                                [{"Name": "Resource", "Value": "Sign"}]
+                                            ),
+                                        }
+                                    )
+                                }
+                            )
+                        }
+                    ),
+                ]
+            ),
+        },
+    )
+
+
+@pytest.mark.parametrize("deployment_context", ["dev", "prod"])
+def test_only_the_quota_alarm_watches_signing(deployment_context, template):
+    # Nothing deployed publishes a signing latency metric to alarm on
+    alarms = template(deployment_context).find_resources("AWS::CloudWatch::Alarm")
+    assert not [logical_id for logical_id in alarms if "SignLatency" in logical_id]
+
+
+def test_app_has_no_signing_key_access(template):
+    stack_template = template("dev")
+
+    # The app only signs through the provenance service; it reads neither the
+    # signing key nor the certificates bucket
+    assert "kms:GetPublicKey" not in json.dumps(
+        stack_template.find_resources("AWS::IAM::Policy")
+    )
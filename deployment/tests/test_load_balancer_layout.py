@@ -0,0 +1,84 @@
+import pytest
+from aws_cdk.assertions import Match
+
+from deployment.load_balancing import SHARED_MTLS_PORT
+
+LAYOUTS = ["separate", "shared"]
+
+
+def mtls_listener_properties(port):
+    return {
+        "Port": port,
+        "Protocol": "HTTPS",
+        "MutualAuthentication": Match.object_like({"Mode": "verify"}),
+    }
+
+
+@pytest.mark.parametrize("deployment_context", ["dev", "prod"])
+def test_separate_layout_has_two_load_balancers(deployment_context, template):
+    stack_template = template(deployment_context, load_balancer_layout="separate")
+
+    stack_template.resource_count_is("AWS::ElasticLoadBalancingV2::LoadBalancer", 2)
+    stack_template.resource_count_is("AWS::ElasticLoadBalancingV2::TargetGroup", 2)
+    stack_template.has_resource_properties(
+        "AWS::ElasticLoadBalancingV2::Listener", mtls_listener_properties(443)
+    )
+
+
+@pytest.mark.parametrize("deployment_context", ["dev", "prod"])
+def test_shared_layout_routes_both_hosts_to_one_target_group(
+    deployment_context, synthesized, template
+):
+    context = synthesized(deployment_context)["contexts"][deployment_context]
+    stack_template = template(
+        deployment_context, load_balancer_layout="shared", dedicated_ingestion=False
+    )
+
+    stack_template.resource_count_is("AWS::ElasticLoadBalancingV2::LoadBalancer", 1)
+    stack_template.resource_count_is("AWS::ElasticLoadBalancingV2::TargetGroup", 1)
+    stack_template.resource_count_is("AWS::ElasticLoadBalancingV2::Listener", 2)
+    stack_template.has_resource_properties(
+        "AWS::ElasticLoadBalancingV2::Listener",
+        mtls_listener_properties(SHARED_MTLS_PORT),
+    )
+
+    # Unknown hosts get a 404 on both listeners
+    listeners = stack_template.find_resources("AWS::ElasticLoadBalancingV2::Listener")
+    for listener in listeners.values():
+        (action,) = listener["Properties"]["DefaultActions"]
+        assert action["Type"] == "fixed-response"
+
+    (target_group_id,) = stack_template.find_resources(
+        "AWS::ElasticLoadBalancingV2::TargetGroup"
+    ).keys()
+    for host in [context["domain"], context["mtls_domain"]]:
+        stack_template.has_resource_properties(
+            "AWS::ElasticLoadBalancingV2::ListenerRule",
+            {
+                "Conditions": [
+                    {"Field": "host-header", "HostHeaderConfig": {"Values": [host]}}
+                ],
+                "Actions": [
+                    Match.object_like(
+                        {"Type": "forward", "TargetGroupArn": {"Ref": target_group_id}}
+                    )
+                ],
+            },
+        )
+
+    # Both domains resolve to the shared ALB
+    stack_template.resource_count_is("AWS::Route53::RecordSet", 2)
+
+
+@pytest.mark.parametrize("layout", LAYOUTS)
+def test_shared_load_balancer_tuning_applies_to_every_layout(layout, template):
+    stack_template = template("prod", load_balancer_layout=layout)
+
+    for load_balancer in stack_template.find_resources(
+        "AWS::ElasticLoadBalancingV2::LoadBalancer"
+    ).values():
+        attributes = {
+            attribute["Key"]: attribute["Value"]
+            for attribute in load_balancer["Properties"]["LoadBalancerAttributes"]
+        }
+        assert attributes["routing.http2.enabled"] == "true"
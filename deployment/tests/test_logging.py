@@ -0,0 +1,54 @@
+import pytest
+
+CONTEXTS = ["dev", "prod"]
+
+
+def containers(stack_template):
+    for logical_id, task_definition in stack_template.find_resources(
+        "AWS::ECS::TaskDefinition"
+    ).items():
+        for container in task_definition["Properties"]["ContainerDefinitions"]:
+            yield logical_id, container
+
+
+@pytest.mark.parametrize("deployment_context", CONTEXTS)
+def test_containers_log_without_blocking(deployment_context, synthesized, template):
+    logging = synthesized(deployment_context)["contexts"][deployment_context]["logging"]
+    stack_template = template(deployment_context)
+
+    for logical_id, container in containers(stack_template):
+        log_configuration = container["LogConfiguration"]
+        assert log_configuration["LogDriver"] == "awslogs", logical_id
+        options = log_configuration["Options"]
+        assert options["mode"] == "non-blocking", logical_id
+        assert options["max-buffer-size"] == (
+            f"{logging['max_buffer_size_mib'] * 1024 * 1024}b"
+        ), logical_id
+
+
+@pytest.mark.parametrize("deployment_context", CONTEXTS)
+def test_log_groups_expire(deployment_context, synthesized, template):
+    logging = synthesized(deployment_context)["contexts"][deployment_context]["logging"]
+    stack_template = template(deployment_context)
+
+    log_groups = stack_template.find_resources("AWS::Logs::LogGroup")
+    assert log_groups
+    for logical_id, log_group in log_groups.items():
+        assert (
+            log_group["Properties"]["RetentionInDays"] == logging["retention_days"]
+        ), logical_id
+
+
+@pytest.mark.parametrize("deployment_context", CONTEXTS)
+def test_app_containers_get_log_settings(deployment_context, synthesized, template):
+    logging = synthesized(deployment_context)["contexts"][deployment_context]["logging"]
+    stack_template = template(deployment_context)
+
+    for logical_id, container in containers(stack_template):
+        if logical_id.startswith("ProvenanceService"):
+            continue
+        environment = {
+            variable["Name"]: variable["Value"] for variable in container["Environment"]
+        }
+        assert environment["LOG_LEVEL"] == logging["level"], logical_id
+        assert environment["LOG_SAMPLE_RATES"] == logging["sample_rates"], logical_id
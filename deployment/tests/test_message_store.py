@@ -0,0 +1,104 @@
+import pytest
+from aws_cdk import App, Stack, aws_iam as iam
+from aws_cdk.assertions import Match, Template
+
+from deployment.message_store import MessageStore
+
+
+@pytest.mark.parametrize("deployment_context", ["dev", "prod"])
+def test_queue_wired_to_nextjs_task(deployment_context, template):
+    stack_template = template(deployment_context)
+
+    stack_template.has_resource_properties(
+        "AWS::SQS::Queue",
+        {
+            "QueueName": f"perseus-cap-{deployment_context}-messages",
+            "RedrivePolicy": Match.object_like({"maxReceiveCount": 5}),
+        },
+    )
+    stack_template.has_resource_properties(
+        "AWS::ECS::TaskDefinition",
+        {
+            "ContainerDefinitions": Match.array_with(
+                [
+                    Match.object_like(
+                        {
+                            "Environment": Match.array_with(
+                                [
+                                    {"Name": "MESSAGE_SINK", "Value": "sqs"},
+                                    Match.object_like({"Name": "MESSAGE_QUEUE_URL"}),
+                                ]
+                            )
+                        }
+                    )
+                ]
+            )
+        },
+    )
+    stack_template.has_resource_properties(
+        "AWS::IAM::Policy",
+        {
+            "PolicyDocument": {
+                "Statement": Match.array_with(
+                    [
+                        Match.object_like(
+                            {
+                                "Action": Match.array_with(["sqs:SendMessage"]),
+                                "Effect": "Allow",
+                            }
+                        )
+                    ]
+                )
+            },
+            "Roles": Match.array_with(
+                [
+                    {
+                        "Ref": Match.string_like_regexp(
+                            "NextJsServiceCapNextJsAppServiceTaskDefTaskRole"
+                        )
+                    }
+                ]
+            ),
+        },
+    )
+
+
+def test_dynamodb_sink_creates_table_and_grants_writes():
+    stack = Stack(App(), "MessageStoreStack")
+    role = iam.Role(
+        stack, "TaskRole", assumed_by=iam.ServicePrincipal("ecs-tasks.amazonaws.com")
+    )
+    store = MessageStore(stack, "MessageStore", environment_name="dev", sink="dynamodb")
+    store.grant_write(role)
+    stack_template = Template.from_stack(stack)
+
+    assert store.environment["MESSAGE_SINK"] == "dynamodb"
+    stack_template.has_resource_properties(
+        "AWS::DynamoDB::Table",
+        {
+            "TableName": "perseus-cap-dev-messages",
+            "KeySchema": [{"AttributeName": "messageId", "KeyType": "HASH"}],
+            "BillingMode": "PAY_PER_REQUEST",
+        },
+    )
+    stack_template.has_resource_properties(
+        "AWS::IAM::Policy",
+        {
+            "PolicyDocument": {
+                "Statement": Match.array_with(
+                    [
+                        Match.object_like(
+                            {"Action": Match.array_with(["dynamodb:BatchWriteItem"])}
+                        )
+                    ]
+                )
+            }
+        },
+    )
+
+
+def test_unknown_sink_is_rejected():
+    with pytest.raises(ValueError):
+        MessageStore(
+            Stack(App(), "Bad"), "MessageStore", environment_name="dev", sink="s3"
+        )
@@ -0,0 +1,98 @@
+import pytest
+from aws_cdk.assertions import Match
+
+from deployment.monitoring import APP_METRICS_NAMESPACE, LOGIN_PHASES, ROUTES
+
+
+def load_balancer_alarms(alarms):
+    # Scaling alarms on a target group's response time are not ALB alarms
+    return [
+        alarm
+        for alarm in alarms
+        if alarm["MetricName"] == "TargetResponseTime"
+        and [dimension["Name"] for dimension in alarm["Dimensions"]] == ["LoadBalancer"]
+    ]
+
+
+def p99_alarms(stack_template):
+    return [
+        alarm["Properties"]
+        for alarm in stack_template.find_resources("AWS::CloudWatch::Alarm").values()
+        if alarm["Properties"].get("ExtendedStatistic") == "p99"
+    ]
+
+
+@pytest.mark.parametrize("deployment_context", ["dev", "prod"])
+def test_p99_alarms_cover_routes_services_and_load_balancers(
+    deployment_context, synthesized, template
+):
+    context = synthesized(deployment_context)["contexts"][deployment_context]
+    stack_template = template(deployment_context, load_balancer_layout="separate")
+    alarms = p99_alarms(stack_template)
+
+    route_alarms = [
+        alarm for alarm in alarms if alarm["Namespace"] == APP_METRICS_NAMESPACE
+    ]
+    assert sorted(
+        dimension["Value"]
+        for alarm in route_alarms
+        for dimension in alarm["Dimensions"]
+        if dimension["Name"] == "Route"
+    ) == sorted(ROUTES)
+    for alarm in route_alarms:
+        assert alarm["Threshold"] == context["latency_alarms"]["route_duration_p99_ms"]
+
+    assert len(load_balancer_alarms(alarms)) == 2
+
+    cpu_alarms = [alarm for alarm in alarms if alarm["MetricName"] == "CPUUtilization"]
+    expected_services = 3 if context["dedicated_ingestion"] else 2
+    assert len(cpu_alarms) == expected_services
+
+
+def test_shared_layout_alarms_on_one_load_balancer(template):
+    stack_template = template("dev", load_balancer_layout="shared")
+
+    assert len(load_balancer_alarms(p99_alarms(stack_template))) == 1
+
+
+def test_dashboard_and_emf_namespace(template):
+    stack_template = template("prod")
+
+    stack_template.has_resource_properties(
+        "AWS::CloudWatch::Dashboard", {"DashboardName": "perseus-cap-prod"}
+    )
+    stack_template.has_resource_properties(
+        "AWS::ECS::TaskDefinition",
+        {
+            "ContainerDefinitions": Match.array_with(
+                [
+                    Match.object_like(
+                        {
+                            "Environment": Match.array_with(
+                                [
+                                    {
+                                        "Name": "METRICS_NAMESPACE",
+                                        "Value": APP_METRICS_NAMESPACE,
+                                    }
+                                ]
+                            )
+                        }
+                    )
+                ]
+            )
+        },
+    )
+
+
+def test_dashboard_shows_login_phases(template):
+    (dashboard,) = template("dev").find_resources("AWS::CloudWatch::Dashboard").values()
+    # The body is joined from strings and tokens; the strings are enough here
+    body = "".join(
+        part
+        for part in dashboard["Properties"]["DashboardBody"]["Fn::Join"][1]
+        if isinstance(part, str)
+    )
+
+    assert "/auth/login phases p99 (ms)" in body
+    for phase in LOGIN_PHASES:
+        assert f'"{phase}"' in body
@@ -0,0 +1,86 @@
+import pytest
+
+from deployment.networking import INTERFACE_ENDPOINTS
+
+
+def ecs_services(stack_template):
+    return stack_template.find_resources("AWS::ECS::Service")
+
+
+def container_environment(stack_template, logical_prefix):
+    (task_definition,) = [
+        resource["Properties"]
+        for logical_id, resource in stack_template.find_resources(
+            "AWS::ECS::TaskDefinition"
+        ).items()
+        if logical_id.startswith(logical_prefix)
+    ]
+    (container,) = task_definition["ContainerDefinitions"]
+    return {
+        variable["Name"]: variable["Value"] for variable in container["Environment"]
+    }
+
+
+def test_public_layout_runs_tasks_with_public_ips(template):
+    stack_template = template("dev")
+
+    stack_template.resource_count_is("AWS::EC2::NatGateway", 0)
+    stack_template.resource_count_is("AWS::EC2::VPCEndpoint", 0)
+    for service in ecs_services(stack_template).values():
+        network = service["Properties"]["NetworkConfiguration"]
+        assert network["AwsvpcConfiguration"]["AssignPublicIp"] == "ENABLED"
+
+
+def test_private_layout_uses_nat_and_vpc_endpoints(template):
+    stack_template = template("prod")
+
+    stack_template.resource_count_is("AWS::EC2::NatGateway", 1)
+    # S3 and DynamoDB gateway endpoints plus one interface endpoint per API
+    stack_template.resource_count_is(
+        "AWS::EC2::VPCEndpoint", 2 + len(INTERFACE_ENDPOINTS)
+    )
+    for service in ecs_services(stack_template).values():
+        network = service["Properties"]["NetworkConfiguration"]
+        assert network["AwsvpcConfiguration"]["AssignPublicIp"] == "DISABLED"
+
+
+def test_app_tasks_can_reach_provenance(template):
+    template("dev").has_resource_properties(
+        "AWS::EC2::SecurityGroupIngress",
+        {"IpProtocol": "tcp", "FromPort": 8080, "ToPort": 8080},
+    )
+
+
+@pytest.mark.parametrize(
+    "deployment_context,expected_url",
+    [
+        ("dev", "http://provenance-service.perseus-cap-dev.local:8080"),
+        ("prod", "http://provenance-service:8080"),
+    ],
+)
+def test_provenance_url_follows_service_discovery(
+    deployment_context, expected_url, template
+):
+    stack_template = template(deployment_context)
+
+    environment = container_environment(stack_template, "NextJsService")
+    assert environment["PROVENANCE_SERVICE_URL"] == expected_url
+
+
+def test_service_connect_joins_app_and_provenance(template):
+    stack_template = template("prod")
+
+    connected = {
+        logical_id: service["Properties"]["ServiceConnectConfiguration"]
+        for logical_id, service in ecs_services(stack_template).items()
+        if "ServiceConnectConfiguration" in service["Properties"]
+    }
+    assert len(connected) == len(ecs_services(stack_template))
+    (provenance,) = [
+        configuration
+        for logical_id, configuration in connected.items()
+        if logical_id.startswith("ProvenanceService")
+    ]
+    assert provenance["Services"][0]["PortName"] == "provenance"
+    # Provenance registers through Service Connect, not a Cloud Map A record
+    stack_template.resource_count_is("AWS::ServiceDiscovery::Service", 0)
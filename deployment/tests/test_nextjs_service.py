@@ -0,0 +1,95 @@
+import pytest
+from aws_cdk.assertions import Match
+
+
+@pytest.mark.parametrize("deployment_context", ["dev", "prod"])
+def test_scalable_target_matches_context(deployment_context, synthesized, template):
+    scaling = synthesized(deployment_context)["contexts"][deployment_context][
+        "nextjs_scaling"
+    ]
+    stack_template = template(deployment_context)
+
+    stack_template.has_resource_properties(
+        "AWS::ECS::TaskDefinition",
+        {
+            "Cpu": str(scaling["cpu"]),
+            "Memory": str(scaling["memory_limit_mib"]),
+            "ContainerDefinitions": Match.array_with(
+                [
+                    Match.object_like(
+                        {"PortMappings": [{"ContainerPort": 3000, "Protocol": "tcp"}]}
+                    )
+                ]
+            ),
+        },
+    )
+    stack_template.has_resource_properties(
+        "AWS::ECS::Service",
+        {"DesiredCount": scaling["min_tasks"], "LoadBalancers": Match.any_value()},
+    )
+    stack_template.has_resource_properties(
+        "AWS::ApplicationAutoScaling::ScalableTarget",
+        {
+            "MinCapacity": scaling["min_tasks"],
+            "MaxCapacity": scaling["max_tasks"],
+            "ScalableDimension": "ecs:service:DesiredCount",
+        },
+    )
+
+
+@pytest.mark.parametrize("deployment_context", ["dev", "prod"])
+def test_target_tracking_policies(deployment_context, synthesized, template):
+    scaling = synthesized(deployment_context)["contexts"][deployment_context][
+        "nextjs_scaling"
+    ]
+    stack_template = template(deployment_context)
+
+    expected = [
+        ("ALBRequestCountPerTarget", scaling["requests_per_target"]),
+        ("ECSServiceAverageCPUUtilization", scaling["target_cpu_utilization"]),
+        ("ECSServiceAverageMemoryUtilization", scaling["target_memory_utilization"]),
+    ]
+    for metric_type, target_value in expected:
+        stack_template.has_resource_properties(
+            "AWS::ApplicationAutoScaling::ScalingPolicy",
+            {
+                "PolicyType": "TargetTrackingScaling",
+                "TargetTrackingScalingPolicyConfiguration": Match.object_like(
+                    {
+                        "PredefinedMetricSpecification": Match.object_like(
+                            {"PredefinedMetricType": metric_type}
+                        ),
+                        "TargetValue": target_value,
+                        "ScaleInCooldown": scaling["scale_in_cooldown_seconds"],
+                        "ScaleOutCooldown": scaling["scale_out_cooldown_seconds"],
+                    }
+                ),
+            },
+        )
+
+
+@pytest.mark.parametrize("deployment_context", ["dev", "prod"])
+def test_latency_step_scaling(deployment_context, synthesized, template):
+    scaling = synthesized(deployment_context)["contexts"][deployment_context][
+        "nextjs_scaling"
+    ]
+    stack_template = template(deployment_context)
+
+    stack_template.has_resource_properties(
+        "AWS::ApplicationAutoScaling::ScalingPolicy",
+        {
+            "PolicyType": "StepScaling",
+            "StepScalingPolicyConfiguration": Match.object_like(
+                {"AdjustmentType": "ChangeInCapacity"}
+            ),
+        },
+    )
+    stack_template.has_resource_properties(
+        "AWS::CloudWatch::Alarm",
+        {
+            "MetricName": "TargetResponseTime",
+            "ExtendedStatistic": "p99",
+            "Threshold": scaling["target_response_time_seconds"],
+            "ComparisonOperator": "GreaterThanOrEqualToThreshold",
+        },
+    )
@@ -0,0 +1,188 @@
+"""Performance budgets enforced at synth time.
+
+These assert floors and ceilings rather than exact values, so a change can
+tune the stack freely as long as it does not under-provision it.
+"""
+
+import pytest
+
+from deployment.load_balancing import (
+    ALB_IDLE_TIMEOUT_SECONDS,
+    APP_KEEP_ALIVE_TIMEOUT_MS,
+)
+
+CONTEXTS = ["dev", "prod"]
+
+# Smallest acceptable task sizes (CPU units / MiB) and service minimums, keyed
+# on the construct id that prefixes each service's logical ids
+TASK_BUDGETS = {
+    "dev": {
+        "NextJsService": {"cpu": 512, "memory": 1024, "min_tasks": 1},
+        "ProvenanceService": {"cpu": 256, "memory": 512, "min_tasks": 1},
+    },
+    "prod": {
+        "NextJsService": {"cpu": 1024, "memory": 2048, "min_tasks": 2},
+        "ProvenanceService": {"cpu": 512, "memory": 1024, "min_tasks": 2},
+        "IngestionService": {"cpu": 512, "memory": 1024, "min_tasks": 2},
+    },
+}
+
+# Target-tracking metrics every context must scale on
+REQUIRED_TARGET_TRACKING = {
+    "ALBRequestCountPerTarget",
+    "ECSServiceAverageCPUUtilization",
+    "ECSServiceAverageMemoryUtilization",
+}
+# Synthesize with the ingestion service so its budget holds once it is enabled
+BUDGET_CONTEXT = {"dedicated_ingestion": "true"}
+
+# Next.js latency, plus the provenance request rate where Service Connect
+# publishes it
+MIN_STEP_SCALING_POLICIES = {"cloud_map": 1, "service_connect": 2}
+
+MIN_ALB_IDLE_TIMEOUT_SECONDS = 60
+MAX_DEREGISTRATION_DELAY_SECONDS = 60
+MAX_HEALTH_CHECK_INTERVAL_SECONDS = 15
+MAX_HEALTHY_THRESHOLD = 3
+HEALTH_CHECK_PATH = "/api/health"
+MIN_SLOW_START_SECONDS = 30
+
+
+def attributes(resource, key="LoadBalancerAttributes"):
+    return {
+        attribute["Key"]: attribute["Value"]
+        for attribute in resource["Properties"].get(key, [])
+    }
+
+
+def resources(template, resource_type):
+    return template.find_resources(resource_type).items()
+
+
+def resource_for(template, resource_type, construct_id):
+    matches = [
+        resource
+        for logical_id, resource in resources(template, resource_type)
+        if logical_id.startswith(construct_id)
+    ]
+    assert len(matches) == 1, f"expected one {resource_type} for {construct_id}"
+    return matches[0]["Properties"]
+
+
+@pytest.mark.parametrize("deployment_context", CONTEXTS)
+def test_task_sizes_meet_floors(deployment_context, template):
+    stack_template = template(deployment_context, **BUDGET_CONTEXT)
+
+    for name, budget in TASK_BUDGETS[deployment_context].items():
+        properties = resource_for(stack_template, "AWS::ECS::TaskDefinition", name)
+        assert int(properties["Cpu"]) >= budget["cpu"], name
+        assert int(properties["Memory"]) >= budget["memory"], name
+
+
+@pytest.mark.parametrize("deployment_context", CONTEXTS)
+def test_services_run_minimum_tasks(deployment_context, template):
+    stack_template = template(deployment_context, **BUDGET_CONTEXT)
+
+    for name, budget in TASK_BUDGETS[deployment_context].items():
+        service = resource_for(stack_template, "AWS::ECS::Service", name)
+        target = resource_for(
+            stack_template, "AWS::ApplicationAutoScaling::ScalableTarget", name
+        )
+        assert service["DesiredCount"] >= budget["min_tasks"], name
+        assert target["MinCapacity"] >= budget["min_tasks"], name
+        assert target["MaxCapacity"] > target["MinCapacity"], name
+
+
+@pytest.mark.parametrize("deployment_context", CONTEXTS)
+def test_scaling_policies_present(deployment_context, synthesized, template):
+    service_discovery = synthesized(deployment_context)["service_discovery"]
+    policies = [
+        policy["Properties"]
+        for _, policy in resources(
+            template(deployment_context), "AWS::ApplicationAutoScaling::ScalingPolicy"
+        )
+    ]
+    tracked = {
+        policy["TargetTrackingScalingPolicyConfiguration"][
+            "PredefinedMetricSpecification"
+        ]["PredefinedMetricType"]
+        for policy in policies
+        if policy["PolicyType"] == "TargetTrackingScaling"
+    }
+    steps = [policy for policy in policies if policy["PolicyType"] == "StepScaling"]
+
+    assert REQUIRED_TARGET_TRACKING <= tracked
+    assert len(steps) >= MIN_STEP_SCALING_POLICIES[service_discovery]
+
+
+@pytest.mark.parametrize("deployment_context", CONTEXTS)
+def test_load_balancers_keep_connections_open(deployment_context, template):
+    load_balancers = resources(
+        template(deployment_context), "AWS::ElasticLoadBalancingV2::LoadBalancer"
+    )
+    assert load_balancers
+
+    for logical_id, load_balancer in load_balancers:
+        settings = attributes(load_balancer)
+        idle_timeout = int(settings.get("idle_timeout.timeout_seconds", 60))
+        assert idle_timeout >= MIN_ALB_IDLE_TIMEOUT_SECONDS, logical_id
+        assert settings.get("routing.http2.enabled") == "true", logical_id
+        # The app must outlive the ALB's idle timeout on keep-alive sockets
+        assert APP_KEEP_ALIVE_TIMEOUT_MS > idle_timeout * 1000
+
+
+@pytest.mark.parametrize("deployment_context", CONTEXTS)
+def test_app_keep_alive_exceeds_alb_idle_timeout(deployment_context, template):
+    nextjs = resource_for(
+        template(deployment_context), "AWS::ECS::TaskDefinition", "NextJsService"
+    )
+    environment = {
+        variable["Name"]: variable["Value"]
+        for variable in nextjs["ContainerDefinitions"][0]["Environment"]
+    }
+    assert int(environment["KEEP_ALIVE_TIMEOUT"]) > ALB_IDLE_TIMEOUT_SECONDS * 1000
+
+
+@pytest.mark.parametrize("deployment_context", CONTEXTS)
+def test_target_groups_drain_and_check_quickly(deployment_context, template):
+    target_groups = resources(
+        template(deployment_context), "AWS::ElasticLoadBalancingV2::TargetGroup"
+    )
+    assert target_groups
+
+    for logical_id, target_group in target_groups:
+        properties = target_group["Properties"]
+        settings = attributes(target_group, "TargetGroupAttributes")
+        delay = int(settings.get("deregistration_delay.timeout_seconds", 300))
+
+        assert delay <= MAX_DEREGISTRATION_DELAY_SECONDS, logical_id
+        assert (
+            properties.get("HealthCheckIntervalSeconds", 30)
+            <= MAX_HEALTH_CHECK_INTERVAL_SECONDS
+        ), logical_id
+        assert (
+            properties.get("HealthyThresholdCount", 5) <= MAX_HEALTHY_THRESHOLD
+        ), logical_id
+        assert (
+            properties["HealthCheckTimeoutSeconds"]
+            < properties["HealthCheckIntervalSeconds"]
+        ), logical_id
+        # The page route server-renders React; health checks use the cheap route
+        assert properties["HealthCheckPath"] == HEALTH_CHECK_PATH, logical_id
+        slow_start = int(settings.get("slow_start.duration_seconds", 0))
+        assert slow_start >= MIN_SLOW_START_SECONDS, logical_id
+
+
+@pytest.mark.parametrize("deployment_context", CONTEXTS)
+def test_rolling_deploys_keep_capacity(deployment_context, template):
+    services = resources(template(deployment_context), "AWS::ECS::Service")
+
+    for logical_id, service in services:
+        configuration = service["Properties"]["DeploymentConfiguration"]
+        assert configuration["DeploymentCircuitBreaker"] == {
+            "Enable": True,
+            "Rollback": True,
+        }, logical_id
+        # Zero downtime: never drop below desired count while replacing tasks
+        assert configuration["MinimumHealthyPercent"] >= 100, logical_id
+        assert configuration["MaximumPercent"] > 100, logical_id
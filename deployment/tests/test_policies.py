@@ -0,0 +1,43 @@
+import pytest
+from aws_cdk.assertions import Match
+
+
+@pytest.mark.parametrize("deployment_context", ["dev", "prod"])
+def test_secrets_policy_limited_to_mtls_bundle(deployment_context, template):
+    template(deployment_context).has_resource_properties(
+        "AWS::IAM::ManagedPolicy",
+        {
+            "ManagedPolicyName": f"perseus-demo-cap-{deployment_context}-SecretsManagerPolicy",
+            "PolicyDocument": {
+                "Statement": [
+                    Match.object_like(
+                        {
+                            "Action": [
+                                "secretsmanager:GetSecretValue",
+                                "secretsmanager:DescribeSecret",
+                            ],
+                            "Resource": {
+                                "Fn::Join": [
+                                    "",
+                                    Match.array_with(
+                                        [
+                                            f":secret:{deployment_context}/perseus-demo-cap/mtls-key-bundle*"
+                                        ]
+                                    ),
+                                ]
+                            },
+                        }
+                    ),
+                    Match.object_like(
+                        {
+                            "Action": "kms:Decrypt",
+                            "Condition": {
+                                "StringEquals": {"kms:ViaService": Match.any_value()}
+                            },
+                        }
+                    ),
+                ],
+                "Version": "2012-10-17",
+            },
+        },
+    )
@@ -0,0 +1,141 @@
+import pytest
+from aws_cdk.assertions import Match
+
+from deployment.provenance_service import PROVENANCE_PORT_NAME
+
+
+def provenance_scaling(synthesized, deployment_context):
+    return synthesized(deployment_context)["contexts"][deployment_context][
+        "provenance_scaling"
+    ]
+
+
+@pytest.mark.parametrize("deployment_context", ["dev", "prod"])
+def test_task_size_and_range_match_context(deployment_context, synthesized, template):
+    scaling = provenance_scaling(synthesized, deployment_context)
+    service_discovery = synthesized(deployment_context)["service_discovery"]
+    stack_template = template(deployment_context)
+
+    stack_template.has_resource_properties(
+        "AWS::ECS::TaskDefinition",
+        {
+            "Cpu": str(scaling["cpu"]),
+            "Memory": str(scaling["memory_limit_mib"]),
+            "ContainerDefinitions": Match.array_with(
+                [Match.object_like({"Name": "ProvenanceContainer"})]
+            ),
+        },
+    )
+    stack_template.has_resource_properties(
+        "AWS::ECS::Service",
+        {
+            "DesiredCount": scaling["min_tasks"],
+            (
+                "ServiceRegistries"
+                if service_discovery == "cloud_map"
+                else "ServiceConnectConfiguration"
+            ): Match.any_value(),
+        },
+    )
+    stack_template.has_resource_properties(
+        "AWS::ApplicationAutoScaling::ScalableTarget",
+        {
+            "MinCapacity": scaling["min_tasks"],
+            "MaxCapacity": scaling["max_tasks"],
+        },
+    )
+
+
+@pytest.mark.parametrize("deployment_context", ["dev", "prod"])
+def test_scales_on_cpu_and_service_connect_requests(
+    deployment_context, synthesized, template
+):
+    scaling = provenance_scaling(synthesized, deployment_context)
+    stack_template = template(deployment_context, service_discovery="service_connect")
+
+    stack_template.has_resource_properties(
+        "AWS::ApplicationAutoScaling::ScalingPolicy",
+        {
+            "PolicyName": Match.string_like_regexp("Provenance.*CpuScaling"),
+            "TargetTrackingScalingPolicyConfiguration": Match.object_like(
+                {"TargetValue": scaling["target_cpu_utilization"]}
+            ),
+        },
+    )
+    # The request count the Service Connect proxies publish for the service
+    for comparison, threshold in [
+        ("GreaterThanOrEqualToThreshold", scaling["scale_out_requests_per_minute"]),
+        ("LessThanOrEqualToThreshold", scaling["scale_in_requests_per_minute"]),
+    ]:
+        stack_template.has_resource_properties(
+            "AWS::CloudWatch::Alarm",
+            {
+                "Namespace": "AWS/ECS",
+                "MetricName": "RequestCount",
+                "Dimensions": Match.array_with(
+                    [{"Name": "DiscoveryName", "Value": PROVENANCE_PORT_NAME}]
+                ),
+                "ComparisonOperator": comparison,
+                "Threshold": threshold,
+            },
+        )
+
+
+@pytest.mark.parametrize("deployment_context", ["dev", "prod"])
+def test_cloud_map_scales_on_cpu_only(deployment_context, template):
+    stack_template = template(deployment_context, service_discovery="cloud_map")
+
+    policies = stack_template.find_resources(
+        "AWS::ApplicationAutoScaling::ScalingPolicy"
+    )
+    assert not [
+        logical_id
+        for logical_id in policies
+        if logical_id.startswith("ProvenanceService")
+        and "RequestCountScaling" in logical_id
+    ]
+    # No request metric exists without Service Connect
+    assert not stack_template.find_resources(
+        "AWS::CloudWatch::Alarm",
+        {"Properties": {"Namespace": "AWS/ECS", "MetricName": "RequestCount"}},
+    )
+
+
+@pytest.mark.parametrize("deployment_context", ["dev", "prod"])
+def test_cloud_map_returns_all_instances(deployment_context, synthesized, template):
+    scaling = provenance_scaling(synthesized, deployment_context)
+
+    stack_template = template(deployment_context, service_discovery="cloud_map")
+
+    # Set explicitly rather than relying on the default for A records
+    stack_template.has_resource_properties(
+        "AWS::ServiceDiscovery::Service",
+        {
+            "Name": "provenance-service",
+            "DnsConfig": Match.object_like(
+                {
+                    "RoutingPolicy": "MULTIVALUE",
+                    "DnsRecords": [{"Type": "A", "TTL": scaling["dns_ttl_seconds"]}],
+                }
+            ),
+        },
+    )
+    stack_template.has_resource_properties(
+        "AWS::ECS::Service",
+        {
+            "ServiceRegistries": [
+                Match.object_like(
+                    {
+                        "RegistryArn": {
+                            "Fn::GetAtt": [
+                                Match.string_like_regexp(
+                                    "^ProvenanceServiceCloudMapService"
+                                ),
+                                "Arn",
+                            ]
+                        }
+                    }
+                )
+            ]
+        },
+    )
@@ -0,0 +1,57 @@
+import pytest
+from aws_cdk.assertions import Match
+
+
+@pytest.mark.parametrize("deployment_context", ["dev", "prod"])
+def test_revocation_table_shared_with_nextjs_task(deployment_context, template):
+    stack_template = template(deployment_context)
+
+    stack_template.has_resource_properties(
+        "AWS::DynamoDB::Table",
+        {
+            "TableName": f"perseus-cap-{deployment_context}-revocations",
+            "KeySchema": [{"AttributeName": "revokedId", "KeyType": "HASH"}],
+            "TimeToLiveSpecification": {
+                "AttributeName": "expiresAt",
+                "Enabled": True,
+            },
+        },
+    )
+    stack_template.has_resource_properties(
+        "AWS::ECS::TaskDefinition",
+        {
+            "ContainerDefinitions": Match.array_with(
+                [
+                    Match.object_like(
+                        {
+                            "Environment": Match.array_with(
+                                [
+                                    Match.object_like(
+                                        {"Name": "REVOCATION_DYNAMODB_TABLE"}
+                                    )
+                                ]
+                            )
+                        }
+                    )
+                ]
+            )
+        },
+    )
+    stack_template.has_resource_properties(
+        "AWS::IAM::Policy",
+        {
+            "PolicyDocument": {
+                "Statement": Match.array_with(
+                    [
+                        Match.object_like(
+                            {
+                                "Action": Match.array_with(
+                                    ["dynamodb:Scan", "dynamodb:BatchWriteItem"]
+                                )
+                            }
+                        )
+                    ]
+                )
+            }
+        },
+    )
@@ -0,0 +1,60 @@
+import json
+import os
+
+from aws_cdk.assertions import Match
+
+from conftest import HOSTED_ZONE_ID, LOOKUP_HOSTED_ZONE_ID
+from deployment.container_platform import APP_IMAGE_EXCLUDES
+
+
+def alias_record_zone_ids(stack_template):
+    return {
+        record["Properties"]["HostedZoneId"]
+        for record in stack_template.find_resources(
+            "AWS::Route53::RecordSet", {"Properties": {"Type": "A"}}
+        ).values()
+    }
+
+
+def test_hosted_zone_imported_by_id(synthesized, template):
+    stack_template = template("dev")
+
+    # Certificates, the app's alias record and the mTLS record share one zone
+    assert len(synthesized("dev")["hosted_zones"].zones) == 1
+    assert alias_record_zone_ids(stack_template) == {HOSTED_ZONE_ID}
+    stack_template.has_resource_properties(
+        "AWS::CertificateManager::Certificate",
+        {
+            "DomainValidationOptions": Match.array_with(
+                [Match.object_like({"HostedZoneId": HOSTED_ZONE_ID})]
+            )
+        },
+    )
+
+
+def test_hosted_zone_looked_up_once_without_an_id(synthesized, template):
+    stack_template = template("dev", hosted_zone_id="")
+
+    assert len(synthesized("dev", hosted_zone_id="")["hosted_zones"].zones) == 1
+    assert alias_record_zone_ids(stack_template) == {LOOKUP_HOSTED_ZONE_ID}
+
+
+def test_app_image_fingerprinted_once(synthesized):
+    stack = synthesized("prod")["stack"]
+    outdir = stack.node.root.outdir
+
+    with open(os.path.join(outdir, f"{stack.stack_name}.assets.json")) as manifest:
+        docker_images = json.load(manifest)["dockerImages"]
+    # The app and ingestion services run the same image
+    assert len(docker_images) == 1
+
+
+def test_app_image_context_excludes_unused_paths(synthesized):
+    globals_ = synthesized("dev")
+    staged = os.path.join(
+        globals_["app"].outdir, f"asset.{globals_['app_image'].asset.asset_hash}"
+    )
+
+    contents = set(os.listdir(staged))
+    assert {"Dockerfile", "package.json", "app", "lib"} <= contents
+    assert not contents & set(APP_IMAGE_EXCLUDES)
@@ -0,0 +1,24 @@
+export async function register() {
+  if (process.env.NEXT_RUNTIME !== 'nodejs') return
+
+  const { resolveStartupMode, startup, waitForStartup } = await import(
+    './lib/startup'
+  )
+
+  // Eager: load the client config, mTLS secret and OAuth discovery in
+  // parallel before the server takes requests; /api/health reports 503 until
+  // they are loaded. Lazy: prefetch in the background and never block, the
+  // first request retries anything that failed.
+  if (resolveStartupMode() === 'eager') await waitForStartup()
+  else void startup()
+
+  // Write out acknowledged messages still queued when the task is stopped
+  const { flushMessagesOnShutdown } = await import('./lib/messageIngestion')
+  flushMessagesOnShutdown()
+
+  // Open the mTLS connection the first login's PAR request will reuse
+  if (process.env.APP_MODE !== 'ingestion') {
+    const { startParConnectionWarming } = await import('./lib/parConnection')
+    startParConnectionWarming()
+  }
+}
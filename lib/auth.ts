@@ -2,17 +2,50 @@ import { getIronSession, IronSession, SessionOptions } from 'iron-session'
 import { cookies } from 'next/headers'
 import * as openid from 'openid-client'
 
-import { createCustomFetch, getClientConfigPromise } from './clientConfig'
-
-export { initializeClientConfig, createCustomFetch } from './clientConfig'
+import {
+  createCustomFetch,
+  getClientConfigPromise,
+  resolveAuthServer,
+} from './clientConfig'
+import { getDiscoveryConfiguration } from './discoveryCache'
+import { createLogger } from './logger'
+import { timed } from './metrics'
+import {
+  isRevoked,
+  startRevocationSync,
+  tokenIdentifiers,
+} from './revocationIndex'
+import { clearTokens } from './tokenRefresh'
+
+export {
+  initializeClientConfig,
+  createCustomFetch,
+  getClientConfigPromise,
+} from './clientConfig'
 export type { IClientConfig, ICertificates } from './clientConfig'
+export { getDiscoveryCacheStats } from './discoveryCache'
+export type { IDiscoveryCacheStats } from './discoveryCache'
+export {
+  clearTokens,
+  getAccessToken,
+  getTokenRefreshStats,
+  storeTokens,
+} from './tokenRefresh'
+export type { ITokenRefreshStats, ITokenResponse } from './tokenRefresh'
+
+const log = createLogger('auth')
 
 export interface SessionData {
   isLoggedIn: boolean
   access_token?: string
+  refresh_token?: string
+  // Expiry of access_token in ms since the epoch, refreshed ahead of time
+  expires_at?: number
   code_verifier?: string
   state?: string
   tenantId?: string
+  // jti / grant_id of access_token, looked up in the revocation index
+  token_ids?: string[]
 }
 
 export const getSessionOptions = (): SessionOptions => {
@@ -42,80 +75,79 @@ export async function getSession() {
 
   if (!session.isLoggedIn) session.isLoggedIn = defaultSession.isLoggedIn
 
+  // Drop a revoked token before any downstream call is made with it. Sessions
+  // created before token_ids was stored fall back to decoding the token.
+  // Failures are logged by startRevocationSync, once per retry interval
+  startRevocationSync().catch(() => {})
+  if (
+    session.access_token &&
+    isRevoked(session.token_ids ?? tokenIdentifiers(session.access_token))
+  )
+    clearTokens(session)
+
   return session
 }
 
 export async function getClientConfig() {
-  const clientConfig = await getClientConfigPromise()
-
-  console.log('clientConfig.server', clientConfig.server)
-  console.log('Attempting OAuth discovery (non-mTLS endpoint)...')
-
-  // Discovery endpoint is NOT mTLS protected - use regular fetch
-  const issuer = await openid.discovery(
-    new URL('/.well-known/oauth-authorization-server', clientConfig.server),
-    clientConfig.client_id,
-    { use_mtls_endpoint_aliases: true },
-  )
-
-  console.log('Discovery successful - found mTLS endpoints:', {
-    par: issuer.serverMetadata().pushed_authorization_request_endpoint,
-    token: issuer.serverMetadata().token_endpoint,
-  })
+  const clientConfig = await timed('clientConfig', getClientConfigPromise)
 
-  console.log('Server metadata PAR requirements:', {
-    require_pushed_authorization_requests:
-      issuer.serverMetadata().require_pushed_authorization_requests,
-    pushed_authorization_request_endpoint:
-      issuer.serverMetadata().pushed_authorization_request_endpoint,
-  })
+  // Discovery metadata is cached per issuer and revalidated in the background
+  return timed('discovery', () => getDiscoveryConfiguration(clientConfig))
+}
 
-  return issuer
+const createPkce = async () => {
+  const code_verifier = openid.randomPKCECodeVerifier()
+  const code_challenge = await openid.calculatePKCECodeChallenge(code_verifier)
+  return { code_verifier, code_challenge }
 }
 
+/**
+ * Push the authorization request and return the URL to send the user to.
+ * Steps that do not depend on each other run together: the client config
+ * (mTLS secret), discovery (which needs only the environment) and PKCE,
+ * then saving the code verifier alongside the PAR request. PAR goes over the
+ * pooled mTLS agent, so it reuses the connection `warmParConnection()`
+ * opened. Each step is timed as a phase of the login route.
+ */
 export async function generateAuthUrl(
   session: IronSession<SessionData>,
 ): Promise<string> {
-  const clientConfig = await getClientConfigPromise()
-  const customFetch = await createCustomFetch()
-  const config = await getClientConfig()
-
-  // Generate PKCE code verifier and challenge
-  const code_verifier = openid.randomPKCECodeVerifier()
-  const code_challenge = await openid.calculatePKCECodeChallenge(code_verifier)
-
-  // Store code_verifier in session for later token exchange
-  session.code_verifier = code_verifier
-  await session.save()
-
-  console.log('Generating authorization URL with PAR...')
-  console.log(
-    'PAR endpoint:',
-    config.serverMetadata().pushed_authorization_request_endpoint,
-  )
-  console.log('Auth endpoint:', config.serverMetadata().authorization_endpoint)
+  const [clientConfig, config, { code_verifier, code_challenge }] =
+    await Promise.all([
+      timed('clientConfig', getClientConfigPromise),
+      timed('discovery', () => getDiscoveryConfiguration(resolveAuthServer())),
+      timed('pkce', createPkce),
+    ])
+  const customFetch = await createCustomFetch(clientConfig)
 
   // Manual PAR implementation since buildAuthorizationUrl doesn't handle it automatically
-  console.log('Making PAR request...')
-
   const parEndpoint =
     config.serverMetadata().pushed_authorization_request_endpoint
   if (!parEndpoint) throw new Error('PAR endpoint not found in server metadata')
+  log.debug('Making PAR request', { parEndpoint })
 
-  const parResponse = await customFetch(parEndpoint, {
-    method: 'POST',
-    headers: {
-      'Content-Type': 'application/x-www-form-urlencoded',
-    },
-    body: new URLSearchParams({
-      client_id: clientConfig.client_id,
-      redirect_uri: clientConfig.redirect_uri,
-      response_type: 'code',
-      scope: clientConfig.scope,
-      code_challenge,
-      code_challenge_method: 'S256',
-    }).toString(),
-  })
+  // The code verifier is needed only once the user returns to the callback,
+  // so the session is sealed while the PAR request is in flight
+  session.code_verifier = code_verifier
+  const [parResponse] = await Promise.all([
+    timed('par', () =>
+      customFetch(parEndpoint, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/x-www-form-urlencoded',
+        },
+        body: new URLSearchParams({
+          client_id: clientConfig.client_id,
+          redirect_uri: clientConfig.redirect_uri,
+          response_type: 'code',
+          scope: clientConfig.scope,
+          code_challenge,
+          code_challenge_method: 'S256',
+        }).toString(),
+      }),
+    ),
+    timed('sessionSave', () => session.save()),
+  ])
 
   if (!parResponse.ok) {
     const errorText = await parResponse.text()
@@ -125,7 +157,7 @@ export async function generateAuthUrl(
   }
 
   const parData = await parResponse.json()
-  console.log('PAR response:', parData)
+  log.debug('PAR response', { parData })
 
   if (!parData.request_uri) throw new Error('No request_uri in PAR response')
 
@@ -137,8 +169,7 @@ export async function generateAuthUrl(
   authUrl.searchParams.set('client_id', clientConfig.client_id)
   authUrl.searchParams.set('request_uri', parData.request_uri)
 
-  console.log('Generated authorization URL with PAR:', authUrl.href)
-  console.log('Request URI:', parData.request_uri)
+  log.debug('Generated authorization URL', { authUrl: authUrl.href })
 
   return authUrl.href
 }
@@ -1,10 +1,14 @@
 import * as undici from 'undici'
 import { readFileSync } from 'fs'
-import { X509Certificate } from 'crypto'
-import {
-  GetSecretValueCommand,
-  SecretsManagerClient,
-} from '@aws-sdk/client-secrets-manager'
+import { createHash, X509Certificate } from 'crypto'
+import { performance } from 'perf_hooks'
+import type { TLSSocket } from 'tls'
+
+import { readIntEnv } from './env'
+import { createLogger } from './logger'
+import { currentMetrics, recordMetric } from './metrics'
+import { processState } from './processState'
+import { getSecretCertificateSource } from './secretCertificates'
 
 export interface ICertificates {
   mtlsKey: string
@@ -12,6 +16,19 @@ export interface ICertificates {
   caBundle?: string
 }
 
+export interface IAgentPoolOptions {
+  // Maximum sockets kept open per origin (auth server, data server, ...)
+  connections: number
+  // Requests allowed in flight on a single socket
+  pipelining: number
+  // How long an idle socket is kept before it is closed (ms)
+  keepAliveTimeout: number
+  // Upper bound for a server supplied keep-alive hint (ms)
+  keepAliveMaxTimeout: number
+}
+
+const log = createLogger('clientConfig')
+
 export interface IClientConfig extends ICertificates {
   server: URL
   client_id: string
@@ -23,19 +40,30 @@ export interface IClientConfig extends ICertificates {
   code_challenge_method: string
   protectedResourceUrl: URL
   skipServerVerification?: boolean
+  agentPool?: Partial<IAgentPoolOptions>
 }
 
+// The part of the client config OAuth discovery needs; known from the
+// environment alone, so discovery can run without waiting for certificates
+export type IAuthServer = Pick<IClientConfig, 'server' | 'client_id'>
+
+export const resolveAuthServer = (): IAuthServer => ({
+  server: new URL(
+    process.env.NEXT_PUBLIC_SERVER ||
+      'https://preprod.perseus-demo-authentication.ib1.org', // Must be non-mTLS URL for OAuth discovery
+  ),
+  client_id: process.env.NEXT_PUBLIC_CLIENT_ID as string,
+})
+
 export const resolveAppEnv = () => {
   const value = process.env.APP_ENV ?? process.env.ENVIRONMENT
 
   if (!value) {
-    console.warn(
-      'APP_ENV environment variable is missing; defaulting to "local"',
-    )
+    log.warn('APP_ENV environment variable is missing; defaulting to "local"')
     return 'local'
   }
 
-  console.log('Resolved APP_ENV:', value)
+  log.debug('Resolved APP_ENV', { appEnv: value })
   return value
 }
 
@@ -56,16 +84,11 @@ const loadCertificatesFromLocal = (
   const mtlsBundlePath =
     process.env.MTLS_BUNDLE_PATH ?? './certs/cap-demo-certs/cap-demo-bundle.pem'
 
-  console.log('Loading certificates from:', mtlsKeyPath, mtlsBundlePath)
+  log.info('Loading certificates from files', { mtlsKeyPath, mtlsBundlePath })
 
   const mtlsKey = readFileSync(mtlsKeyPath, 'utf8')
   const mtlsBundle = readFileSync(mtlsBundlePath, 'utf8')
 
-  console.log('Key length:', mtlsKey.length)
-  console.log('Cert length:', mtlsBundle.length)
-  console.log('Key starts with:', mtlsKey.substring(0, 50))
-  console.log('Cert starts with:', mtlsBundle.substring(0, 50))
-
   return {
     mtlsKey,
     mtlsBundle,
@@ -82,27 +105,18 @@ const loadCertificatesFromSecretsManager = async (
       caBundle: overrides.caBundle,
     }
 
-  const secretsManager = new SecretsManagerClient({ region: 'eu-west-2' })
   const secretName = `${resolveAppEnv()}/perseus-demo-cap/mtls-key-bundle`
-  console.log('Loading certificates from AWS Secrets Manager:', secretName)
+  log.info('Loading certificates from AWS Secrets Manager', { secretName })
+  const source = getSecretCertificateSource(secretName)
   try {
-    const command = new GetSecretValueCommand({ SecretId: secretName })
-    const data = await secretsManager.send(command)
-    const secret = data.SecretString ? JSON.parse(data.SecretString) : null
-    if (!secret)
-      throw new Error('Secret is empty or not in the expected format.')
+    const certificates = await source.load()
+    // Pick up rotations without a restart; the mTLS agent is rebuilt when
+    // the next request sees the new certificates
+    source.startRefresh(applyRotatedCertificates)
 
-    const mtlsBundle: string = secret.mtlsBundle || secret.mtlsBundle
-    if (!mtlsBundle)
-      throw new Error('Secret missing mtlsBundle (or mtlsBundle)')
-
-    return {
-      mtlsKey: secret.mtlsKey,
-      mtlsBundle,
-      caBundle: overrides?.caBundle,
-    }
+    return { ...certificates, caBundle: overrides?.caBundle }
   } catch (error) {
-    console.error('Error retrieving certificates from Secrets Manager:', error)
+    log.error('Error retrieving certificates from Secrets Manager', { error })
     throw error
   }
 }
@@ -115,23 +129,20 @@ export const initializeClientConfig = async (
   if (isLocalEnv())
     try {
       certificates = loadCertificatesFromLocal(overrides)
-      console.log('Successfully loaded certificates from local files')
+      log.info('Loaded certificates from local files')
     } catch (error) {
-      console.error('Failed to load certificates from local files:', error)
-      console.log('Falling back to AWS Secrets Manager...')
+      log.warn(
+        'Failed to load certificates from local files; falling back to AWS',
+        { error },
+      )
       certificates = await loadCertificatesFromSecretsManager(overrides)
     }
   else {
-    console.log('Non-local environment detected; loading certificates from AWS')
     certificates = await loadCertificatesFromSecretsManager(overrides)
   }
 
   const baseConfig: IClientConfig = {
-    server: new URL(
-      process.env.NEXT_PUBLIC_SERVER ||
-        'https://preprod.perseus-demo-authentication.ib1.org', // Must be non-mTLS URL for OAuth discovery
-    ),
-    client_id: process.env.NEXT_PUBLIC_CLIENT_ID as string,
+    ...resolveAuthServer(),
     redirect_uri: `${process.env.NEXT_PUBLIC_APP_URL}/auth/callback`,
     mtlsKey: certificates.mtlsKey,
     mtlsBundle: certificates.mtlsBundle,
@@ -160,15 +171,102 @@ export const initializeClientConfig = async (
   }
 }
 
-let clientConfigPromise: Promise<IClientConfig> | null = null
+const clientConfigState = processState('clientConfig', () => ({
+  promise: null as Promise<IClientConfig> | null,
+}))
 
+/**
+ * The process-wide client config. A failed initialisation is not cached, so
+ * the next caller retries instead of inheriting the rejection.
+ */
 export const getClientConfigPromise = () => {
-  if (!clientConfigPromise) clientConfigPromise = initializeClientConfig()
-  return clientConfigPromise
+  if (!clientConfigState.promise) {
+    const promise = initializeClientConfig().catch(error => {
+      if (clientConfigState.promise === promise)
+        clientConfigState.promise = null
+      throw error
+    })
+    clientConfigState.promise = promise
+  }
+  return clientConfigState.promise
 }
 
-export const createCustomFetch = async (config?: IClientConfig) => {
-  const clientConfig = config ?? (await getClientConfigPromise())
+const applyRotatedCertificates = (certificates: ICertificates) => {
+  log.info('Secret rotated; loading new client certificates')
+  if (!clientConfigState.promise) return
+  clientConfigState.promise = clientConfigState.promise.then(config => {
+    const rotated = {
+      ...config,
+      mtlsKey: certificates.mtlsKey,
+      mtlsBundle: certificates.mtlsBundle,
+    }
+    rotateMtlsAgent(config, rotated)
+    return rotated
+  })
+}
+
+export const resolveAgentPoolOptions = (
+  overrides?: Partial<IAgentPoolOptions>,
+): IAgentPoolOptions => ({
+  connections: readIntEnv('MTLS_POOL_CONNECTIONS', 16, { min: 0 }),
+  pipelining: readIntEnv('MTLS_POOL_PIPELINING', 1, { min: 0 }),
+  keepAliveTimeout: readIntEnv('MTLS_KEEP_ALIVE_TIMEOUT_MS', 30_000, {
+    min: 0,
+  }),
+  keepAliveMaxTimeout: readIntEnv('MTLS_KEEP_ALIVE_MAX_TIMEOUT_MS', 600_000, {
+    min: 0,
+  }),
+  ...overrides,
+})
+
+interface IMtlsAgent {
+  agent: undici.Agent
+  // Key of the agent for this config's rotated certificates. Set once the
+  // agent is closed, so requests made with the old config follow it.
+  successor?: string
+}
+
+// One pooled keep-alive agent per client and set of certificates, so TLS
+// sessions (and the mTLS handshake) are reused across requests instead of
+// renegotiated each time
+const mtlsAgents = processState(
+  'mtlsAgents',
+  () => new Map<string, IMtlsAgent>(),
+)
+
+const fingerprintAgent = (
+  clientConfig: IClientConfig,
+  pool: IAgentPoolOptions,
+) =>
+  createHash('sha256')
+    .update(clientConfig.mtlsKey)
+    .update('\0')
+    .update(clientConfig.mtlsBundle)
+    .update('\0')
+    .update(clientConfig.caBundle ?? '')
+    .update('\0')
+    .update(String(clientConfig.skipServerVerification ?? false))
+    .update(JSON.stringify(pool))
+    .digest('hex')
+
+// Configs sharing a client_id may still present different certificates, so
+// the key covers everything the agent is built from
+const agentKey = (clientConfig: IClientConfig) => {
+  const pool = resolveAgentPoolOptions(clientConfig.agentPool)
+  return `${clientConfig.client_id ?? ''}:${fingerprintAgent(clientConfig, pool)}`
+}
+
+// Follow rotations from `key` to the agent in use for its latest certificates
+const currentAgentEntry = (key: string) => {
+  let entry = mtlsAgents.get(key)
+  while (entry?.successor) entry = mtlsAgents.get(entry.successor)
+  return entry
+}
+
+const buildMtlsAgent = (
+  clientConfig: IClientConfig,
+  pool: IAgentPoolOptions,
+) => {
   const rejectUnauthorized = !(clientConfig.skipServerVerification ?? false)
 
   // Extract certificates from bundle - split by certificate boundaries
@@ -188,38 +286,146 @@ export const createCustomFetch = async (config?: IClientConfig) => {
   const certBundle = certArray.join('\n')
 
   // Debug: verify we have the client cert
-  if (certMatches.length > 0)
-    try {
-      const clientCert = new X509Certificate(certMatches[0])
-      const cnMatch = clientCert.subject.match(/CN=([^,]+)/)
-      const subjectCN = cnMatch ? cnMatch[1] : 'unknown'
-      console.log(`[mTLS] Client certificate CN: ${subjectCN}`)
-      console.log(`[mTLS] Bundle contains ${certMatches.length} certificate(s)`)
-    } catch (e) {
-      console.warn(`[mTLS] Could not parse client certificate: ${e}`)
-    }
+  try {
+    const clientCert = new X509Certificate(certMatches[0])
+    const cnMatch = clientCert.subject.match(/CN=([^,]+)/)
+    const subjectCN = cnMatch ? cnMatch[1] : 'unknown'
+    log.info('Building mTLS agent', {
+      subjectCN,
+      certificates: certMatches.length,
+    })
+  } catch (error) {
+    log.warn('Could not parse client certificate', { error })
+  }
 
-  const agent = new undici.Agent({
-    connect: {
+  return new undici.Agent({
+    connections: pool.connections,
+    pipelining: pool.pipelining,
+    keepAliveTimeout: pool.keepAliveTimeout,
+    keepAliveMaxTimeout: pool.keepAliveMaxTimeout,
+    connect: timedConnector({
       key: clientConfig.mtlsKey.trim(),
       // Use concatenated string format - ensure proper newline separation
       cert: certBundle,
       ca: clientConfig.caBundle?.trim(),
       rejectUnauthorized,
-    },
+    }),
   })
+}
+
+/**
+ * undici's TLS connector, recording DNS, TCP connect and TLS handshake times
+ * on the request that opens a connection. Requests served by a pooled
+ * connection record none of these.
+ */
+const timedConnector = (
+  options: undici.buildConnector.BuildOptions,
+): undici.buildConnector.connector => {
+  const connect = undici.buildConnector(options)
+
+  return (connectOptions, callback) => {
+    const metrics = currentMetrics()
+    // The connector returns its socket, although the typings say void
+    const socket = connect(connectOptions, callback) as unknown as
+      | TLSSocket
+      | undefined
+    if (!metrics || !socket) return
+
+    let lapStartedAt = performance.now()
+    const lap = (name: string) => () => {
+      const now = performance.now()
+      recordMetric(name, now - lapStartedAt, metrics)
+      lapStartedAt = now
+    }
+    socket.once('lookup', lap('dns'))
+    socket.once('connect', lap('connect'))
+    socket.once('secureConnect', lap('tls'))
+  }
+}
+
+const mtlsAgentEntry = (
+  clientConfig: IClientConfig,
+  key = agentKey(clientConfig),
+): IMtlsAgent => {
+  const current = currentAgentEntry(key)
+  if (current) return current
+
+  const entry = {
+    agent: buildMtlsAgent(
+      clientConfig,
+      resolveAgentPoolOptions(clientConfig.agentPool),
+    ),
+  }
+  mtlsAgents.set(key, entry)
+  return entry
+}
+
+/**
+ * Return the shared mTLS agent for a client config. Each distinct set of
+ * certificates and pool options gets its own agent; a config whose
+ * certificates have since rotated gets the agent for the rotated ones.
+ */
+export const getMtlsAgent = (clientConfig: IClientConfig): undici.Agent =>
+  mtlsAgentEntry(clientConfig).agent
+
+/**
+ * Replace the agent for `previous` with one for its rotated certificates.
+ * The new agent is in place before the old one is closed, so in-flight
+ * requests finish on the old connections while new requests, including
+ * those from fetches created with `previous`, use the new certificates.
+ * Agents for other configs, even with the same client_id, are untouched.
+ */
+export const rotateMtlsAgent = (
+  previous: IClientConfig,
+  rotated: IClientConfig,
+) => {
+  const previousKey = agentKey(previous)
+  const rotatedKey = agentKey(rotated)
+  const current = mtlsAgents.get(previousKey)
+  if (!current || current.successor || previousKey === rotatedKey) return
+
+  // Rotating back to certificates used before (e.g. a rolled back rotation)
+  // finds their entry pointing onwards with its agent closed. Replace it, so
+  // the chain cannot loop and the closed agent is never reused.
+  if (mtlsAgents.get(rotatedKey)?.successor) mtlsAgents.delete(rotatedKey)
+  mtlsAgentEntry(rotated, rotatedKey)
+  current.successor = rotatedKey
+  log.info('Client certificates changed; replacing pooled agent')
+  current.agent
+    .close()
+    .catch(error => log.warn('Error closing mTLS agent', { error }))
+}
+
+export const closeMtlsAgents = async () => {
+  const agents: undici.Agent[] = []
+  // Agents with a successor were closed when their certificates rotated
+  mtlsAgents.forEach(({ agent, successor }) => {
+    if (!successor) agents.push(agent)
+  })
+  mtlsAgents.clear()
+  await Promise.all(agents.map(agent => agent.close()))
+}
+
+export const createCustomFetch = async (config?: IClientConfig) => {
+  const clientConfig = config ?? (await getClientConfigPromise())
+  const key = agentKey(clientConfig)
+  let entry = mtlsAgentEntry(clientConfig, key)
 
   return async (
     url: string | URL,
     options: Parameters<typeof undici.fetch>[1] = {},
   ) => {
-    const urlObj = typeof url === 'string' ? new URL(url) : url
-    // Log mTLS usage for debugging (only for mTLS endpoints)
-    if (urlObj.hostname.includes('mtls.'))
-      console.log(`[mTLS] Making request to: ${urlObj.href}`)
-    return undici.fetch(url, {
+    log.debug('Making mTLS request', () => ({ url: String(url) }))
+    const startedAt = performance.now()
+    // Follow a rotation of this config's certificates, so a closed agent is
+    // never used for new requests; only a rotated entry has a successor
+    if (entry.successor) entry = currentAgentEntry(key) ?? entry
+    const response = await undici.fetch(url, {
       ...options,
-      dispatcher: agent,
-    }) as unknown as Response
+      dispatcher: entry.agent,
+    })
+    // fetch resolves once the response headers arrive
+    recordMetric('ttfb', performance.now() - startedAt)
+    return response as unknown as Response
   }
 }
@@ -0,0 +1,197 @@
+import * as openid from 'openid-client'
+
+import type { IAuthServer } from './clientConfig'
+import { readIntEnv } from './env'
+import { createLogger } from './logger'
+import { processState } from './processState'
+
+const log = createLogger('discovery')
+
+export interface IDiscoveryCacheStats {
+  hits: number
+  staleHits: number
+  misses: number
+  fetches: number
+  fetchErrors: number
+}
+
+interface IDiscoveryEntry {
+  configuration: openid.Configuration
+  // Served without revalidation until this time
+  freshUntil: number
+  // Served while a background refresh runs until this time
+  staleUntil: number
+}
+
+const DEFAULT_TTL_MS = readIntEnv('DISCOVERY_TTL_MS', 5 * 60_000, { min: 0 })
+const MAX_TTL_MS = readIntEnv('DISCOVERY_MAX_TTL_MS', 24 * 60 * 60_000, {
+  min: 0,
+})
+const DEFAULT_STALE_MS = readIntEnv('DISCOVERY_STALE_MS', 60 * 60_000, {
+  min: 0,
+})
+
+const entries = processState(
+  'discoveryEntries',
+  () => new Map<string, IDiscoveryEntry>(),
+)
+const inFlight = processState(
+  'discoveryInFlight',
+  () => new Map<string, Promise<IDiscoveryEntry>>(),
+)
+// Shared like the entries, so warm-up fetches made by instrumentation show
+// up in the stats a route reads
+const stats = processState<IDiscoveryCacheStats>('discoveryStats', () => ({
+  hits: 0,
+  staleHits: 0,
+  misses: 0,
+  fetches: 0,
+  fetchErrors: 0,
+}))
+
+const directiveSeconds = (cacheControl: string, directive: string) => {
+  const match = cacheControl.match(new RegExp(`(?:^|,)\\s*${directive}=(\\d+)`))
+  return match ? Number(match[1]) * 1000 : undefined
+}
+
+/**
+ * Derive fresh and stale-while-revalidate lifetimes (ms) from the discovery
+ * response headers, falling back to the configured defaults.
+ */
+export const cacheLifetimes = (headers: Headers) => {
+  const cacheControl = (headers.get('cache-control') ?? '').toLowerCase()
+
+  if (/(?:^|,)\s*(no-store|no-cache)/.test(cacheControl))
+    return { ttl: 0, stale: 0 }
+
+  let ttl =
+    directiveSeconds(cacheControl, 's-maxage') ??
+    directiveSeconds(cacheControl, 'max-age')
+
+  const expires = headers.get('expires')
+  if (ttl === undefined && expires) {
+    const expiresAt = Date.parse(expires)
+    if (!Number.isNaN(expiresAt)) ttl = Math.max(0, expiresAt - Date.now())
+  }
+
+  return {
+    ttl: Math.min(ttl ?? DEFAULT_TTL_MS, MAX_TTL_MS),
+    stale:
+      directiveSeconds(cacheControl, 'stale-while-revalidate') ??
+      DEFAULT_STALE_MS,
+  }
+}
+
+const fetchDiscovery = async (
+  clientConfig: IAuthServer,
+): Promise<IDiscoveryEntry> => {
+  let responseHeaders: Headers | undefined
+  const recordingFetch: openid.CustomFetch = async (url, options) => {
+    const response = await fetch(url, options)
+    responseHeaders = response.headers
+    return response
+  }
+
+  log.debug('Fetching OAuth discovery (non-mTLS endpoint)', {
+    server: clientConfig.server.href,
+  })
+  stats.fetches++
+
+  // Discovery endpoint is NOT mTLS protected - use regular fetch
+  const configuration = await openid.discovery(
+    new URL('/.well-known/oauth-authorization-server', clientConfig.server),
+    clientConfig.client_id,
+    { use_mtls_endpoint_aliases: true },
+    undefined,
+    {
+      [openid.customFetch]: recordingFetch,
+      // Local stand-ins may serve discovery over plain http
+      execute:
+        clientConfig.server.protocol === 'http:'
+          ? [openid.allowInsecureRequests]
+          : undefined,
+    },
+  )
+
+  const metadata = configuration.serverMetadata()
+  log.info('OAuth discovery succeeded', {
+    par: metadata.pushed_authorization_request_endpoint,
+    token: metadata.token_endpoint,
+    require_pushed_authorization_requests:
+      metadata.require_pushed_authorization_requests,
+  })
+
+  const { ttl, stale } = responseHeaders
+    ? cacheLifetimes(responseHeaders)
+    : { ttl: DEFAULT_TTL_MS, stale: DEFAULT_STALE_MS }
+  const now = Date.now()
+
+  return {
+    configuration,
+    freshUntil: now + ttl,
+    staleUntil: now + ttl + stale,
+  }
+}
+
+// Concurrent callers for the same issuer share one in-flight discovery request
+const refresh = (cacheKey: string, clientConfig: IAuthServer) => {
+  const pending = inFlight.get(cacheKey)
+  if (pending) return pending
+
+  const request = fetchDiscovery(clientConfig)
+    .then(entry => {
+      entries.set(cacheKey, entry)
+      return entry
+    })
+    .catch(error => {
+      stats.fetchErrors++
+      throw error
+    })
+    .finally(() => inFlight.delete(cacheKey))
+
+  inFlight.set(cacheKey, request)
+  return request
+}
+
+/**
+ * Return the discovered issuer configuration, fetching it at most once per
+ * cache lifetime. Stale entries are served immediately while a background
+ * refresh revalidates them.
+ */
+export const getDiscoveryConfiguration = async (
+  clientConfig: IAuthServer,
+): Promise<openid.Configuration> => {
+  const cacheKey = `${clientConfig.server.href}|${clientConfig.client_id}`
+  const entry = entries.get(cacheKey)
+  const now = Date.now()
+
+  if (entry && now < entry.freshUntil) {
+    stats.hits++
+    return entry.configuration
+  }
+
+  if (entry && now < entry.staleUntil) {
+    stats.staleHits++
+    refresh(cacheKey, clientConfig).catch(error =>
+      log.warn('Background OAuth discovery refresh failed', { error }),
+    )
+    return entry.configuration
+  }
+
+  stats.misses++
+  return (await refresh(cacheKey, clientConfig)).configuration
+}
+
+export const getDiscoveryCacheStats = (): IDiscoveryCacheStats => ({
+  ...stats,
+})
+
+export const resetDiscoveryCache = () => {
+  entries.clear()
+  inFlight.clear()
+  stats.hits = 0
+  stats.staleHits = 0
+  stats.misses = 0
+  stats.fetches = 0
+  stats.fetchErrors = 0
+}
@@ -0,0 +1,13 @@
+/**
+ * Integer setting from the environment. Unset, malformed and out-of-range
+ * values fall back to `fallback`. Values must be positive unless `min` is
+ * lowered, e.g. to 0 for settings where 0 turns a feature off.
+ */
+export const readIntEnv = (
+  name: string,
+  fallback: number,
+  { min = 1 }: { min?: number } = {},
+) => {
+  const value = Number.parseInt(process.env[name] ?? '', 10)
+  return Number.isFinite(value) && value >= min ? value : fallback
+}
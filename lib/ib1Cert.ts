@@ -1,5 +1,8 @@
 import * as x509 from '@peculiar/x509'
 import * as asn1js from 'asn1js'
+import { createHash } from 'crypto'
+
+import { readIntEnv } from './env'
 
 const ROLE_OID = '1.3.6.1.4.1.62329.1.1'
 const MEMBER_OID = '1.3.6.1.4.1.62329.1.3'
@@ -15,57 +18,98 @@ export function parseCertificateFromHeader(
   return new x509.X509Certificate(pem)
 }
 
+export interface ICertificateAttributes {
+  application: string
+  member: string
+  roles: string[]
+}
+
+const decodeDer = (ext: x509.Extension, name: string) => {
+  const asn = asn1js.fromBER(ext.value)
+  if (asn.offset === -1)
+    throw new Error(`Failed to decode ${name} extension DER value`)
+  return asn.result
+}
+
 /**
- * Extract the Application URL from the SubjectAlternativeName extension (URI type).
+ * Decode application, member and roles in a single pass over the certificate
+ * extensions. The application URL comes from the SubjectAlternativeName
+ * (URI type), the member from extension 1.3.6.1.4.1.62329.1.3 (a DER
+ * UTF8String) and the roles from 1.3.6.1.4.1.62329.1.1 (a DER SEQUENCE OF
+ * UTF8String).
  */
-export function decodeApplication(cert: x509.X509Certificate): string {
-  const san = cert.getExtension(x509.SubjectAlternativeNameExtension)
-  if (!san)
-    throw new Error(
-      'Client certificate does not include application information',
-    )
+export function decodeCertificateAttributes(
+  cert: x509.X509Certificate,
+): ICertificateAttributes {
+  let application: string | undefined
+  let member: string | undefined
+  let roles: string[] | undefined
+
+  cert.extensions.forEach(ext => {
+    if (ext instanceof x509.SubjectAlternativeNameExtension)
+      application = ext.names.items.find(name => name.type === 'url')?.value
+    else if (ext.type === MEMBER_OID)
+      member = (decodeDer(ext, 'member') as asn1js.Utf8String).valueBlock.value
+    else if (ext.type === ROLE_OID)
+      roles = (decodeDer(ext, 'roles') as asn1js.Sequence).valueBlock.value.map(
+        item => (item as asn1js.Utf8String).valueBlock.value,
+      )
+  })
 
-  const uri = san.names.items.find(name => name.type === 'url')
-  if (!uri)
+  if (!application)
     throw new Error(
       'Client certificate does not include application information',
     )
+  if (!member)
+    throw new Error('Client certificate does not include member information')
+  if (!roles)
+    throw new Error('Client certificate does not include role information')
 
-  return uri.value
+  return { application, member, roles }
 }
 
-/**
- * Decode the Member URL from custom extension OID 1.3.6.1.4.1.62329.1.3.
- * The value is a DER-encoded UTF8String.
- */
-export function decodeMember(cert: x509.X509Certificate): string {
-  const ext = cert.getExtension(MEMBER_OID)
-  if (!ext)
-    throw new Error('Client certificate does not include member information')
+interface ICachedAttributes {
+  attributes: ICertificateAttributes
+  notAfter: number
+}
 
-  const asn = asn1js.fromBER(ext.value)
-  if (asn.offset === -1)
-    throw new Error('Failed to decode member extension DER value')
+const CERT_CACHE_MAX_ENTRIES = readIntEnv('CERT_CACHE_MAX_ENTRIES', 256)
 
-  const utf8String = asn.result as asn1js.Utf8String
-  return utf8String.valueBlock.value
-}
+// Senders push many messages with the same certificate, so the decoded
+// attributes are kept in a small LRU keyed on a digest of the raw header
+const attributeCache = new Map<string, ICachedAttributes>()
 
 /**
- * Decode Roles from custom extension OID 1.3.6.1.4.1.62329.1.1.
- * The value is a DER-encoded SEQUENCE OF UTF8String.
+ * Return the sender attributes for an X-Amzn-Mtls-Clientcert-Leaf header
+ * value, decoding the certificate only on a cache miss. Entries are never
+ * served after the certificate's notAfter.
  */
-export function decodeRoles(cert: x509.X509Certificate): string[] {
-  const ext = cert.getExtension(ROLE_OID)
-  if (!ext)
-    throw new Error('Client certificate does not include role information')
+export function getCertificateAttributes(
+  headerValue: string,
+): ICertificateAttributes {
+  const key = createHash('sha256').update(headerValue).digest('base64')
+  const cached = attributeCache.get(key)
 
-  const asn = asn1js.fromBER(ext.value)
-  if (asn.offset === -1)
-    throw new Error('Failed to decode roles extension DER value')
+  if (cached && cached.notAfter > Date.now()) {
+    // Re-insert to mark as most recently used
+    attributeCache.delete(key)
+    attributeCache.set(key, cached)
+    return cached.attributes
+  }
+  if (cached) attributeCache.delete(key)
+
+  const cert = parseCertificateFromHeader(headerValue)
+  const attributes = decodeCertificateAttributes(cert)
+
+  attributeCache.set(key, { attributes, notAfter: cert.notAfter.getTime() })
+  if (attributeCache.size > CERT_CACHE_MAX_ENTRIES) {
+    const oldest = attributeCache.keys().next()
+    if (!oldest.done) attributeCache.delete(oldest.value)
+  }
+
+  return attributes
+}
 
-  const sequence = asn.result as asn1js.Sequence
-  return sequence.valueBlock.value.map(
-    item => (item as asn1js.Utf8String).valueBlock.value,
-  )
+export function clearCertificateAttributeCache() {
+  attributeCache.clear()
 }
@@ -0,0 +1,137 @@
+/**
+ * Structured JSON logger. Each entry is one line on stdout (warn and error on
+ * stderr), so CloudWatch Logs Insights can query the fields directly.
+ *
+ * - LOG_LEVEL (`debug`, `info`, `warn`, `error`; default `info`) drops
+ *   entries below the level before any fields are built. Pass fields as a
+ *   function to defer building a large payload until it is known to be used.
+ * - LOG_SAMPLE_RATES (e.g. `/api/getData=0.1,/perseus/messages=0.01`) and
+ *   LOG_SAMPLE_RATE (default `1`) keep a fraction of requests' debug and info
+ *   entries per route. Warnings and errors are never sampled out.
+ * - Fields whose names look like credentials are redacted, as are bearer
+ *   tokens, JWTs and PEM blocks found in string values.
+ */
+
+export type LogLevel = 'debug' | 'info' | 'warn' | 'error'
+
+export type LogFields = Record<string, unknown>
+
+type LogFieldsArg = LogFields | (() => LogFields)
+
+export interface ILogger {
+  debug(message: string, fields?: LogFieldsArg): void
+  info(message: string, fields?: LogFieldsArg): void
+  warn(message: string, fields?: LogFieldsArg): void
+  error(message: string, fields?: LogFieldsArg): void
+  enabled(level: LogLevel): boolean
+}
+
+const LEVELS: Record<LogLevel, number> = {
+  debug: 10,
+  info: 20,
+  warn: 30,
+  error: 40,
+}
+
+const REDACTED = '[REDACTED]'
+const MAX_DEPTH = 6
+
+// Field names whose values are never written
+const SECRET_KEY =
+  /token$|secret|password|authorization|cookie|code_verifier|private_?key|mtls_?key|mtls_?bundle|^code$/i
+const SECRET_VALUE =
+  /Bearer\s+[\w.~+/=-]+|eyJ[\w-]+\.[\w-]+\.[\w-]*|-----BEGIN [A-Z ]+-----[\s\S]*?-----END [A-Z ]+-----/g
+
+const resolveLevel = (): LogLevel => {
+  const value = (process.env.LOG_LEVEL ?? '').toLowerCase()
+  return value in LEVELS ? (value as LogLevel) : 'info'
+}
+
+const readRate = (value: string | undefined, fallback: number) => {
+  const rate = Number.parseFloat(value ?? '')
+  return Number.isFinite(rate) && rate >= 0 && rate <= 1 ? rate : fallback
+}
+
+const DEFAULT_SAMPLE_RATE = readRate(process.env.LOG_SAMPLE_RATE, 1)
+
+export const parseSampleRates = (value: string | undefined) => {
+  const rates = new Map<string, number>()
+  for (const entry of (value ?? '').split(',')) {
+    const [route, rate] = entry.split('=').map(part => part.trim())
+    if (route && rate !== undefined) rates.set(route, readRate(rate, 1))
+  }
+  return rates
+}
+
+const SAMPLE_RATES = parseSampleRates(process.env.LOG_SAMPLE_RATES)
+
+const minLevel = LEVELS[resolveLevel()]
+
+export const redact = (value: unknown, depth = 0): unknown => {
+  if (typeof value === 'string') return value.replace(SECRET_VALUE, REDACTED)
+  if (value instanceof Error)
+    return {
+      name: value.name,
+      message: redact(value.message),
+      stack: value.stack ? redact(value.stack) : undefined,
+    }
+  if (value instanceof URL) return redact(value.href)
+  if (value === null || typeof value !== 'object') return value
+  if (depth >= MAX_DEPTH) return '[Truncated]'
+  if (Array.isArray(value)) return value.map(item => redact(item, depth + 1))
+
+  const result: LogFields = {}
+  for (const [key, item] of Object.entries(value))
+    result[key] = SECRET_KEY.test(key) ? REDACTED : redact(item, depth + 1)
+  return result
+}
+
+const write = (
+  level: LogLevel,
+  base: LogFields,
+  message: string,
+  fields?: LogFieldsArg,
+) => {
+  const extra = typeof fields === 'function' ? fields() : fields
+  const line = JSON.stringify({
+    time: new Date().toISOString(),
+    level,
+    ...base,
+    msg: message,
+    ...(extra ? (redact(extra) as LogFields) : undefined),
+  })
+  const stream = LEVELS[level] >= LEVELS.warn ? process.stderr : process.stdout
+  stream.write(`${line}\n`)
+}
+
+const buildLogger = (base: LogFields, sampled: boolean): ILogger => {
+  const enabled = (level: LogLevel) =>
+    LEVELS[level] >= minLevel && (sampled || LEVELS[level] >= LEVELS.warn)
+
+  const at =
+    (level: LogLevel) => (message: string, fields?: LogFieldsArg) => {
+      if (enabled(level)) write(level, base, message, fields)
+    }
+
+  return {
+    debug: at('debug'),
+    info: at('info'),
+    warn: at('warn'),
+    error: at('error'),
+    enabled,
+  }
+}
+
+/** Logger for a module; every entry is kept, subject to LOG_LEVEL. */
+export const createLogger = (scope: string): ILogger =>
+  buildLogger({ scope }, true)
+
+/**
+ * Logger for one request to `route`. Whether its debug and info entries are
+ * kept is decided once, so a sampled request is logged in full.
+ */
+export const requestLogger = (route: string, fields: LogFields = {}) =>
+  buildLogger(
+    { scope: route, ...fields },
+    Math.random() < (SAMPLE_RATES.get(route) ?? DEFAULT_SAMPLE_RATE),
+  )
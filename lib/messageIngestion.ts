@@ -0,0 +1,380 @@
+import {
+  BatchWriteItemCommand,
+  DynamoDBClient,
+} from '@aws-sdk/client-dynamodb'
+import { SendMessageBatchCommand, SQSClient } from '@aws-sdk/client-sqs'
+import { randomUUID } from 'crypto'
+
+import { readIntEnv } from './env'
+import { createLogger } from './logger'
+import { processState } from './processState'
+
+export interface IQueuedMessage {
+  id: string
+  receivedAt: string
+  message: Record<string, unknown>
+  attempts: number
+}
+
+/**
+ * Destination for flushed batches. `write` resolves with the messages that
+ * were not accepted (to be retried) and rejects if the whole batch failed.
+ */
+export interface IMessageSink {
+  name: string
+  maxBatchSize: number
+  write(batch: IQueuedMessage[]): Promise<IQueuedMessage[]>
+}
+
+export interface IIngestionOptions {
+  // Messages held in memory (queued and in flight) before new ones get a 503
+  maxQueueSize: number
+  batchSize: number
+  flushIntervalMs: number
+  maxAttempts: number
+}
+
+export interface IIngestionStats {
+  sink: string
+  queued: number
+  inFlight: number
+  accepted: number
+  rejected: number
+  written: number
+  retried: number
+  dropped: number
+  batches: number
+}
+
+const log = createLogger('messageIngestion')
+
+export const resolveIngestionOptions = (): IIngestionOptions => ({
+  maxQueueSize: readIntEnv('MESSAGE_QUEUE_MAX_SIZE', 10_000),
+  batchSize: readIntEnv('MESSAGE_BATCH_SIZE', 25),
+  flushIntervalMs: readIntEnv('MESSAGE_FLUSH_INTERVAL_MS', 1000),
+  maxAttempts: readIntEnv('MESSAGE_MAX_ATTEMPTS', 5),
+})
+
+const delay = (ms: number) => new Promise(resolve => setTimeout(resolve, ms))
+
+/**
+ * Bounded in-memory queue that acknowledges messages immediately and writes
+ * them to a sink in batches, when a batch fills or the flush interval elapses.
+ * Messages are refused while the sink is unavailable or the queue is closing.
+ */
+export const createIngestionQueue = (
+  sinkPromise: Promise<IMessageSink>,
+  options: IIngestionOptions,
+) => {
+  const queue: IQueuedMessage[] = []
+  let sinkName = 'pending'
+  let inFlight = 0
+  let flushing: Promise<void> | null = null
+  let timer: ReturnType<typeof setTimeout> | null = null
+  let sinkError: unknown = null
+  let closing = false
+  const stats = {
+    accepted: 0,
+    rejected: 0,
+    written: 0,
+    retried: 0,
+    dropped: 0,
+    batches: 0,
+  }
+
+  const requeue = (messages: IQueuedMessage[]) => {
+    const retry = messages.filter(
+      message => ++message.attempts < options.maxAttempts,
+    )
+    const dropped = messages.length - retry.length
+    stats.retried += retry.length
+    stats.dropped += dropped
+    if (dropped)
+      log.error('Dropping messages after max attempts', {
+        dropped,
+        attempts: options.maxAttempts,
+      })
+    queue.unshift(...retry)
+    return retry.length
+  }
+
+  sinkPromise.then(
+    sink => {
+      sinkName = sink.name
+    },
+    error => {
+      sinkError = error
+      sinkName = 'unavailable'
+      log.error('Message sink unavailable; refusing messages', {
+        error,
+        lost: queue.length,
+      })
+      queue.splice(0)
+    },
+  )
+
+  const drain = async (all: boolean) => {
+    const sink = await sinkPromise
+    sinkName = sink.name
+    const batchSize = Math.min(options.batchSize, sink.maxBatchSize)
+
+    while (queue.length >= batchSize || (all && queue.length > 0)) {
+      const batch = queue.splice(0, batchSize)
+      inFlight += batch.length
+      stats.batches++
+      let failed: IQueuedMessage[]
+      try {
+        failed = await sink.write(batch)
+      } catch (error) {
+        log.warn('Message sink write failed', { sink: sink.name, error })
+        failed = batch
+      }
+      inFlight -= batch.length
+      stats.written += batch.length - failed.length
+
+      // Back off before retrying so a struggling sink is not hammered
+      if (failed.length && requeue(failed)) {
+        await delay(Math.min(100 * 2 ** failed[0].attempts, 5000))
+        if (!all) break
+      }
+    }
+  }
+
+  const flush = (all = true): Promise<void> => {
+    if (!flushing)
+      flushing = drain(all).finally(() => {
+        flushing = null
+        if (queue.length) schedule()
+      })
+    return flushing
+  }
+
+  const schedule = () => {
+    if (timer) return
+    timer = setTimeout(() => {
+      timer = null
+      flush().catch(error => log.error('Message flush failed', { error }))
+    }, options.flushIntervalMs)
+    timer.unref?.()
+  }
+
+  return {
+    /**
+     * Queue a message for delivery. Returns the message id, or null when the
+     * queue is full and the caller should shed load.
+     */
+    enqueue(message: Record<string, unknown>): string | null {
+      if (
+        sinkError ||
+        closing ||
+        queue.length + inFlight >= options.maxQueueSize
+      ) {
+        stats.rejected++
+        return null
+      }
+
+      const id = randomUUID()
+      queue.push({
+        id,
+        receivedAt: new Date().toISOString(),
+        message,
+        attempts: 0,
+      })
+      stats.accepted++
+
+      if (queue.length >= options.batchSize)
+        flush(false).catch(error =>
+          log.error('Message flush failed', { error }),
+        )
+      else schedule()
+
+      return id
+    },
+    flush,
+    /**
+     * Stop accepting messages and write out everything queued, giving up
+     * after `timeoutMs`. Resolves with the number of messages left unwritten.
+     */
+    async close(timeoutMs: number): Promise<number> {
+      closing = true
+      if (timer) clearTimeout(timer)
+      timer = null
+
+      const deadline = Date.now() + timeoutMs
+      const drained = (async () => {
+        while (
+          (queue.length || inFlight) &&
+          !sinkError &&
+          Date.now() < deadline
+        )
+          await flush().catch(error =>
+            log.error('Message flush failed', { error }),
+          )
+      })()
+      let expired: ReturnType<typeof setTimeout> | undefined
+      await Promise.race([
+        drained,
+        new Promise(resolve => {
+          expired = setTimeout(resolve, timeoutMs)
+        }),
+      ])
+      clearTimeout(expired)
+      return queue.length + inFlight
+    },
+    /** Resolves with the sink name once it is initialised. */
+    async ready(): Promise<string> {
+      sinkName = (await sinkPromise).name
+      return sinkName
+    },
+    stats(): IIngestionStats {
+      return { sink: sinkName, queued: queue.length, inFlight, ...stats }
+    },
+  }
+}
+
+export type IngestionQueue = ReturnType<typeof createIngestionQueue>
+
+// Compact single-line output; the default when no durable sink is configured
+export const logSink: IMessageSink = {
+  name: 'log',
+  maxBatchSize: 100,
+  async write(batch) {
+    batch.forEach(item =>
+      console.log(
+        JSON.stringify({
+          type: 'ib1-message',
+          id: item.id,
+          receivedAt: item.receivedAt,
+          message: item.message,
+        }),
+      ),
+    )
+    return []
+  },
+}
+
+const awsClientConfig = (endpoint?: string) => ({
+  region: process.env.AWS_REGION ?? 'eu-west-2',
+  endpoint,
+})
+
+export const createDynamoDbSink = (
+  tableName: string,
+  endpoint?: string,
+): IMessageSink => {
+  const client = new DynamoDBClient(awsClientConfig(endpoint))
+
+  return {
+    name: 'dynamodb',
+    maxBatchSize: 25,
+    async write(batch) {
+      const byId = new Map(batch.map(item => [item.id, item]))
+      const result = await client.send(
+        new BatchWriteItemCommand({
+          RequestItems: {
+            [tableName]: batch.map(item => ({
+              PutRequest: {
+                Item: {
+                  messageId: { S: item.id },
+                  receivedAt: { S: item.receivedAt },
+                  messageType: { S: String(item.message['ib1:message']) },
+                  payload: { S: JSON.stringify(item.message) },
+                },
+              },
+            })),
+          },
+        }),
+      )
+
+      const unprocessed = result.UnprocessedItems?.[tableName] ?? []
+      return unprocessed
+        .map(request => byId.get(request.PutRequest?.Item?.messageId?.S ?? ''))
+        .filter((item): item is IQueuedMessage => item !== undefined)
+    },
+  }
+}
+
+export const createSqsSink = (
+  queueUrl: string,
+  endpoint?: string,
+): IMessageSink => {
+  const client = new SQSClient(awsClientConfig(endpoint))
+
+  return {
+    name: 'sqs',
+    maxBatchSize: 10,
+    async write(batch) {
+      const byId = new Map(batch.map(item => [item.id, item]))
+      const result = await client.send(
+        new SendMessageBatchCommand({
+          QueueUrl: queueUrl,
+          Entries: batch.map(item => ({
+            Id: item.id,
+            MessageBody: JSON.stringify({
+              id: item.id,
+              receivedAt: item.receivedAt,
+              message: item.message,
+            }),
+          })),
+        }),
+      )
+
+      return (result.Failed ?? [])
+        .map(entry => byId.get(entry.Id ?? ''))
+        .filter((item): item is IQueuedMessage => item !== undefined)
+    },
+  }
+}
+
+/**
+ * Choose the sink from MESSAGE_SINK (`log`, `dynamodb` or `sqs`). A sink that
+ * cannot be initialised rejects, so the queue refuses messages with a 503
+ * rather than acknowledging messages it has nowhere to write.
+ */
+export const createSinkFromEnv = async (): Promise<IMessageSink> => {
+  const sink = process.env.MESSAGE_SINK ?? 'log'
+  if (sink === 'log') return logSink
+  if (sink === 'dynamodb')
+    return createDynamoDbSink(
+      process.env.MESSAGE_TABLE_NAME ?? 'perseus-cap-messages',
+      process.env.MESSAGE_DYNAMODB_ENDPOINT,
+    )
+  if (sink === 'sqs') {
+    const queueUrl = process.env.MESSAGE_QUEUE_URL
+    if (!queueUrl) throw new Error('MESSAGE_QUEUE_URL is not set')
+    return createSqsSink(queueUrl, process.env.MESSAGE_SQS_ENDPOINT)
+  }
+  throw new Error(`Unknown MESSAGE_SINK "${sink}"`)
+}
+
+export const getMessageIngestion = (): IngestionQueue =>
+  processState('messageIngestion', () =>
+    createIngestionQueue(createSinkFromEnv(), resolveIngestionOptions()),
+  )
+
+/**
+ * Write out queued messages before the process exits. Messages are
+ * acknowledged before they are written, so without this a rolling deploy or
+ * scale-in would lose whatever is still queued. ECS stops routing to a task
+ * before signalling it, so by the time SIGTERM arrives the queue only drains.
+ * The server must run with NEXT_MANUAL_SIG_HANDLE=true so Next.js leaves the
+ * signal to this handler, which exits once the flush is done.
+ */
+export const flushMessagesOnShutdown = () =>
+  processState('messageShutdown', () => {
+    const shutdown = async (signal: NodeJS.Signals) => {
+      const ingestion = getMessageIngestion()
+      log.info('Flushing queued messages before exit', {
+        signal,
+        ...ingestion.stats(),
+      })
+      const unwritten = await ingestion.close(
+        readIntEnv('MESSAGE_SHUTDOWN_TIMEOUT_MS', 20_000),
+      )
+      if (unwritten) log.error('Exiting with unwritten messages', { unwritten })
+      process.exit(0)
+    }
+    process.once('SIGTERM', shutdown)
+    process.once('SIGINT', shutdown)
+    return true
+  })
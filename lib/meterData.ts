@@ -0,0 +1,251 @@
+import type { createCustomFetch } from './clientConfig'
+import { readIntEnv } from './env'
+
+type CustomFetch = Awaited<ReturnType<typeof createCustomFetch>>
+
+export interface IMeter {
+  id: string
+  availableMeasures?: string[]
+  [key: string]: unknown
+}
+
+export interface IMeterDataChunk {
+  meter: string
+  measure: string
+  from: string
+  to: string
+}
+
+export interface IMeterDataQuery {
+  from: string
+  to: string
+  meters?: string[]
+  measures?: string[]
+}
+
+// Outbound requests in flight per streamed response
+export const GETDATA_CONCURRENCY = readIntEnv('GETDATA_CONCURRENCY', 4)
+// Days covered by a single measure request
+export const GETDATA_CHUNK_DAYS = readIntEnv('GETDATA_CHUNK_DAYS', 7)
+// Longest range a single request may ask for
+export const GETDATA_MAX_RANGE_DAYS = readIntEnv('GETDATA_MAX_RANGE_DAYS', 366)
+// Largest measure response body accepted per chunk; together with the
+// concurrency limit this caps the memory a streamed response can hold
+export const GETDATA_MAX_CHUNK_BYTES = readIntEnv(
+  'GETDATA_MAX_CHUNK_BYTES',
+  4 * 1024 * 1024,
+)
+
+// Only the start of an upstream error body is kept in the error line
+const ERROR_BODY_MAX_BYTES = 4096
+
+const DAY_MS = 24 * 60 * 60 * 1000
+const DATE_ONLY = /^\d{4}-\d{2}-\d{2}$/
+
+const parseDate = (value: string, name: string) => {
+  const time = Date.parse(value)
+  if (Number.isNaN(time)) throw new Error(`Invalid ${name} date: ${value}`)
+  return time
+}
+
+/**
+ * Split [from, to) into consecutive ranges of at most chunkDays days. Date-only
+ * inputs produce date-only boundaries, otherwise full ISO timestamps are used.
+ */
+export const splitDateRange = (
+  from: string,
+  to: string,
+  chunkDays = GETDATA_CHUNK_DAYS,
+  maxRangeDays = GETDATA_MAX_RANGE_DAYS,
+): Array<{ from: string; to: string }> => {
+  const start = parseDate(from, 'from')
+  const end = parseDate(to, 'to')
+  if (end <= start) throw new Error('"to" must be after "from"')
+  if (end - start > maxRangeDays * DAY_MS)
+    throw new Error(`Date range exceeds ${maxRangeDays} days`)
+
+  const dateOnly = DATE_ONLY.test(from) && DATE_ONLY.test(to)
+  const format = (time: number) =>
+    dateOnly
+      ? new Date(time).toISOString().slice(0, 10)
+      : new Date(time).toISOString()
+
+  const ranges: Array<{ from: string; to: string }> = []
+  for (let cursor = start; cursor < end; cursor += chunkDays * DAY_MS)
+    ranges.push({
+      from: format(cursor),
+      to: format(Math.min(cursor + chunkDays * DAY_MS, end)),
+    })
+
+  return ranges
+}
+
+/**
+ * Expand the selected meters and measures into one chunk per measure and date
+ * range. Unknown meter ids and measures not offered by a meter are skipped.
+ */
+export const planMeterDataChunks = (
+  meters: IMeter[],
+  query: IMeterDataQuery,
+): IMeterDataChunk[] => {
+  const ranges = splitDateRange(query.from, query.to)
+  const chunks: IMeterDataChunk[] = []
+
+  meters
+    .filter(meter => !query.meters?.length || query.meters.includes(meter.id))
+    .forEach(meter =>
+      (meter.availableMeasures ?? [])
+        .filter(
+          measure =>
+            !query.measures?.length || query.measures.includes(measure),
+        )
+        .forEach(measure =>
+          ranges.forEach(range =>
+            chunks.push({ meter: meter.id, measure, ...range }),
+          ),
+        ),
+    )
+
+  return chunks
+}
+
+/**
+ * Read a JSON response body, giving up once it grows past maxBytes so a single
+ * oversized chunk cannot exhaust the task's memory.
+ */
+export const readJsonCapped = async (
+  response: Response,
+  maxBytes = GETDATA_MAX_CHUNK_BYTES,
+): Promise<unknown> => {
+  if (!response.body) return null
+
+  const reader = response.body.getReader()
+  const parts: Uint8Array[] = []
+  let size = 0
+  for (;;) {
+    const { done, value } = await reader.read()
+    if (done) break
+    size += value.byteLength
+    if (size > maxBytes) {
+      await reader.cancel()
+      throw new Error(`Response body exceeds ${maxBytes} bytes`)
+    }
+    parts.push(value)
+  }
+
+  return JSON.parse(Buffer.concat(parts).toString('utf8'))
+}
+
+/**
+ * Read at most `maxBytes` of an error response as text and cancel the rest,
+ * so an upstream error page cannot be buffered whole.
+ */
+export const readErrorText = async (
+  response: Response,
+  maxBytes = ERROR_BODY_MAX_BYTES,
+): Promise<string> => {
+  if (!response.body) return ''
+
+  const reader = response.body.getReader()
+  const parts: Uint8Array[] = []
+  let size = 0
+  while (size < maxBytes) {
+    const { done, value } = await reader.read()
+    if (done) return Buffer.concat(parts).toString('utf8')
+    parts.push(value)
+    size += value.byteLength
+  }
+
+  await reader.cancel()
+  return Buffer.concat(parts).subarray(0, maxBytes).toString('utf8')
+}
+
+const encoder = new TextEncoder()
+const toLine = (value: object) => encoder.encode(`${JSON.stringify(value)}\n`)
+
+/**
+ * Stream meter data as NDJSON, one line per chunk in completion order.
+ *
+ * Chunks are fetched with at most `concurrency` requests in flight and new
+ * requests only start when the consumer pulls, so a slow client applies
+ * backpressure instead of the handler buffering the whole range.
+ */
+export const streamMeterData = (
+  customFetch: CustomFetch,
+  baseUrl: URL,
+  accessToken: string,
+  chunks: IMeterDataChunk[],
+  concurrency = GETDATA_CONCURRENCY,
+): ReadableStream<Uint8Array> => {
+  const abortController = new AbortController()
+
+  const fetchChunk = async (chunk: IMeterDataChunk): Promise<object> => {
+    const path = [chunk.meter, chunk.measure].map(encodeURIComponent).join('/')
+    const url = new URL(`/datasources/${path}`, baseUrl)
+    url.searchParams.set('from', chunk.from)
+    url.searchParams.set('to', chunk.to)
+
+    try {
+      const response = await customFetch(url, {
+        method: 'GET',
+        headers: {
+          Authorization: `Bearer ${accessToken}`,
+          Accept: 'application/json',
+        },
+        signal: abortController.signal,
+      })
+      if (!response.ok)
+        return {
+          type: 'error',
+          ...chunk,
+          status: response.status,
+          error: await readErrorText(response),
+        }
+
+      return { type: 'data', ...chunk, data: await readJsonCapped(response) }
+    } catch (error) {
+      return {
+        type: 'error',
+        ...chunk,
+        error: error instanceof Error ? error.message : 'Unknown error',
+      }
+    }
+  }
+
+  let nextChunk = 0
+  let failed = 0
+  const running = new Map<number, Promise<{ id: number; line: object }>>()
+  const fill = () => {
+    while (running.size < concurrency && nextChunk < chunks.length) {
+      const id = nextChunk++
+      running.set(id, fetchChunk(chunks[id]).then(line => ({ id, line })))
+    }
+  }
+
+  return new ReadableStream<Uint8Array>(
+    {
+      start(controller) {
+        controller.enqueue(toLine({ type: 'plan', chunks: chunks.length }))
+      },
+      async pull(controller) {
+        fill()
+        if (running.size === 0) {
+          controller.enqueue(
+            toLine({ type: 'done', chunks: chunks.length, failed }),
+          )
+          controller.close()
+          return
+        }
+
+        const { id, line } = await Promise.race(Array.from(running.values()))
+        running.delete(id)
+        if ((line as { type: string }).type === 'error') failed++
+        controller.enqueue(toLine(line))
+      },
+      cancel() {
+        abortController.abort()
+      },
+    },
+    { highWaterMark: 1 },
+  )
+}
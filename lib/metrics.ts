@@ -0,0 +1,124 @@
+import { AsyncLocalStorage } from 'async_hooks'
+import { performance } from 'perf_hooks'
+
+import { processState } from './processState'
+
+/**
+ * Per-request latency metrics in CloudWatch Embedded Metric Format. Each
+ * request writes one JSON line to stdout; CloudWatch Logs extracts the
+ * metrics from it, so no agent or PutMetricData calls are needed.
+ *
+ * Phases (`timed('discovery', ...)`) and outbound connection timings (DNS,
+ * connect, TLS and time to first byte, recorded by the mTLS agent) land on
+ * the request in progress through AsyncLocalStorage, so library code can
+ * record them without a metrics object being passed around. Outside a
+ * request, or when METRICS_NAMESPACE is unset, recording is a no-op.
+ */
+
+export interface IRouteMetrics {
+  route: string
+  // Milliseconds per metric name; a name recorded twice keeps both values
+  values: Map<string, number[]>
+}
+
+// Shared so the mTLS agent sees the request even when instrumentation built it
+const storage = processState(
+  'metricsStorage',
+  () => new AsyncLocalStorage<IRouteMetrics>(),
+)
+
+const namespace = () => process.env.METRICS_NAMESPACE
+
+export const currentMetrics = () => storage.getStore()
+
+/**
+ * Add a duration (ms) to the current request's metrics, if any. Callbacks
+ * that may run outside the request (socket events) pass the metrics they
+ * captured from `currentMetrics()` instead.
+ */
+export const recordMetric = (
+  name: string,
+  milliseconds: number,
+  metrics = storage.getStore(),
+) => {
+  if (!metrics) return
+  const values = metrics.values.get(name)
+  if (values) values.push(milliseconds)
+  else metrics.values.set(name, [milliseconds])
+}
+
+/** Run `operation`, recording how long it took under `phase`. */
+export const timed = async <T>(
+  phase: string,
+  operation: () => Promise<T>,
+): Promise<T> => {
+  if (!storage.getStore()) return operation()
+  const startedAt = performance.now()
+  try {
+    return await operation()
+  } finally {
+    recordMetric(phase, performance.now() - startedAt)
+  }
+}
+
+const round = (value: number) => Math.round(value * 100) / 100
+
+/**
+ * Build the EMF document for a finished request. Metrics share the
+ * Environment and Route dimensions; a metric with several values (e.g. ttfb
+ * across two outbound calls) is written as an array, which EMF records as
+ * separate samples.
+ */
+export const toEmf = (
+  metrics: IRouteMetrics,
+  metricNamespace: string,
+  properties: Record<string, unknown> = {},
+) => {
+  const document: Record<string, unknown> = {
+    _aws: {
+      Timestamp: Date.now(),
+      CloudWatchMetrics: [
+        {
+          Namespace: metricNamespace,
+          Dimensions: [['Environment', 'Route']],
+          Metrics: Array.from(metrics.values.keys(), name => ({
+            Name: name,
+            Unit: 'Milliseconds',
+          })),
+        },
+      ],
+    },
+    Environment: process.env.APP_ENV ?? 'local',
+    Route: metrics.route,
+    ...properties,
+  }
+  metrics.values.forEach((values, name) => {
+    document[name] = values.length === 1 ? round(values[0]) : values.map(round)
+  })
+  return document
+}
+/**
+ * Run a route handler with per-request metrics and write them as one EMF
+ * line when the response is ready. `Duration` covers the handler up to the
+ * response headers; a streamed body continues after it.
+ */
+export const withRouteMetrics = async <T extends Response>(
+  route: string,
+  handler: () => Promise<T>,
+): Promise<T> => {
+  const metricNamespace = namespace()
+  if (!metricNamespace) return handler()
+
+  const metrics: IRouteMetrics = { route, values: new Map() }
+  const startedAt = performance.now()
+  let status = 500
+  try {
+    const response = await storage.run(metrics, handler)
+    status = response.status
+    return response
+  } finally {
+    metrics.values.set('Duration', [performance.now() - startedAt])
+    const document = toEmf(metrics, metricNamespace, { Status: status })
+    process.stdout.write(`${JSON.stringify(document)}\n`)
+  }
+}
@@ -0,0 +1,61 @@
+import { performance } from 'perf_hooks'
+
+import {
+  createCustomFetch,
+  getClientConfigPromise,
+  resolveAuthServer,
+} from './clientConfig'
+import { getDiscoveryConfiguration } from './discoveryCache'
+import { readIntEnv } from './env'
+import { createLogger } from './logger'
+import { processState } from './processState'
+
+const log = createLogger('parConnection')
+
+// 0 warms once at startup only
+const WARM_INTERVAL_MS = readIntEnv('PAR_WARM_INTERVAL_MS', 0, { min: 0 })
+
+const warming = processState('parConnectionWarming', () => ({ started: false }))
+
+/**
+ * Open a pooled mTLS connection to the PAR endpoint, so the first login does
+ * not pay for DNS, TCP and the mutual TLS handshake. A HEAD request is
+ * enough: any response, even 405, leaves a keep-alive connection in the
+ * agent's pool. Never rejects; returns whether a connection was made.
+ */
+export const warmParConnection = async (): Promise<boolean> => {
+  const startedAt = performance.now()
+  try {
+    const [clientConfig, issuer] = await Promise.all([
+      getClientConfigPromise(),
+      getDiscoveryConfiguration(resolveAuthServer()),
+    ])
+    const parEndpoint =
+      issuer.serverMetadata().pushed_authorization_request_endpoint
+    if (!parEndpoint) return false
+
+    const customFetch = await createCustomFetch(clientConfig)
+    const response = await customFetch(parEndpoint, { method: 'HEAD' })
+    await response.body?.cancel()
+    log.debug('PAR connection warmed', {
+      status: response.status,
+      duration_ms: Math.round(performance.now() - startedAt),
+    })
+    return true
+  } catch (error) {
+    log.warn('Could not warm the PAR connection', { error })
+    return false
+  }
+}
+
+/**
+ * Warm the PAR connection now and, with PAR_WARM_INTERVAL_MS set below the
+ * keep-alive timeout, again on that interval so an idle task keeps it open.
+ */
+export const startParConnectionWarming = () => {
+  if (warming.started) return
+  warming.started = true
+  void warmParConnection()
+  if (WARM_INTERVAL_MS)
+    setInterval(warmParConnection, WARM_INTERVAL_MS).unref?.()
+}
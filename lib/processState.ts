@@ -0,0 +1,13 @@
+/**
+ * State shared by every bundle in the server process. Next.js compiles
+ * instrumentation.ts and the route handlers as separate bundles, each with
+ * its own copy of a module, so plain module-level caches warmed at startup
+ * would never be seen by the routes. Values live on globalThis under a
+ * registered symbol instead and are created once per process.
+ */
+export const processState = <T>(name: string, create: () => T): T => {
+  const key = Symbol.for(`perseus-cap.${name}`)
+  const store = globalThis as unknown as Record<symbol, T | undefined>
+  if (store[key] === undefined) store[key] = create()
+  return store[key] as T
+}
@@ -0,0 +1,227 @@
+import * as undici from 'undici'
+
+import { readIntEnv } from './env'
+import { createLogger } from './logger'
+import { timed } from './metrics'
+import { processState } from './processState'
+
+export type ProvenanceRecord = Record<string, unknown>
+
+export interface ISignResult {
+  ok: boolean
+  // Signed record as returned by the provenance service
+  record?: unknown
+  status?: number
+  error?: string
+}
+
+export interface IProvenanceClientOptions {
+  // Records sent in one batch request
+  batchSize: number
+  // Requests in flight at once, and connections pooled to the service
+  concurrency: number
+  timeoutMs: number
+  // Batch signing path, for a service that has one; unset signs one by one
+  batchPath?: string
+}
+
+export interface IProvenanceClientStats {
+  records: number
+  requests: number
+  failed: number
+  // Unknown until the first batch; false once the service has rejected one
+  batchSupported?: boolean
+}
+
+export const resolveProvenanceClientOptions = (): IProvenanceClientOptions => ({
+  batchSize: readIntEnv('PROVENANCE_BATCH_SIZE', 25),
+  concurrency: readIntEnv('PROVENANCE_CONCURRENCY', 4),
+  timeoutMs: readIntEnv('PROVENANCE_TIMEOUT_MS', 10_000),
+  batchPath: process.env.PROVENANCE_BATCH_PATH || undefined,
+})
+
+const SIGN_PATH = '/api/v1/sign/cap'
+// Answers from a provenance service that has no batch endpoint
+const BATCH_UNSUPPORTED = new Set([404, 405, 501])
+
+const log = createLogger('provenance')
+
+/** Split `items` into consecutive batches of at most `size`. */
+export const toBatches = <T>(items: T[], size: number): T[][] => {
+  const batches: T[][] = []
+  for (let start = 0; start < items.length; start += size)
+    batches.push(items.slice(start, start + size))
+  return batches
+}
+
+/** Run `task` over `items` with at most `limit` in flight, keeping order. */
+export const mapWithConcurrency = async <T, R>(
+  items: T[],
+  limit: number,
+  task: (item: T, index: number) => Promise<R>,
+): Promise<R[]> => {
+  const results = new Array<R>(items.length)
+  let next = 0
+  const worker = async () => {
+    while (next < items.length) {
+      const index = next++
+      results[index] = await task(items[index], index)
+    }
+  }
+  await Promise.all(
+    Array.from({ length: Math.min(limit, items.length) }, worker),
+  )
+  return results
+}
+
+const failure = (error: unknown, status?: number): ISignResult => ({
+  ok: false,
+  status,
+  error: error instanceof Error ? error.message : String(error),
+})
+
+/**
+ * Client for the provenance service's signing API. Records are sent in
+ * batches of `batchSize`, with at most `concurrency` requests in flight. The
+ * pooled keep-alive connections are opened one DNS lookup at a time, so with
+ * Cloud Map's multivalue answers (or the Service Connect proxy) they spread
+ * across provenance tasks rather than queueing on one.
+ *
+ * Records are only sent in batch requests when `batchPath` is set. A service
+ * that answers it with 404 is treated as having no batch endpoint, and from
+ * then on each batch is sent one record per request under the same limit.
+ */
+export const createProvenanceClient = (
+  baseUrl: URL,
+  options: IProvenanceClientOptions = resolveProvenanceClientOptions(),
+) => {
+  const agent = new undici.Agent({
+    connections: options.concurrency,
+    keepAliveTimeout: 30_000,
+  })
+  const stats: IProvenanceClientStats = { records: 0, requests: 0, failed: 0 }
+
+  const post = async (path: string, body: unknown) => {
+    stats.requests++
+    return undici.fetch(new URL(path, baseUrl), {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(body),
+      dispatcher: agent,
+      signal: AbortSignal.timeout(options.timeoutMs),
+    })
+  }
+
+  const signOne = async (record: ProvenanceRecord): Promise<ISignResult> => {
+    try {
+      const response = await post(SIGN_PATH, record)
+      if (!response.ok) return failure(await response.text(), response.status)
+      return {
+        ok: true,
+        status: response.status,
+        record: await response.json(),
+      }
+    } catch (error) {
+      return failure(error)
+    }
+  }
+
+  const signBatch = async (
+    batch: ProvenanceRecord[],
+  ): Promise<ISignResult[]> => {
+    if (!options.batchPath || stats.batchSupported === false)
+      return mapWithConcurrency(batch, 1, signOne)
+
+    let response: undici.Response
+    try {
+      response = await post(options.batchPath, { records: batch })
+    } catch (error) {
+      return batch.map(() => failure(error))
+    }
+    if (BATCH_UNSUPPORTED.has(response.status)) {
+      await response.body?.cancel()
+      if (stats.batchSupported === undefined)
+        log.info('Batch signing unavailable, signing records one by one', {
+          status: response.status,
+        })
+      stats.batchSupported = false
+      return mapWithConcurrency(batch, 1, signOne)
+    }
+    stats.batchSupported = true
+    if (!response.ok) {
+      const error = failure(await response.text(), response.status)
+      return batch.map(() => error)
+    }
+
+    // Results are matched to records by position, so any other count means
+    // none of them can be attributed
+    const { results } = (await response.json()) as { results?: unknown[] }
+    const count = Array.isArray(results) ? results.length : 0
+    if (!results || count !== batch.length) {
+      const error = failure(
+        `Batch response has ${count} results for ${batch.length} records`,
+        response.status,
+      )
+      return batch.map(() => error)
+    }
+    return results.map(record => ({
+      ok: true,
+      status: response.status,
+      record,
+    }))
+  }
+
+  /**
+   * Sign CAP records, returning one result per record in input order. Failed
+   * records are reported in their result rather than rejecting the call.
+   */
+  const signCapRecords = async (
+    records: ProvenanceRecord[],
+  ): Promise<ISignResult[]> => {
+    if (records.length === 0) return []
+    const batches = await timed('provenanceSign', () =>
+      mapWithConcurrency(
+        toBatches(records, options.batchSize),
+        options.concurrency,
+        signBatch,
+      ),
+    )
+    const results = batches.flat()
+    const failed = results.filter(result => !result.ok).length
+    stats.records += records.length
+    stats.failed += failed
+
+    if (failed)
+      log.warn('Provenance signing failed', {
+        records: records.length,
+        failed,
+        error: results.find(result => !result.ok)?.error,
+      })
+    return results
+  }
+
+  return {
+    signCapRecords,
+    stats: (): IProvenanceClientStats => ({ ...stats }),
+    close: () => agent.close(),
+  }
+}
+
+export type ProvenanceClient = ReturnType<typeof createProvenanceClient>
+
+const clients = processState('provenanceClients', () => ({
+  byUrl: new Map<string, ProvenanceClient>(),
+}))
+
+/** The shared client for PROVENANCE_SERVICE_URL (or `baseUrl`). */
+export const getProvenanceClient = (
+  baseUrl = process.env.PROVENANCE_SERVICE_URL,
+): ProvenanceClient => {
+  if (!baseUrl) throw new Error('PROVENANCE_SERVICE_URL is not set')
+  let client = clients.byUrl.get(baseUrl)
+  if (!client) {
+    client = createProvenanceClient(new URL(baseUrl))
+    clients.byUrl.set(baseUrl, client)
+  }
+  return client
+}
@@ -0,0 +1,367 @@
+import {
+  DynamoDBClient,
+  GetItemCommand,
+  PutItemCommand,
+} from '@aws-sdk/client-dynamodb'
+import { createHash } from 'crypto'
+
+import type { createCustomFetch } from './clientConfig'
+import { readIntEnv } from './env'
+import { createLogger } from './logger'
+
+type CustomFetch = Awaited<ReturnType<typeof createCustomFetch>>
+
+export interface ICachedResponse {
+  status: number
+  headers: Record<string, string>
+  body: string
+  etag?: string
+  lastModified?: string
+  expiresAt: number
+}
+
+/**
+ * A cache shared between tasks, consulted after the in-process LRU misses.
+ * Implementations should treat failures as misses rather than throw.
+ */
+export interface IResponseCacheBackend {
+  get(key: string): Promise<ICachedResponse | undefined>
+  set(key: string, entry: ICachedResponse): Promise<void>
+}
+
+export interface IResponseCacheStats {
+  hits: number
+  sharedHits: number
+  misses: number
+  revalidated: number
+  evictions: number
+  entries: number
+  bytes: number
+}
+
+const log = createLogger('responseCache')
+
+const MAX_ENTRIES = readIntEnv('RESPONSE_CACHE_MAX_ENTRIES', 1000, { min: 0 })
+const MAX_BYTES = readIntEnv('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024, {
+  min: 0,
+})
+const MAX_ENTRY_BYTES = readIntEnv(
+  'RESPONSE_CACHE_MAX_ENTRY_BYTES',
+  1024 * 1024,
+  { min: 0 },
+)
+// Ranges that include today may still change; older ranges are immutable
+const CURRENT_TTL_MS = readIntEnv('RESPONSE_CACHE_CURRENT_TTL_MS', 60_000, {
+  min: 0,
+})
+const HISTORICAL_TTL_MS = readIntEnv(
+  'RESPONSE_CACHE_HISTORICAL_TTL_MS',
+  24 * 60 * 60_000,
+  { min: 0 },
+)
+
+const STORED_HEADERS = [
+  'content-type',
+  'cache-control',
+  'etag',
+  'last-modified',
+]
+
+const entries = new Map<string, ICachedResponse>()
+let totalBytes = 0
+let sharedBackend: IResponseCacheBackend | null = null
+const stats = {
+  hits: 0,
+  sharedHits: 0,
+  misses: 0,
+  revalidated: 0,
+  evictions: 0,
+}
+
+const entrySize = (entry: ICachedResponse) => entry.body.length * 2
+
+const forget = (key: string) => {
+  const entry = entries.get(key)
+  if (!entry) return
+  entries.delete(key)
+  totalBytes -= entrySize(entry)
+}
+
+const remember = (key: string, entry: ICachedResponse) => {
+  forget(key)
+  entries.set(key, entry)
+  totalBytes += entrySize(entry)
+
+  // Map iteration order is insertion order, so the first key is the least
+  // recently used once reads re-insert their entry
+  while (entries.size > MAX_ENTRIES || totalBytes > MAX_BYTES) {
+    const oldest = entries.keys().next()
+    if (oldest.done) break
+    forget(oldest.value)
+    stats.evictions++
+  }
+}
+
+const touch = (key: string) => {
+  const entry = entries.get(key)
+  if (!entry) return undefined
+  entries.delete(key)
+  entries.set(key, entry)
+  return entry
+}
+
+// Key on a digest of the token so raw tokens never sit in the cache
+export const responseCacheKey = (accessToken: string, url: URL) => {
+  const tokenId = createHash('sha256').update(accessToken).digest('hex')
+  return `${tokenId.slice(0, 32)}|${url.href}`
+}
+
+/**
+ * Time to live for a response, or undefined when it must not be stored. An
+ * explicit max-age wins, otherwise ranges ending before today are treated as
+ * immutable history.
+ */
+export const responseTtl = (url: URL, headers: Headers) => {
+  const cacheControl = (headers.get('cache-control') ?? '').toLowerCase()
+  if (/(?:^|,)\s*no-store/.test(cacheControl)) return undefined
+  if (/(?:^|,)\s*no-cache/.test(cacheControl)) return 0
+
+  const maxAge = cacheControl.match(/(?:^|,)\s*max-age=(\d+)/)
+  if (maxAge) return Number(maxAge[1]) * 1000
+  if (/(?:^|,)\s*immutable/.test(cacheControl)) return HISTORICAL_TTL_MS
+
+  const to = Date.parse(url.searchParams.get('to') ?? '')
+  const startOfToday = new Date().setUTCHours(0, 0, 0, 0)
+  return !Number.isNaN(to) && to <= startOfToday
+    ? HISTORICAL_TTL_MS
+    : CURRENT_TTL_MS
+}
+
+const toResponse = (entry: ICachedResponse, cacheStatus: string) =>
+  new Response(entry.body, {
+    status: entry.status,
+    headers: { ...entry.headers, 'x-cache': cacheStatus },
+  })
+
+/**
+ * Read a response body as text if it fits in `maxBytes`. A larger body is
+ * returned as a response that streams it in full (the bytes already read,
+ * then the rest), so oversized reads are passed through without being
+ * buffered and callers' own limits still apply.
+ */
+const readBodyCapped = async (
+  response: Response,
+  maxBytes: number,
+): Promise<string | Response> => {
+  if (Number(response.headers.get('content-length')) > maxBytes)
+    return response
+  if (!response.body) return ''
+
+  const reader = response.body.getReader()
+  const parts: Uint8Array[] = []
+  let size = 0
+  for (;;) {
+    const { done, value } = await reader.read()
+    if (done) return Buffer.concat(parts).toString('utf8')
+    parts.push(value)
+    size += value.byteLength
+    if (size > maxBytes) break
+  }
+
+  const body = new ReadableStream<Uint8Array>({
+    start(controller) {
+      parts.splice(0).forEach(part => controller.enqueue(part))
+    },
+    async pull(controller) {
+      const { done, value } = await reader.read()
+      if (done) controller.close()
+      else controller.enqueue(value)
+    },
+    cancel: reason => reader.cancel(reason),
+  })
+  return new Response(body, {
+    status: response.status,
+    statusText: response.statusText,
+    headers: response.headers,
+  })
+}
+
+const lookup = async (key: string) => {
+  const local = touch(key)
+  if (local) return { entry: local, shared: false }
+  if (!sharedBackend) return { entry: undefined, shared: false }
+
+  try {
+    const entry = await sharedBackend.get(key)
+    if (entry) remember(key, entry)
+    return { entry, shared: true }
+  } catch (error) {
+    log.warn('Shared response cache lookup failed', { error })
+    return { entry: undefined, shared: false }
+  }
+}
+
+const store = (key: string, entry: ICachedResponse) => {
+  if (entrySize(entry) > MAX_ENTRY_BYTES) return
+  remember(key, entry)
+  sharedBackend
+    ?.set(key, entry)
+    .catch(error => log.warn('Shared response cache write failed', { error }))
+}
+
+/**
+ * Wrap customFetch so GET reads from the protected resource server are cached
+ * per access token and URL (which carries the date range). Stale entries with
+ * an ETag or Last-Modified are revalidated with a conditional request.
+ */
+export const withResponseCache = (
+  customFetch: CustomFetch,
+  accessToken: string,
+): CustomFetch => {
+  return async (url, options = {}) => {
+    const method = (options.method ?? 'GET').toUpperCase()
+    if (method !== 'GET') return customFetch(url, options)
+
+    const urlObj = typeof url === 'string' ? new URL(url) : url
+    const key = responseCacheKey(accessToken, urlObj)
+    const { entry, shared } = await lookup(key)
+
+    if (entry && entry.expiresAt > Date.now()) {
+      if (shared) stats.sharedHits++
+      else stats.hits++
+      return toResponse(entry, 'hit')
+    }
+
+    // Merged through Headers, which accepts any form the caller passes
+    const headers = new Headers(options.headers as HeadersInit)
+    if (entry?.etag) headers.set('If-None-Match', entry.etag)
+    if (entry?.lastModified)
+      headers.set('If-Modified-Since', entry.lastModified)
+
+    const response = await customFetch(url, {
+      ...options,
+      headers: Object.fromEntries(headers),
+    })
+
+    if (entry && response.status === 304) {
+      stats.revalidated++
+      await response.arrayBuffer()
+      const revalidated = {
+        ...entry,
+        expiresAt: Date.now() + (responseTtl(urlObj, response.headers) ?? 0),
+      }
+      store(key, revalidated)
+      return toResponse(revalidated, 'revalidated')
+    }
+
+    stats.misses++
+    const ttl = responseTtl(urlObj, response.headers)
+    if (!response.ok || ttl === undefined) return response
+
+    const storedHeaders: Record<string, string> = {}
+    STORED_HEADERS.forEach(name => {
+      const value = response.headers.get(name)
+      if (value) storedHeaders[name] = value
+    })
+    // Without a validator an entry that is already stale is never reusable
+    if (ttl === 0 && !storedHeaders.etag && !storedHeaders['last-modified'])
+      return response
+
+    // Bodies too large to cache are streamed through uncached
+    const body = await readBodyCapped(response, MAX_ENTRY_BYTES)
+    if (typeof body !== 'string') return body
+
+    const fresh: ICachedResponse = {
+      status: response.status,
+      headers: storedHeaders,
+      body,
+      etag: storedHeaders.etag,
+      lastModified: storedHeaders['last-modified'],
+      expiresAt: Date.now() + ttl,
+    }
+    store(key, fresh)
+    return toResponse(fresh, 'miss')
+  }
+}
+
+export const setSharedResponseCacheBackend = (
+  backend: IResponseCacheBackend | null,
+) => {
+  sharedBackend = backend
+}
+
+export const getResponseCacheStats = (): IResponseCacheStats => ({
+  ...stats,
+  entries: entries.size,
+  bytes: totalBytes,
+})
+
+export const clearResponseCache = () => {
+  entries.clear()
+  totalBytes = 0
+}
+
+// DynamoDB rejects items over 400 KB
+const DYNAMODB_MAX_ITEM_BYTES = 350 * 1024
+
+/**
+ * Shared backend storing entries in a DynamoDB table keyed on `cacheKey`,
+ * with `expiresAt` (epoch seconds) usable as the table's TTL attribute.
+ */
+export const createDynamoDbResponseCacheBackend = (
+  tableName: string,
+  endpoint?: string,
+): IResponseCacheBackend => {
+  const client = new DynamoDBClient({
+    region: process.env.AWS_REGION ?? 'eu-west-2',
+    endpoint,
+  })
+
+  return {
+    async get(key) {
+      const { Item } = await client.send(
+        new GetItemCommand({
+          TableName: tableName,
+          Key: { cacheKey: { S: key } },
+          ConsistentRead: false,
+        }),
+      )
+      const value = Item?.entry?.S
+      return value ? (JSON.parse(value) as ICachedResponse) : undefined
+    },
+    async set(key, entry) {
+      const value = JSON.stringify(entry)
+      if (value.length > DYNAMODB_MAX_ITEM_BYTES) return
+      await client.send(
+        new PutItemCommand({
+          TableName: tableName,
+          Item: {
+            cacheKey: { S: key },
+            entry: { S: value },
+            expiresAt: { N: String(Math.ceil(entry.expiresAt / 1000)) },
+          },
+        }),
+      )
+    },
+  }
+}
+
+let sharedBackendConfigured = false
+
+/**
+ * Configure the shared backend once from RESPONSE_CACHE_DYNAMODB_TABLE (and
+ * RESPONSE_CACHE_DYNAMODB_ENDPOINT for DynamoDB Local). Without a table the
+ * cache stays in-process only.
+ */
+export const initializeSharedResponseCache = async () => {
+  const tableName = process.env.RESPONSE_CACHE_DYNAMODB_TABLE
+  if (!tableName || sharedBackendConfigured) return
+
+  sharedBackendConfigured = true
+  setSharedResponseCacheBackend(
+    createDynamoDbResponseCacheBackend(
+      tableName,
+      process.env.RESPONSE_CACHE_DYNAMODB_ENDPOINT,
+    ),
+  )
+}
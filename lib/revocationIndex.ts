@@ -0,0 +1,240 @@
+import {
+  BatchWriteItemCommand,
+  DynamoDBClient,
+  ScanCommand,
+} from '@aws-sdk/client-dynamodb'
+import type { AttributeValue } from '@aws-sdk/client-dynamodb'
+
+import { readIntEnv } from './env'
+import type { ICertificateAttributes } from './ib1Cert'
+import { createLogger } from './logger'
+
+export const TOKEN_REVOCATION_MESSAGE = 'urn:ib1:zeus:event:token-revocation'
+
+// Fields of a revocation message (and claims of an access token) that
+// identify a revoked token or grant
+const IDENTIFIER_FIELDS = ['token_id', 'jti', 'grant_id'] as const
+
+export interface IRevocationStore {
+  add(ids: string[], expiresAt: number): Promise<void>
+  // Identifiers revoked after `since` (epoch ms), with their expiry
+  listSince(
+    since: number,
+  ): Promise<Array<{ id: string; revokedAt: number; expiresAt: number }>>
+}
+
+export interface IRevocationStats {
+  revoked: number
+  lastSyncAt?: number
+  syncErrors: number
+}
+
+// Longer than any access token lifetime; entries are pruned after this
+const REVOCATION_TTL_MS = readIntEnv('REVOCATION_TTL_SECONDS', 86_400) * 1000
+const SYNC_INTERVAL_MS = readIntEnv('REVOCATION_SYNC_INTERVAL_MS', 5000)
+// How long to wait after the shared store could not be read before retrying
+const RETRY_INTERVAL_MS = readIntEnv('REVOCATION_RETRY_INTERVAL_MS', 30_000)
+
+const envList = (name: string) =>
+  (process.env[name] ?? '')
+    .split(',')
+    .map(value => value.trim())
+    .filter(Boolean)
+
+// Issuers allowed to revoke tokens, by application URL or role
+const SENDER_APPLICATIONS = new Set(envList('REVOCATION_SENDER_APPLICATIONS'))
+const SENDER_ROLES = new Set(envList('REVOCATION_SENDER_ROLES'))
+
+const log = createLogger('revocationIndex')
+
+// id -> expiry (epoch ms); membership is all the hot path checks
+const revoked = new Map<string, number>()
+let store: IRevocationStore | null = null
+let lastSyncAt: number | undefined
+let syncErrors = 0
+
+/**
+ * True if any of the identifiers has been revoked. A single hash lookup per
+ * identifier, so cheap enough to run on every request.
+ */
+export const isRevoked = (ids: readonly string[] | undefined) => {
+  if (!ids || revoked.size === 0) return false
+  for (let i = 0; i < ids.length; i++) if (revoked.has(ids[i])) return true
+  return false
+}
+
+/**
+ * True if the certificate belongs to an issuer allowed to revoke tokens: its
+ * application is in REVOCATION_SENDER_APPLICATIONS or it holds a role in
+ * REVOCATION_SENDER_ROLES. With neither set, no sender may revoke.
+ */
+export const isRevocationSender = (sender: ICertificateAttributes) =>
+  SENDER_APPLICATIONS.has(sender.application) ||
+  sender.roles.some(role => SENDER_ROLES.has(role))
+
+/** Identifiers carried by a token-revocation message. */
+export const revocationIdentifiers = (message: Record<string, unknown>) =>
+  IDENTIFIER_FIELDS.map(field => message[field]).filter(
+    (value): value is string => typeof value === 'string' && value !== '',
+  )
+
+/**
+ * Identifiers of a JWT access token (its `jti` and `grant_id` claims). The
+ * signature is not checked: the result is only used to look up revocations.
+ */
+export const tokenIdentifiers = (accessToken: string): string[] => {
+  const payload = accessToken.split('.')[1]
+  if (!payload) return []
+  try {
+    const claims = JSON.parse(Buffer.from(payload, 'base64url').toString())
+    return revocationIdentifiers(claims)
+  } catch {
+    return []
+  }
+}
+
+/**
+ * Record revoked identifiers locally at once and in the shared store, so
+ * other tasks pick them up on their next sync.
+ */
+export const recordRevocation = async (ids: string[]) => {
+  const expiresAt = Date.now() + REVOCATION_TTL_MS
+  ids.forEach(id => revoked.set(id, expiresAt))
+  if (store) await store.add(ids, expiresAt)
+}
+
+const prune = (now: number) => {
+  revoked.forEach((expiresAt, id) => {
+    if (expiresAt <= now) revoked.delete(id)
+  })
+}
+
+export const syncRevocations = async () => {
+  if (!store) return
+  const startedAt = Date.now()
+  // Overlap the previous window so writes racing the last scan are not missed
+  const since = lastSyncAt === undefined ? 0 : lastSyncAt - SYNC_INTERVAL_MS
+  try {
+    const entries = await store.listSince(since)
+    entries.forEach(entry => revoked.set(entry.id, entry.expiresAt))
+    lastSyncAt = startedAt
+  } catch (error) {
+    syncErrors++
+    log.warn('Revocation sync failed', { error })
+  }
+  prune(startedAt)
+}
+
+export const setRevocationStore = (nextStore: IRevocationStore | null) => {
+  store = nextStore
+  lastSyncAt = undefined
+}
+
+export const getRevocationStats = (): IRevocationStats => ({
+  revoked: revoked.size,
+  lastSyncAt,
+  syncErrors,
+})
+
+export const clearRevocations = () => revoked.clear()
+
+/**
+ * Shared store in a DynamoDB table keyed on `revokedId`, with `expiresAt`
+ * (epoch seconds) usable as the table's TTL attribute. The table holds at
+ * most a day of revocations, so a filtered scan is an acceptable sync.
+ */
+export const createDynamoDbRevocationStore = (
+  tableName: string,
+  endpoint?: string,
+): IRevocationStore => {
+  const client = new DynamoDBClient({
+    region: process.env.AWS_REGION ?? 'eu-west-2',
+    endpoint,
+  })
+
+  return {
+    async add(ids, expiresAt) {
+      const revokedAt = String(Date.now())
+      for (let i = 0; i < ids.length; i += 25)
+        await client.send(
+          new BatchWriteItemCommand({
+            RequestItems: {
+              [tableName]: ids.slice(i, i + 25).map(id => ({
+                PutRequest: {
+                  Item: {
+                    revokedId: { S: id },
+                    revokedAt: { N: revokedAt },
+                    expiresAt: { N: String(Math.ceil(expiresAt / 1000)) },
+                  },
+                },
+              })),
+            },
+          }),
+        )
+    },
+    async listSince(since) {
+      const entries = []
+      let startKey: Record<string, AttributeValue> | undefined
+      do {
+        const page = await client.send(
+          new ScanCommand({
+            TableName: tableName,
+            FilterExpression: 'revokedAt > :since',
+            ExpressionAttributeValues: { ':since': { N: String(since) } },
+            ExclusiveStartKey: startKey,
+          }),
+        )
+        for (const item of page.Items ?? [])
+          entries.push({
+            id: item.revokedId.S ?? '',
+            revokedAt: Number(item.revokedAt.N),
+            expiresAt: Number(item.expiresAt.N) * 1000,
+          })
+        startKey = page.LastEvaluatedKey
+      } while (startKey)
+      return entries
+    },
+  }
+}
+
+let sharedStorePromise: Promise<void> | null = null
+
+/**
+ * Configure the shared store once from REVOCATION_DYNAMODB_TABLE (and
+ * REVOCATION_DYNAMODB_ENDPOINT for DynamoDB Local) and start polling it in
+ * the background. Without a table revocations only apply to this process.
+ * With a table, rejects if the first sync fails so a revocation is never
+ * acknowledged while only this task knows about it. Calls keep getting that
+ * rejection for REVOCATION_RETRY_INTERVAL_MS, so an unreachable table is not
+ * scanned again on every request; the first call after that retries.
+ */
+export const startRevocationSync = () => {
+  const tableName = process.env.REVOCATION_DYNAMODB_TABLE
+  if (!tableName) return Promise.resolve()
+
+  if (!sharedStorePromise)
+    sharedStorePromise = (async () => {
+      setRevocationStore(
+        createDynamoDbRevocationStore(
+          tableName,
+          process.env.REVOCATION_DYNAMODB_ENDPOINT,
+        ),
+      )
+      await syncRevocations()
+      if (lastSyncAt === undefined)
+        throw new Error(`Revocation table ${tableName} could not be read`)
+      setInterval(syncRevocations, SYNC_INTERVAL_MS).unref?.()
+    })().catch(error => {
+      setRevocationStore(null)
+      log.warn('Shared revocation index unavailable', {
+        error,
+        retryInMs: RETRY_INTERVAL_MS,
+      })
+      setTimeout(() => {
+        sharedStorePromise = null
+      }, RETRY_INTERVAL_MS).unref?.()
+      throw error
+    })
+
+  return sharedStorePromise
+}
@@ -0,0 +1,222 @@
+import {
+  DescribeSecretCommand,
+  GetSecretValueCommand,
+  SecretsManagerClient,
+} from '@aws-sdk/client-secrets-manager'
+
+import type { ICertificates } from './clientConfig'
+import { readIntEnv } from './env'
+import { createLogger } from './logger'
+import { processState } from './processState'
+
+export interface IRetryOptions {
+  attempts: number
+  baseDelayMs: number
+  maxDelayMs: number
+}
+
+export interface ISecretRefreshOptions {
+  // How often the secret's current version is checked for rotation
+  refreshIntervalMs: number
+  retry: IRetryOptions
+}
+
+interface ISecretsClient {
+  send(
+    command: GetSecretValueCommand | DescribeSecretCommand,
+  ): Promise<{
+    SecretString?: string
+    VersionId?: string
+    VersionIdsToStages?: Record<string, string[]>
+  }>
+}
+
+interface ICachedSecret {
+  certificates: ICertificates
+  versionId?: string
+  fetchedAt: number
+}
+
+export const resolveSecretRefreshOptions = (): ISecretRefreshOptions => ({
+  refreshIntervalMs: readIntEnv('MTLS_SECRET_REFRESH_INTERVAL_MS', 300_000),
+  retry: {
+    attempts: readIntEnv('MTLS_SECRET_RETRY_ATTEMPTS', 5),
+    baseDelayMs: readIntEnv('MTLS_SECRET_RETRY_BASE_MS', 200),
+    maxDelayMs: readIntEnv('MTLS_SECRET_RETRY_MAX_MS', 5000),
+  },
+})
+
+const log = createLogger('secretCertificates')
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms))
+
+/**
+ * Run an operation, retrying failures with exponential backoff and full
+ * jitter so tasks starting together do not retry in lockstep.
+ */
+export const withRetry = async <T>(
+  label: string,
+  operation: () => Promise<T>,
+  options: IRetryOptions,
+): Promise<T> => {
+  for (let attempt = 1; ; attempt++)
+    try {
+      return await operation()
+    } catch (error) {
+      if (attempt >= options.attempts) throw error
+      const delayMs =
+        Math.random() *
+        Math.min(options.maxDelayMs, options.baseDelayMs * 2 ** (attempt - 1))
+      log.warn(`${label} failed; retrying`, {
+        attempt,
+        attempts: options.attempts,
+        delayMs: Math.round(delayMs),
+        error,
+      })
+      await sleep(delayMs)
+    }
+}
+
+const parseSecret = (secretString?: string): ICertificates => {
+  const secret = secretString ? JSON.parse(secretString) : null
+  if (!secret) throw new Error('Secret is empty or not in the expected format.')
+  if (!secret.mtlsKey) throw new Error('Secret missing mtlsKey')
+  if (!secret.mtlsBundle) throw new Error('Secret missing mtlsBundle')
+
+  return { mtlsKey: secret.mtlsKey, mtlsBundle: secret.mtlsBundle }
+}
+
+/**
+ * In-memory cache of the mTLS key bundle held in Secrets Manager. The first
+ * load is retried; afterwards the secret's AWSCURRENT version is checked on
+ * an interval (DescribeSecret) and only re-read when it has rotated.
+ */
+export const createSecretCertificateSource = (
+  client: ISecretsClient,
+  secretId: string,
+  options: ISecretRefreshOptions = resolveSecretRefreshOptions(),
+) => {
+  let cached: ICachedSecret | null = null
+  let pending: Promise<ICertificates> | null = null
+  let refreshTimer: ReturnType<typeof setTimeout> | null = null
+
+  const fetchSecret = async () => {
+    const data = await client.send(
+      new GetSecretValueCommand({ SecretId: secretId }),
+    )
+    cached = {
+      certificates: parseSecret(data.SecretString),
+      versionId: data.VersionId,
+      fetchedAt: Date.now(),
+    }
+    return cached.certificates
+  }
+
+  const currentVersionId = async () => {
+    const data = await client.send(
+      new DescribeSecretCommand({ SecretId: secretId }),
+    )
+    return Object.entries(data.VersionIdsToStages ?? {}).find(([, stages]) =>
+      stages.includes('AWSCURRENT'),
+    )?.[0]
+  }
+
+  /** Certificates from the cache, fetching them (with retries) on first use. */
+  const load = (): Promise<ICertificates> => {
+    if (cached) return Promise.resolve(cached.certificates)
+
+    // Single flight; a failure clears `pending` so the next call tries again
+    if (!pending)
+      pending = withRetry(
+        `Secrets Manager ${secretId}`,
+        fetchSecret,
+        options.retry,
+      ).finally(() => {
+        pending = null
+      })
+    return pending
+  }
+
+  /** Re-read the secret if it has rotated; resolves true when it changed. */
+  const refresh = async () => {
+    if (!cached) {
+      await load()
+      return true
+    }
+
+    const versionId = await withRetry(
+      `Secrets Manager ${secretId} version check`,
+      currentVersionId,
+      options.retry,
+    )
+    if (versionId && versionId === cached.versionId) return false
+
+    const previous = cached.certificates
+    const certificates = await withRetry(
+      `Secrets Manager ${secretId}`,
+      fetchSecret,
+      options.retry,
+    )
+    return (
+      certificates.mtlsKey !== previous.mtlsKey ||
+      certificates.mtlsBundle !== previous.mtlsBundle
+    )
+  }
+
+  /**
+   * Check for rotation every refresh interval (with jitter) and call
+   * `onRotate` with the new certificates. Errors keep the cached copy.
+   */
+  const startRefresh = (onRotate: (certificates: ICertificates) => void) => {
+    if (refreshTimer) return
+
+    const schedule = () => {
+      const delayMs = options.refreshIntervalMs * (0.9 + Math.random() * 0.2)
+      refreshTimer = setTimeout(async () => {
+        try {
+          if ((await refresh()) && cached) onRotate(cached.certificates)
+        } catch (error) {
+          log.error('Failed to refresh secret', { secretId, error })
+        }
+        schedule()
+      }, delayMs)
+      refreshTimer.unref?.()
+    }
+    schedule()
+  }
+
+  return {
+    load,
+    refresh,
+    startRefresh,
+    versionId: () => cached?.versionId,
+  }
+}
+
+export type SecretCertificateSource = ReturnType<
+  typeof createSecretCertificateSource
+>
+
+const sources = processState(
+  'secretSources',
+  () => new Map<string, SecretCertificateSource>(),
+)
+let secretsManager: SecretsManagerClient | null = null
+
+/**
+ * Shared source per secret, using one Secrets Manager client for the
+ * process. SECRETS_MANAGER_ENDPOINT points it at a local stub.
+ */
+export const getSecretCertificateSource = (secretId: string) => {
+  let source = sources.get(secretId)
+  if (!source) {
+    if (!secretsManager)
+      secretsManager = new SecretsManagerClient({
+        region: process.env.AWS_REGION ?? 'eu-west-2',
+        endpoint: process.env.SECRETS_MANAGER_ENDPOINT,
+      })
+    source = createSecretCertificateSource(secretsManager, secretId)
+    sources.set(secretId, source)
+  }
+  return source
+}
@@ -0,0 +1,166 @@
+import { performance } from 'perf_hooks'
+
+import {
+  getClientConfigPromise,
+  getMtlsAgent,
+  resolveAuthServer,
+} from './clientConfig'
+import { getDiscoveryConfiguration } from './discoveryCache'
+import { readIntEnv } from './env'
+import { createLogger } from './logger'
+import { getMessageIngestion } from './messageIngestion'
+import { processState } from './processState'
+
+// `eager` warms every dependency in parallel and reports ready only once
+// they are loaded; `lazy` (the default) prefetches in the background and is
+// ready as soon as the server listens
+export type StartupMode = 'eager' | 'lazy'
+
+export interface IStartupPhase {
+  name: string
+  durationMs: number
+  ok: boolean
+  error?: string
+}
+
+export interface IStartupState {
+  mode: StartupMode
+  ready: boolean
+  attempts: number
+  // Process uptime when the server became ready (ms), including Node boot
+  readyAfterMs?: number
+  phases: Record<string, IStartupPhase>
+}
+
+const STARTUP_TIMEOUT_MS = readIntEnv('STARTUP_TIMEOUT_MS', 20_000)
+const STARTUP_RETRY_MS = readIntEnv('STARTUP_RETRY_MS', 5000)
+
+export const resolveStartupMode = (): StartupMode =>
+  process.env.STARTUP_MODE === 'eager' ? 'eager' : 'lazy'
+
+// Shared with the health route, which is bundled apart from instrumentation
+const state = processState(
+  'startup',
+  (): IStartupState => ({
+    mode: resolveStartupMode(),
+    ready: false,
+    attempts: 0,
+    phases: {},
+  }),
+)
+const running = processState('startupRun', () => ({
+  promise: null as Promise<IStartupState> | null,
+}))
+
+/**
+ * Dependencies loaded before the first request. In the app these are the
+ * client config (which fetches the mTLS secret), the pooled mTLS agent and
+ * OAuth discovery, which needs only the environment and so runs alongside
+ * the secret fetch rather than after it.
+ */
+const startupPhases = (): Record<string, () => Promise<unknown>> =>
+  process.env.APP_MODE === 'ingestion'
+    ? { messageSink: () => getMessageIngestion().ready() }
+    : {
+        clientConfig: () => getClientConfigPromise().then(getMtlsAgent),
+        discovery: () => getDiscoveryConfiguration(resolveAuthServer()),
+      }
+
+const log = createLogger('startup')
+
+const timePhase = async (
+  name: string,
+  run: () => Promise<unknown>,
+): Promise<IStartupPhase> => {
+  const startedAt = performance.now()
+  let phase: IStartupPhase
+  try {
+    await run()
+    phase = { name, ok: true, durationMs: performance.now() - startedAt }
+  } catch (error) {
+    phase = {
+      name,
+      ok: false,
+      durationMs: performance.now() - startedAt,
+      error: error instanceof Error ? error.message : String(error),
+    }
+  }
+  log.info(phase.ok ? 'Startup phase loaded' : 'Startup phase failed', {
+    event: 'startup_phase',
+    phase: name,
+    ok: phase.ok,
+    duration_ms: Math.round(phase.durationMs),
+    attempt: state.attempts,
+    error: phase.error,
+  })
+  return phase
+}
+
+const runPhases = async (): Promise<IStartupState> => {
+  state.attempts++
+  // Phases that already succeeded are not repeated on a retry
+  const pending = Object.entries(startupPhases()).filter(
+    ([name]) => !state.phases[name]?.ok,
+  )
+  const phases = await Promise.all(
+    pending.map(([name, run]) => timePhase(name, run)),
+  )
+  phases.forEach(phase => (state.phases[phase.name] = phase))
+
+  if (phases.every(phase => phase.ok)) {
+    state.ready = true
+    state.readyAfterMs = Math.round(process.uptime() * 1000)
+    log.info('Ready', {
+      event: 'startup_ready',
+      mode: state.mode,
+      attempts: state.attempts,
+      ready_after_ms: state.readyAfterMs,
+      phases: Object.fromEntries(
+        Object.values(state.phases).map(phase => [
+          phase.name,
+          Math.round(phase.durationMs),
+        ]),
+      ),
+    })
+  } else if (state.mode === 'eager') {
+    // Lazy mode leaves retries to the first request that needs the phase
+    setTimeout(startup, STARTUP_RETRY_MS).unref?.()
+  }
+  return state
+}
+
+/**
+ * Load every startup dependency in parallel. Never rejects: failures are
+ * recorded per phase. Concurrent callers share one run, and in eager mode
+ * failed phases are retried in the background until all succeed.
+ */
+export const startup = (): Promise<IStartupState> => {
+  if (state.ready) return Promise.resolve(state)
+  if (!running.promise)
+    running.promise = runPhases().finally(() => (running.promise = null))
+  return running.promise
+}
+
+/**
+ * Wait for startup, but no longer than STARTUP_TIMEOUT_MS, so a slow
+ * dependency delays readiness rather than stopping the server listening.
+ */
+export const waitForStartup = async (timeoutMs = STARTUP_TIMEOUT_MS) => {
+  let timer: ReturnType<typeof setTimeout> | undefined
+  const timeout = new Promise<IStartupState>(resolve => {
+    timer = setTimeout(() => resolve(state), timeoutMs)
+  })
+  try {
+    return await Promise.race([startup(), timeout])
+  } finally {
+    clearTimeout(timer)
+  }
+}
+
+/** Ready to take traffic: always in lazy mode, after startup when eager. */
+export const isReady = () => state.mode === 'lazy' || state.ready
+
+export const getStartupState = (): IStartupState => ({
+  ...state,
+  phases: { ...state.phases },
+})
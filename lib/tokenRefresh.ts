@@ -0,0 +1,261 @@
+import { createHash } from 'crypto'
+
+import { createCustomFetch, getClientConfigPromise } from './clientConfig'
+import { getDiscoveryConfiguration } from './discoveryCache'
+import { readIntEnv } from './env'
+import { createLogger } from './logger'
+import { timed } from './metrics'
+import { processState } from './processState'
+import { tokenIdentifiers } from './revocationIndex'
+
+const log = createLogger('tokenRefresh')
+
+/** The fields of a token endpoint response the session keeps. */
+export interface ITokenResponse {
+  access_token?: string
+  refresh_token?: string
+  // Lifetime of access_token in seconds
+  expires_in?: number
+}
+
+export interface IIssuedTokens extends ITokenResponse {
+  access_token: string
+}
+
+/** Token fields of the session; an IronSession<SessionData> satisfies it. */
+export interface ITokenSession {
+  isLoggedIn: boolean
+  access_token?: string
+  refresh_token?: string
+  // When access_token expires, in ms since the epoch
+  expires_at?: number
+  token_ids?: string[]
+  save(): Promise<void>
+}
+
+export interface ITokenRefreshStats {
+  // Refresh grants sent to the token endpoint
+  refreshes: number
+  // Callers that waited on a refresh already in flight
+  joined: number
+  // Callers served the result of a refresh that had just completed
+  reused: number
+  failures: number
+}
+
+export type RefreshGrant = (refreshToken: string) => Promise<IIssuedTokens>
+
+interface IRecentRefresh {
+  tokens: IIssuedTokens
+  until: number
+}
+
+const REFRESH_BEFORE_EXPIRY_MS = readIntEnv(
+  'TOKEN_REFRESH_BEFORE_EXPIRY_MS',
+  60_000,
+  { min: 0 },
+)
+const REUSE_MS = readIntEnv('TOKEN_REFRESH_REUSE_MS', 30_000, { min: 0 })
+
+const inFlight = processState(
+  'tokenRefreshInFlight',
+  () => new Map<string, Promise<IIssuedTokens>>(),
+)
+const recent = processState(
+  'tokenRefreshRecent',
+  () => new Map<string, IRecentRefresh>(),
+)
+const stats = processState(
+  'tokenRefreshStats',
+  (): ITokenRefreshStats => ({
+    refreshes: 0,
+    joined: 0,
+    reused: 0,
+    failures: 0,
+  }),
+)
+
+// Refresh tokens are credentials, so they are not kept as map keys
+const refreshKey = (refreshToken: string) =>
+  createHash('sha256').update(refreshToken).digest('hex')
+
+const jwtExpiry = (accessToken: string) => {
+  const payload = accessToken.split('.')[1]
+  if (!payload) return undefined
+  try {
+    const { exp } = JSON.parse(Buffer.from(payload, 'base64url').toString())
+    return typeof exp === 'number' ? exp * 1000 : undefined
+  } catch {
+    return undefined
+  }
+}
+
+/**
+ * When the access token in `tokens` expires: from `expires_in`, or the JWT
+ * `exp` claim if the server left it out. Undefined if neither is known.
+ */
+export const tokenExpiry = (tokens: ITokenResponse, now = Date.now()) =>
+  typeof tokens.expires_in === 'number'
+    ? now + tokens.expires_in * 1000
+    : tokens.access_token
+      ? jwtExpiry(tokens.access_token)
+      : undefined
+
+/**
+ * Put a token endpoint response on the session. The caller saves it. A
+ * refresh response without a refresh token keeps the current one, as the
+ * server has not rotated it.
+ */
+export const storeTokens = (
+  session: ITokenSession,
+  tokens: IIssuedTokens,
+  now = Date.now(),
+) => {
+  session.access_token = tokens.access_token
+  session.token_ids = tokenIdentifiers(tokens.access_token)
+  if (tokens.refresh_token) session.refresh_token = tokens.refresh_token
+  session.expires_at = tokenExpiry(tokens, now)
+  session.isLoggedIn = true
+}
+
+/** Log the session out locally. The caller saves it. */
+export const clearTokens = (session: ITokenSession) => {
+  session.isLoggedIn = false
+  delete session.access_token
+  delete session.token_ids
+  delete session.refresh_token
+  delete session.expires_at
+}
+
+/** Whether the session's access token is close enough to expiry to refresh. */
+export const needsRefresh = (session: ITokenSession, now = Date.now()) =>
+  Boolean(
+    session.refresh_token &&
+      session.expires_at !== undefined &&
+      session.expires_at - now <= REFRESH_BEFORE_EXPIRY_MS,
+  )
+
+/** Send the refresh_token grant to the discovered token endpoint over mTLS. */
+export const requestRefreshGrant: RefreshGrant = async refreshToken => {
+  const clientConfig = await getClientConfigPromise()
+  const issuer = await getDiscoveryConfiguration(clientConfig)
+  const customFetch = await createCustomFetch(clientConfig)
+
+  const tokenEndpoint = issuer.serverMetadata().token_endpoint
+  if (!tokenEndpoint) throw new Error('No token endpoint in discovery')
+
+  const response = await customFetch(tokenEndpoint, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
+    body: new URLSearchParams({
+      grant_type: 'refresh_token',
+      refresh_token: refreshToken,
+      client_id: clientConfig.client_id,
+    }).toString(),
+  })
+
+  if (!response.ok)
+    throw new Error(
+      `Token refresh failed: ${response.status} ${response.statusText} - ${await response.text()}`,
+    )
+
+  const tokens = (await response.json()) as ITokenResponse
+  if (!tokens.access_token)
+    throw new Error('Access token missing from refresh response')
+  return tokens as IIssuedTokens
+}
+
+/**
+ * Exchange a refresh token, at most once. Requests from one session carry
+ * the same refresh token, so concurrent callers share the request in
+ * flight. Callers that arrive within TOKEN_REFRESH_REUSE_MS afterwards,
+ * still holding the old session cookie, get the same result instead of
+ * replaying a refresh token the server may have rotated.
+ */
+export const refreshTokens = (
+  refreshToken: string,
+  grant: RefreshGrant = requestRefreshGrant,
+  now = Date.now(),
+): Promise<IIssuedTokens> => {
+  const key = refreshKey(refreshToken)
+
+  recent.forEach((entry, recentKey) => {
+    if (entry.until <= now) recent.delete(recentKey)
+  })
+  const completed = recent.get(key)
+  if (completed) {
+    stats.reused++
+    return Promise.resolve(completed.tokens)
+  }
+
+  const pending = inFlight.get(key)
+  if (pending) {
+    stats.joined++
+    return pending
+  }
+
+  stats.refreshes++
+  const request = grant(refreshToken)
+    .then(tokens => {
+      recent.set(key, { tokens, until: Date.now() + REUSE_MS })
+      return tokens
+    })
+    .catch(error => {
+      stats.failures++
+      throw error
+    })
+    .finally(() => inFlight.delete(key))
+
+  inFlight.set(key, request)
+  return request
+}
+
+/**
+ * The session's access token, refreshed first when it is within
+ * TOKEN_REFRESH_BEFORE_EXPIRY_MS of expiry. If the refresh fails, a token
+ * that has not yet expired is still used; an expired one logs the session
+ * out and undefined is returned, so the user signs in again.
+ */
+export const getAccessToken = async (
+  session: ITokenSession,
+  grant: RefreshGrant = requestRefreshGrant,
+): Promise<string | undefined> => {
+  const { access_token, refresh_token, expires_at } = session
+  if (!access_token) return undefined
+
+  const now = Date.now()
+  if (!refresh_token || !needsRefresh(session, now)) return access_token
+
+  try {
+    const tokens = await timed('tokenRefresh', () =>
+      refreshTokens(refresh_token, grant, now),
+    )
+    storeTokens(session, tokens)
+    await session.save()
+    return session.access_token
+  } catch (error) {
+    if (expires_at !== undefined && now < expires_at) {
+      log.warn('Token refresh failed, using the current access token', {
+        error,
+      })
+      return access_token
+    }
+    log.warn('Token refresh failed and the access token has expired', {
+      error,
+    })
+    clearTokens(session)
+    await session.save()
+    return undefined
+  }
+}
+
+export const getTokenRefreshStats = (): ITokenRefreshStats => ({ ...stats })
+
+export const resetTokenRefresh = () => {
+  inFlight.clear()
+  recent.clear()
+  stats.refreshes = 0
+  stats.joined = 0
+  stats.reused = 0
+  stats.failures = 0
+}
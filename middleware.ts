@@ -0,0 +1,19 @@
+import { NextRequest, NextResponse } from 'next/server'
+
+// Routes served when the image runs as the dedicated message ingestion
+// service (APP_MODE=ingestion); everything else belongs to the UI service
+const INGESTION_ROUTES = ['/perseus/messages', '/api/health']
+
+export function middleware(request: NextRequest) {
+  if (
+    process.env.APP_MODE !== 'ingestion' ||
+    INGESTION_ROUTES.includes(request.nextUrl.pathname)
+  )
+    return NextResponse.next()
+
+  return NextResponse.json({ error: 'Not found' }, { status: 404 })
+}
+
+export const config = {
+  matcher: ['/((?!_next/static|_next/image|favicon.ico).*)'],
+}
@@ -0,0 +1,37 @@
+#!/bin/bash
+# Create the DynamoDB tables used by the app in the local dynamodb-cap service
+# from compose.yml. Allow the endpoint to be provided as an argument.
+ENDPOINT="${1:-http://localhost:9090}"
+
+RESPONSE_CACHE_TABLE="${RESPONSE_CACHE_DYNAMODB_TABLE:-perseus-cap-response-cache}"
+MESSAGE_TABLE="${MESSAGE_TABLE_NAME:-perseus-cap-messages}"
+REVOCATION_TABLE="${REVOCATION_DYNAMODB_TABLE:-perseus-cap-revocations}"
+
+create_table() {
+  local TABLE_NAME="$1"
+  local KEY_NAME="$2"
+
+  if aws dynamodb describe-table --table-name "$TABLE_NAME" \
+    --endpoint-url "$ENDPOINT" --region eu-west-2 >/dev/null 2>&1; then
+    echo "Table '$TABLE_NAME' already exists."
+    return
+  fi
+
+  aws dynamodb create-table \
+    --table-name "$TABLE_NAME" \
+    --attribute-definitions AttributeName="$KEY_NAME",AttributeType=S \
+    --key-schema AttributeName="$KEY_NAME",KeyType=HASH \
+    --billing-mode PAY_PER_REQUEST \
+    --endpoint-url "$ENDPOINT" \
+    --region eu-west-2 >/dev/null
+
+  if [ $? -eq 0 ]; then
+    echo "Table '$TABLE_NAME' created successfully."
+  else
+    echo "Failed to create table '$TABLE_NAME'."
+  fi
+}
+
+create_table "$RESPONSE_CACHE_TABLE" cacheKey
+create_table "$MESSAGE_TABLE" messageId
+create_table "$REVOCATION_TABLE" revokedId